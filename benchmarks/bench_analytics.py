@@ -0,0 +1,103 @@
+"""
+Average execution prices over a day of one market: the notebook's `process_orderbooks` /
+`calculate_avg_prices` loop vs `src.analytics`.
+
+Both start from the files already loaded into the JSON layout (24 hourly files of 15 s polls).
+
+Usage:
+    python -m benchmarks.bench_analytics [num_updates_per_hour] [depth]
+"""
+import sys
+import timeit
+from typing import Any, Dict, List
+
+import pandas  # noqa: F401  # imported up front so the first timing does not include it
+from benchmarks.synthetic import make_track
+from src.analytics import book_analytics, book_snapshots, snapshots_from_files
+from src.formats import orderbook_track_to_dict
+from src.models import OrderSummary
+from src.replay import replay_orderbook_data
+
+ORDER_SIZES = [10.0, 100.0, 1000.0, 5000.0, 20000.0]
+
+
+def calculate_avg_prices(bids: List[OrderSummary], asks: List[OrderSummary], shares: float) -> Dict[str, float]:
+    """
+    `calculate_avg_prices` of DEMO_access_and_convert_data.ipynb (which labels the bid walk "buy").
+    """
+    buy_price, remaining_shares = 0.0, shares
+    for bid in sorted(bids, key=lambda x: -x.price):
+        if remaining_shares <= 0:
+            break
+        trade_size = min(remaining_shares, bid.size)
+        buy_price += trade_size * bid.price
+        remaining_shares -= trade_size
+    sell_price, remaining_shares = 0.0, shares
+    for ask in sorted(asks, key=lambda x: x.price):
+        if remaining_shares <= 0:
+            break
+        trade_size = min(remaining_shares, ask.size)
+        sell_price += trade_size * ask.price
+        remaining_shares -= trade_size
+    return {"avg_buy_price": buy_price / shares, "avg_sell_price": sell_price / shares}
+
+
+def notebook_loop(files: List[Dict[str, Any]], order_sizes: List[float]) -> int:
+    rows = 0
+    for data in files:
+        bids = [OrderSummary(**bid) for bid in data["start_orderbook"]["bids"]]
+        asks = [OrderSummary(**ask) for ask in data["start_orderbook"]["asks"]]
+        for update in [None] + data["updates"]:
+            if update is not None:
+                for side, levels in ((bids, update["changes"]["bids"]), (asks, update["changes"]["asks"])):
+                    for level in levels:
+                        price, size = level["price"], level["size"]
+                        if size == 0:
+                            side[:] = [b for b in side if b.price != price]
+                            continue
+                        for b in side:
+                            if b.price == price:
+                                b.size = size
+                                break
+                        else:
+                            side.append(OrderSummary(price=price, size=size))
+            for shares in order_sizes:
+                calculate_avg_prices(bids, asks, shares)
+            rows += 1
+    return rows
+
+
+def replayed(files: List[Dict[str, Any]], order_sizes: List[float]) -> int:
+    states = (book for data in files for book in replay_orderbook_data(data))
+    return len(book_analytics(book_snapshots(states), order_sizes=order_sizes, tick_size=0.001))
+
+
+def scattered(files: List[Dict[str, Any]], order_sizes: List[float]) -> int:
+    return len(book_analytics(snapshots_from_files(files), order_sizes=order_sizes, tick_size=0.001))
+
+
+def timed(fn: Any) -> float:
+    # Best of a few runs, so a single slow run (first-touch allocations, a busy machine) does not decide
+    return min(timeit.repeat(fn, number=1, repeat=5))
+
+
+def main() -> None:
+    num_updates = int(sys.argv[1]) if len(sys.argv) > 1 else 240
+    depth = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    files = [
+        orderbook_track_to_dict(*make_track(num_updates=num_updates, depth=depth, seed=hour, hour=hour))
+        for hour in range(24)
+    ]
+
+    print(f"24 files x {num_updates} updates, {depth} levels per side")
+    print("time [ms] per implementation; analytics: spread, mid, VWAP per order size, depth")
+    print(f"{'order sizes':>12} {'notebook':>10} {'ReplayBook':>11} {'snapshots_from_files':>21}")
+    for order_sizes in (ORDER_SIZES[1:2], ORDER_SIZES):
+        notebook_s = timed(lambda: notebook_loop(files, order_sizes))
+        replayed_s = timed(lambda: replayed(files, order_sizes))
+        scattered_s = timed(lambda: scattered(files, order_sizes))
+        print(f"{len(order_sizes):>12} {notebook_s * 1e3:>10.1f} {replayed_s * 1e3:>11.1f} {scattered_s * 1e3:>21.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+"""
+Bytes written, encode time and decode time per hourly file format.
+
+Usage:
+    python -m benchmarks.bench_file_formats
+"""
+import io
+import timeit
+
+from benchmarks.synthetic import make_track
+from src.formats import ORDERBOOK_FORMATS
+
+
+def main() -> None:
+    track, metadata = make_track(num_updates=240, depth=50)
+    print(f"{'format':>14} {'bytes':>10} {'ratio':>6} {'encode [ms]':>12} {'decode [ms]':>12}")
+    baseline = None
+    for orderbook_format in ORDERBOOK_FORMATS.values():
+        if not orderbook_format.available:
+            print(f"{orderbook_format.name:>14} {'(optional dependency not installed)':>44}")
+            continue
+
+        def encode() -> bytes:
+            buffer = io.BytesIO()
+            orderbook_format.write(track, metadata, buffer)
+            return buffer.getvalue()
+
+        payload = encode()
+        baseline = baseline or len(payload)
+        encode_s = min(timeit.repeat(encode, number=5, repeat=3)) / 5
+        decode_s = min(timeit.repeat(lambda: orderbook_format.read(io.BytesIO(payload)), number=5, repeat=3)) / 5
+        print(f"{orderbook_format.name:>14} {len(payload):>10} {baseline / len(payload):>6.1f} "
+              f"{encode_s * 1e3:>12.2f} {decode_s * 1e3:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Cold-start import cost of the crawler, measured with `python -X importtime` in a fresh interpreter.
+
+Prints the total import time of the modules `main.py` loads, the slowest imports, and whether any of
+the heavy optional dependencies were loaded. With `--budget-ms`, exits non-zero if the total exceeds
+the budget, so it can guard against import-time regressions.
+
+Usage:
+    python -m benchmarks.bench_import_time [--budget-ms 400] [--top 15] [--repeat 5]
+"""
+import argparse
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+CRAWLER_MODULES = [
+    "dotenv", "src.background_tasks", "src.catalog", "src.models",
+    "src.orderbook", "src.scheduler", "src.upload_queue", "src.utils",
+]
+HEAVY_MODULES = ["boto3", "botocore", "psycopg2", "numpy", "pandas"]
+
+
+def import_times() -> Tuple[int, List[Tuple[int, str]], List[str]]:
+    """
+    Import the crawler modules in a fresh interpreter.
+
+    Returns:
+        Tuple[int, List[Tuple[int, str]], List[str]]: Total microseconds, (cumulative us, module) of every
+            imported module, and the heavy modules that ended up loaded.
+    """
+    code = (
+        f"import sys\nimport {', '.join(CRAWLER_MODULES)}\n"
+        f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    )
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True, check=True)
+    cumulative: Dict[str, int] = {}
+    total = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, raw_name = line[len("import time:"):].split("|")
+        name = raw_name.strip()
+        cumulative[name] = int(cumulative_us)
+        if raw_name.startswith(" ") and not raw_name.startswith("  "):  # top-level imports add up to the total
+            total += int(cumulative_us)
+    loaded = [m for m in result.stdout.strip().split(",") if m]
+    return total, sorted(((us, name) for name, us in cumulative.items()), reverse=True), loaded
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--budget-ms", type=float, default=None)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    runs = [import_times() for _ in range(args.repeat)]
+    best_total, top, loaded = min(runs)
+    print(f"crawler import time: {best_total / 1000:.1f}ms (best of {args.repeat})")
+    print(f"heavy modules loaded: {', '.join(loaded) or 'none'}")
+    print(f"{'cumulative [ms]':>16}  module")
+    for us, name in top[:args.top]:
+        print(f"{us / 1000:>16.1f}  {name}")
+
+    if args.budget_ms is not None and best_total / 1000 > args.budget_ms:
+        print(f"FAIL: import time exceeds the {args.budget_ms:.0f}ms budget")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
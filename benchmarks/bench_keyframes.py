@@ -0,0 +1,43 @@
+"""
+Keyframe interval tradeoff: file size vs. the latency of rebuilding the book at a random update.
+
+Usage:
+    python -m benchmarks.bench_keyframes [num_updates] [depth]
+"""
+import io
+import random
+import sys
+import timeit
+from unittest.mock import patch
+
+from benchmarks.synthetic import make_track
+from src.formats import get_orderbook_format, orderbook_levels_at, orderbook_track_to_dict
+from src.utils import get_config
+
+INTERVALS = [0, 10, 30, 60, 120]
+FORMATS = ["json", "json-gzip", "npz"]
+
+
+def main() -> None:
+    num_updates = int(sys.argv[1]) if len(sys.argv) > 1 else 240
+    depth = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    track, metadata = make_track(num_updates=num_updates, depth=depth)
+    targets = [random.Random(0).randrange(num_updates) for _ in range(200)]
+
+    print(f"{num_updates} updates, {depth} levels per side; interval 0 = no keyframes")
+    print(f"{'interval':>8} " + " ".join(f"{name + ' [B]':>14}" for name in FORMATS) + f" {'seek [us]':>10}")
+    for interval in INTERVALS:
+        sizes = []
+        for name in FORMATS:
+            buffer = io.BytesIO()
+            # Writers read the configured interval; the dictionary layout takes it explicitly
+            with patch.dict(get_config()["files"], keyframe_interval=interval):
+                get_orderbook_format(name).write(track, metadata, buffer)
+            sizes.append(len(buffer.getvalue()))
+        data = orderbook_track_to_dict(track, metadata, keyframe_interval=interval)
+        seek_s = min(timeit.repeat(lambda: [orderbook_levels_at(data, t) for t in targets], number=1, repeat=3))
+        print(f"{interval:>8} " + " ".join(f"{size:>14}" for size in sizes) + f" {seek_s / len(targets) * 1e6:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
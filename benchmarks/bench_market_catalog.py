@@ -0,0 +1,95 @@
+"""
+Market discovery: the former serial pandas implementation of btc_markets_from_gamma vs MarketCatalog.
+
+GAMMA is simulated in-process with a fixed latency per page, so only client-side work and
+request scheduling are measured.
+
+Usage:
+    python -m benchmarks.bench_market_catalog [num_markets] [page_latency_s]
+"""
+import json
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Tuple
+from unittest.mock import patch
+
+import pandas as pd
+
+from benchmarks.synthetic import make_gamma_markets
+from src import catalog
+from src.models import Gamma_Market
+from src.utils import safe_float
+
+PAGE_SIZE = 100
+
+
+def stub_gamma(listing: List[Dict[str, Any]], latency_s: float) -> Callable[..., Any]:
+    def fetch(url: str, retries: int = 2, backoff_factor: int = 2) -> Any:
+        offset = int(url.rsplit("offset=", 1)[1])
+        time.sleep(latency_s)
+        # Decoded JSON is a fresh object per request, like a real response
+        return json.loads(json.dumps(listing[offset:offset + PAGE_SIZE]))
+    return fetch
+
+
+def legacy_btc_markets_from_gamma(fetch: Callable[..., Any]) -> List[Gamma_Market]:
+    offset = 0
+    results = []
+    while True:
+        data = fetch(f"stub?limit=100&offset={offset}", retries=5, backoff_factor=2)
+        if not data:
+            break
+        for market in data:
+            results.append({
+                "id": market.get("id"),
+                "slug": market.get("slug"),
+                "conditionId": market.get("conditionId"),
+                "orderPriceMinTickSize": market.get("orderPriceMinTickSize"),
+                "orderMinSize": market.get("orderMinSize"),
+                "clobTokenIds": market.get("clobTokenIds"),
+            })
+        offset += 100
+        time.sleep(0.2)
+    df = pd.DataFrame(results)
+    filtered_df = df[df['slug'].str.contains("bitcoin", case=False, na=False)]
+    filtered_df = filtered_df[filtered_df['slug'].str.contains("hit|reach|above", case=False, na=False)]
+    filtered_df['clobTokenId'] = filtered_df['clobTokenIds'].apply(lambda x: int(json.loads(x)[0]))
+    return [
+        Gamma_Market(
+            id=row['id'], slug=row['slug'], conditionId=str(row.get('conditionId') or ""),
+            orderPriceMinTickSize=safe_float(row.get('orderPriceMinTickSize')),
+            orderMinSize=safe_float(row.get('orderMinSize')), clobTokenId=row['clobTokenId']
+        )
+        for _, row in filtered_df.iterrows()
+    ]
+
+
+def measure(fn: Callable[[], List[Gamma_Market]]) -> Tuple[float, int, int]:
+    tracemalloc.start()
+    start = time.perf_counter()
+    markets = fn()
+    elapsed = time.perf_counter() - start
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak_bytes, len(markets)
+
+
+def main() -> None:
+    num_markets = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    latency_s = float(sys.argv[2]) if len(sys.argv) > 2 else 0.02
+    fetch = stub_gamma(make_gamma_markets(num_markets), latency_s)
+
+    legacy = measure(lambda: legacy_btc_markets_from_gamma(fetch))
+    market_catalog = catalog.MarketCatalog(base_url="stub?limit=100", page_size=PAGE_SIZE)
+    with patch.object(catalog, "fetch_with_retries", side_effect=fetch):
+        current = measure(lambda: (market_catalog.refresh(), market_catalog.get_markets())[1])
+
+    print(f"{num_markets} markets, {latency_s * 1000:.0f}ms per page, {market_catalog.workers} workers")
+    print(f"{'implementation':>16} {'time [s]':>9} {'peak [MB]':>10} {'selected':>9}")
+    for name, (elapsed, peak_bytes, selected) in (("pandas (serial)", legacy), ("MarketCatalog", current)):
+        print(f"{name:>16} {elapsed:>9.2f} {peak_bytes / 1e6:>10.1f} {selected:>9}")
+
+
+if __name__ == "__main__":
+    main()
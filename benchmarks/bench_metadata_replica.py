@@ -0,0 +1,57 @@
+"""
+Research queries against the local metadata replica: "which files cover market X between t0 and t1".
+
+The replica is filled with synthetic rows (hourly files of `num_markets` markets over `num_days` days).
+
+Usage:
+    python -m benchmarks.bench_metadata_replica [num_markets] [num_days]
+"""
+import os
+import sys
+import tempfile
+import timeit
+from datetime import datetime, timedelta, timezone
+
+from src.database import METADATA_COLUMNS
+from src.metadata import METADATA_FIELDS, MetadataQuery, MetadataReplica
+
+
+def main() -> None:
+    num_markets = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    num_days = int(sys.argv[2]) if len(sys.argv) > 2 else 30
+    start = datetime(2024, 12, 1, tzinfo=timezone.utc)
+
+    with tempfile.TemporaryDirectory() as directory:
+        replica = MetadataReplica(os.path.join(directory, "metadata.sqlite3"))
+        rows = []
+        for market in range(num_markets):
+            for hour in range(24 * num_days):
+                moment = start + timedelta(hours=hour)
+                rows.append((
+                    str(500000 + market), moment.hour, moment.date().isoformat(), moment.isoformat(), f"will-bitcoin-hit-{market}k",
+                    "0xcondition", "123", moment.isoformat(), (moment + timedelta(minutes=59, seconds=45)).isoformat(), 240,
+                    0.01, 5.0, (moment + timedelta(hours=1)).isoformat(), f"orderbooks/hourly/{500000 + market}/file.json",
+                ))
+        replica._db.executemany(
+            f"INSERT INTO orderbook_metadata ({METADATA_COLUMNS}) VALUES ({', '.join('?' for _ in METADATA_FIELDS)})", rows
+        )
+        replica._db.commit()
+        replica._db.execute("ANALYZE")  # as after a sync
+
+        queries = {
+            "market, 6 hours": MetadataQuery(market_id="500042", start=start + timedelta(days=10), end=start + timedelta(days=10, hours=6)),
+            "market, 1 day": MetadataQuery(market_id="500042", start=start + timedelta(days=10), end=start + timedelta(days=11)),
+            "slug, 1 day": MetadataQuery(slug="will-bitcoin-hit-42k", start=start + timedelta(days=10), end=start + timedelta(days=11)),
+            "all markets, 1 hour": MetadataQuery(start=start + timedelta(days=10), end=start + timedelta(days=10, hours=1)),
+        }
+        print(f"{len(rows)} rows ({num_markets} markets x {num_days} days)")
+        print(f"{'query':>20} {'rows':>6} {'time [us]':>10}")
+        for name, query in queries.items():
+            count = len(list(replica.iter(query)))
+            elapsed = min(timeit.repeat(lambda: list(replica.iter(query)), number=100, repeat=3)) / 100
+            print(f"{name:>20} {count:>6} {elapsed * 1e6:>10.1f}")
+        replica.close()
+
+
+if __name__ == "__main__":
+    main()
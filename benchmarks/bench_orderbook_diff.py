@@ -0,0 +1,70 @@
+"""
+Micro-benchmark of the dict and vectorized order book diff engines, on list-backed
+(`Order_Book`) and array-backed (`Compact_Order_Book`) books.
+
+Usage:
+    python -m benchmarks.bench_orderbook_diff
+"""
+import random
+import timeit
+from typing import Callable, List, Tuple
+
+from src.models import Compact_Order_Book, Order_Book, OrderSummary
+from src.orderbook import orderbook_get_updates, orderbook_get_updates_vectorized
+
+DEPTHS = [10, 100, 1_000, 10_000]
+CHANGED_FRACTION = 0.1
+TICK_SIZE = 0.0001
+
+
+def make_books(depth: int, rng: random.Random) -> Tuple[Order_Book, Order_Book]:
+    """
+    Build two books of `depth` levels per side where about 10% of the levels changed.
+    """
+    def level(tick: int, size: float) -> OrderSummary:
+        return OrderSummary(price=float(f"{tick * TICK_SIZE:.4f}"), size=size)
+
+    bid_ticks = list(range(1, depth + 1))
+    ask_ticks = list(range(depth + 1, 2 * depth + 1))
+    old = Order_Book("m", "a", "t0", "h0", "t0",
+                     bids=[level(t, float(rng.randint(1, 100))) for t in bid_ticks],
+                     asks=[level(t, float(rng.randint(1, 100))) for t in ask_ticks])
+
+    def mutate(levels: List[OrderSummary]) -> List[OrderSummary]:
+        result: List[OrderSummary] = []
+        for summary in levels:
+            roll = rng.random()
+            if roll < CHANGED_FRACTION / 2:
+                continue  # removed
+            if roll < CHANGED_FRACTION:
+                result.append(OrderSummary(summary.price, summary.size + 1))  # modified
+            else:
+                result.append(summary)
+        return result
+
+    new = Order_Book("m", "a", "t1", "h1", "t1", bids=mutate(old.bids), asks=mutate(old.asks))
+    return old, new
+
+
+def bench(fn: Callable[[], object], number: int) -> float:
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number
+
+
+def main() -> None:
+    rng = random.Random(42)
+    print(f"{'depth':>8} {'dict [us]':>12} {'numpy [us]':>12} {'compact dict [us]':>18} {'compact numpy [us]':>19}")
+    for depth in DEPTHS:
+        old, new = make_books(depth, rng)
+        compact_old, compact_new = Compact_Order_Book.from_order_book(old), Compact_Order_Book.from_order_book(new)
+        number = max(1, 20_000 // depth)
+        timings = [
+            bench(lambda: orderbook_get_updates(old, new), number),
+            bench(lambda: orderbook_get_updates_vectorized(old, new, TICK_SIZE), number),
+            bench(lambda: orderbook_get_updates(compact_old, compact_new), number),
+            bench(lambda: orderbook_get_updates_vectorized(compact_old, compact_new, TICK_SIZE), number),
+        ]
+        print(f"{depth:>8} {timings[0] * 1e6:>12.1f} {timings[1] * 1e6:>12.1f} {timings[2] * 1e6:>18.1f} {timings[3] * 1e6:>19.1f}")
+
+
+if __name__ == "__main__":
+    main()
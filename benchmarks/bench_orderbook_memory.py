@@ -0,0 +1,66 @@
+"""
+Memory and allocation cost of list-backed vs array-backed order books.
+
+Usage:
+    python -m benchmarks.bench_orderbook_memory
+"""
+import timeit
+import tracemalloc
+from typing import Any, Callable, Dict
+
+from src.models import Order_Book, OrderSummary
+from src.orderbook import orderbook_from_clob_data
+
+DEPTHS = [10, 100, 1_000]
+
+
+def clob_response(depth: int) -> Dict[str, Any]:
+    return {
+        "market": "0xmarket",
+        "asset_id": "123",
+        "hash": "abc",
+        "timestamp": "1734394653982",
+        "bids": [{"price": f"{i / 1000:.3f}", "size": f"{i * 3}"} for i in range(1, depth + 1)],
+        "asks": [{"price": f"{(i + depth) / 1000:.3f}", "size": f"{i * 2}"} for i in range(1, depth + 1)],
+    }
+
+
+def list_backed(data: Dict[str, Any]) -> Order_Book:
+    """
+    The previous parse path, building one OrderSummary per level.
+    """
+    return Order_Book(
+        market=data["market"],
+        asset_id=data["asset_id"],
+        fetched_at="2024-12-17T00:00:00+00:00",
+        hash=data["hash"],
+        timestamp="2024-12-17T00:00:00+00:00",
+        bids=[OrderSummary(price=float(bid["price"]), size=float(bid["size"])) for bid in data["bids"]],
+        asks=[OrderSummary(price=float(ask["price"]), size=float(ask["size"])) for ask in data["asks"]],
+    )
+
+
+def retained_bytes(build: Callable[[], Any]) -> int:
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    obj = build()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    del obj
+    return sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+
+
+def main() -> None:
+    print(f"{'depth':>6} {'list [B]':>10} {'compact [B]':>12} {'ratio':>6} {'list parse [us]':>16} {'compact parse [us]':>19}")
+    for depth in DEPTHS:
+        data = clob_response(depth)
+        list_bytes = retained_bytes(lambda: list_backed(data))
+        compact_bytes = retained_bytes(lambda: orderbook_from_clob_data(data))
+        number = max(1, 20_000 // depth)
+        list_us = min(timeit.repeat(lambda: list_backed(data), number=number, repeat=5)) / number * 1e6
+        compact_us = min(timeit.repeat(lambda: orderbook_from_clob_data(data), number=number, repeat=5)) / number * 1e6
+        print(f"{depth:>6} {list_bytes:>10} {compact_bytes:>12} {list_bytes / compact_bytes:>6.1f} {list_us:>16.1f} {compact_us:>19.1f}")
+
+
+if __name__ == "__main__":
+    main()
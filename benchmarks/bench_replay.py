@@ -0,0 +1,93 @@
+"""
+Replaying a day of one market (24 hourly files of 15 s polls): the notebook's list-based
+reconstruction vs `src.replay.replay_market`.
+
+File reading is timed separately from the replay itself.
+
+Usage:
+    python -m benchmarks.bench_replay [num_updates_per_hour] [depth]
+"""
+import os
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+from benchmarks.synthetic import make_track
+from src.formats import get_orderbook_format, read_orderbook_file
+from src.models import OrderSummary
+from src.replay import replay_market, replay_orderbook_data
+from src.utils import get_config
+
+
+def notebook_replay(data: Dict[str, Any]) -> int:
+    """
+    The update loop of `process_orderbooks` in DEMO_access_and_convert_data.ipynb, without the price analytics.
+    """
+    bids = [OrderSummary(**bid) for bid in data["start_orderbook"]["bids"]]
+    asks = [OrderSummary(**ask) for ask in data["start_orderbook"]["asks"]]
+    states = 1
+    for update in data["updates"]:
+        for side_name in ("bids", "asks"):
+            side = bids if side_name == "bids" else asks
+            for level in update["changes"][side_name]:
+                price, size = level["price"], level["size"]
+                if size == 0:
+                    side[:] = [b for b in side if b.price != price]
+                else:
+                    updated = False
+                    for b in side:
+                        if b.price == price:
+                            b.size = size
+                            updated = True
+                    if not updated:
+                        side.append(OrderSummary(price=price, size=size))
+        # The notebook sorts both sides for every state
+        sorted(bids, key=lambda x: -x.price)
+        sorted(asks, key=lambda x: x.price)
+        states += 1
+    return states
+
+
+def timed(fn: Any) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    num_updates = int(sys.argv[1]) if len(sys.argv) > 1 else 240
+    depth = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    with tempfile.TemporaryDirectory() as directory:
+        paths: Dict[str, List[str]] = {"json": [], "npz": []}
+        for hour in range(24):
+            track, metadata = make_track(num_updates=num_updates, depth=depth, seed=hour, hour=hour)
+            for name in paths:
+                orderbook_format = get_orderbook_format(name)
+                path = os.path.join(directory, f"{track.id}-{track.date}-{hour}{orderbook_format.extension}")
+                with open(path, "wb") as f:
+                    orderbook_format.write(track, metadata, f)
+                paths[name].append(path)
+
+        read_s = timed(lambda: [read_orderbook_file(path) for path in paths["json"]])
+        files = [read_orderbook_file(path) for path in paths["json"]]
+        notebook_s = timed(lambda: [notebook_replay(data) for data in files])
+        replay_s = timed(lambda: [sum(1 for _ in replay_orderbook_data(data)) for data in files])
+        npz_s = timed(lambda: sum(1 for _ in replay_market(paths["npz"])))
+
+    states = 24 * (num_updates + 1)
+    keyframe_interval = get_config()["files"]["keyframe_interval"]
+    print(f"24 files x {num_updates} updates, {depth} levels per side, {states} states "
+          f"(keyframe_interval {keyframe_interval})")
+    print(f"{'replay':>32} {'time [ms]':>10}")
+    for name, elapsed in (
+        ("json.load of the files", read_s),
+        ("notebook lists", notebook_s),
+        ("ReplayBook (loaded json)", replay_s),
+        ("replay_market (npz, incl. read)", npz_s),
+    ):
+        print(f"{name:>32} {elapsed * 1e3:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Market selection on a synthetic catalog: pandas str.contains, rules interpreted per market,
+and the compiled MarketSelector.
+
+Usage:
+    python -m benchmarks.bench_selection [num_markets]
+"""
+import sys
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+import pandas as pd
+
+from benchmarks.synthetic import make_gamma_markets
+from src.selection import MarketSelector, SelectionRule, market_tags, market_volume
+
+RULES = {
+    "default": ([SelectionRule(slug_all=["bitcoin"], slug_any=["hit", "reach", "above"])], []),
+    "multi": (
+        [
+            SelectionRule(slug_all=["bitcoin"], slug_any=["hit", "reach", "above"]),
+            SelectionRule(slug_any=["eth", "solana"], tags_any=["crypto"], min_volume=1000),
+        ],
+        [SelectionRule(slug_any=["up-or-down"]), SelectionRule(max_volume=10)],
+    ),
+}
+
+
+def interpreted(include: List[SelectionRule], exclude: List[SelectionRule]) -> Callable[[Dict[str, Any]], bool]:
+    """
+    Evaluate the rules directly, without compiling them.
+    """
+    def rule_matches(rule: SelectionRule, market: Dict[str, Any]) -> bool:
+        slug = (market.get("slug") or "").lower()
+        volume = market_volume(market)
+        return (
+            all(s in slug for s in rule.slug_all)
+            and (not rule.slug_any or any(s in slug for s in rule.slug_any))
+            and (not rule.tags_any or any(tag in market_tags(market) for tag in (t.lower() for t in rule.tags_any)))
+            and (rule.min_volume is None or volume >= rule.min_volume)
+            and (rule.max_volume is None or volume <= rule.max_volume)
+        )
+    return lambda market: (
+        any(rule_matches(rule, market) for rule in include) and not any(rule_matches(rule, market) for rule in exclude)
+    )
+
+
+def pandas_default(markets: List[Dict[str, Any]]) -> int:
+    df = pd.DataFrame(markets)
+    df = df[df["slug"].str.contains("bitcoin", case=False, na=False)]
+    df = df[df["slug"].str.contains("hit|reach|above", case=False, na=False)]
+    return len(df)
+
+
+def timed(fn: Callable[[], int], repeat: int = 3) -> Tuple[float, int]:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        selected = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, selected
+
+
+def count_selected(matcher: Callable[[Dict[str, Any]], bool], markets: List[Dict[str, Any]]) -> Callable[[], int]:
+    return lambda: sum(1 for market in markets if matcher(market))
+
+
+def main() -> None:
+    num_markets = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    markets = make_gamma_markets(num_markets)
+    print(f"{num_markets} markets")
+    print(f"{'rules':>8} {'matcher':>12} {'time [ms]':>10} {'markets/s':>12} {'selected':>9}")
+    for name, (include, exclude) in RULES.items():
+        matchers: Dict[str, Callable[[Dict[str, Any]], bool]] = {
+            "interpreted": interpreted(include, exclude),
+            "compiled": MarketSelector(include, exclude),
+        }
+        results = {label: timed(count_selected(matcher, markets)) for label, matcher in matchers.items()}
+        if name == "default":
+            results = {"pandas": timed(lambda: pandas_default(markets)), **results}
+        for label, (elapsed, selected) in results.items():
+            print(f"{name:>8} {label:>12} {elapsed * 1000:>10.1f} {num_markets / elapsed:>12,.0f} {selected:>9}")
+
+
+if __name__ == "__main__":
+    main()
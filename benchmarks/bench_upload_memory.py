@@ -0,0 +1,45 @@
+"""
+Peak memory of encoding an hourly track: materialized dict + json.dumps vs the streaming writer.
+
+Usage:
+    python -m benchmarks.bench_upload_memory
+"""
+import io
+import json
+import tracemalloc
+from typing import Any, Callable
+
+from benchmarks.synthetic import make_track
+from src.formats import get_orderbook_format, orderbook_track_to_dict
+
+
+class NullSink(io.BytesIO):
+    def __init__(self) -> None:
+        super().__init__()
+        self.size = 0
+
+    def write(self, data: Any) -> int:
+        self.size += len(data)
+        return len(data)
+
+
+def peak(fn: Callable[[], object]) -> int:
+    tracemalloc.start()
+    fn()
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak_bytes
+
+
+def main() -> None:
+    print(f"{'updates':>8} {'file [B]':>10} {'materialized peak [B]':>22} {'streaming peak [B]':>19}")
+    for num_updates in (240, 2_400, 24_000):
+        track, metadata = make_track(num_updates=num_updates, depth=50)
+        sink = NullSink()
+        streaming = peak(lambda: get_orderbook_format("json").write(track, metadata, sink))
+        materialized = peak(lambda: json.dumps(orderbook_track_to_dict(track, metadata), indent=2).encode())
+        print(f"{num_updates:>8} {sink.size:>10} {materialized:>22} {streaming:>19}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Synthetic order book tracks for the benchmarks.
+"""
+import json
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Tuple
+
+from src.models import Compact_Order_Book, MetadataEntry, Orderbook_Track, UpdateLog
+from src.orderbook import orderbook_get_updates
+
+TICK_SIZE = 0.001
+
+
+def make_track(
+    num_updates: int = 240,
+    depth: int = 50,
+    changed_fraction: float = 0.1,
+    quiet_fraction: float = 0.5,
+    seed: int = 0,
+    market_id: str = "515539",
+    hour: int = 12
+) -> Tuple[Orderbook_Track, MetadataEntry]:
+    """
+    Build an hourly track with `num_updates` polls of a book with `depth` levels per side.
+
+    A `quiet_fraction` of the polls find the book unchanged; the others change about
+    `changed_fraction` of the levels.
+    """
+    rng = random.Random(seed)
+    start_time = datetime(2024, 12, 17, hour, tzinfo=timezone.utc)
+
+    def price(tick: int) -> float:
+        return round(tick * TICK_SIZE, 3)
+
+    bids = {price(t): float(rng.randint(5, 5000)) for t in range(500 - depth, 500)}
+    asks = {price(t): float(rng.randint(5, 5000)) for t in range(501, 501 + depth)}
+
+    def book(fetched_at: str) -> Compact_Order_Book:
+        return Compact_Order_Book(
+            "0xmarket", "123", fetched_at, fetched_at, fetched_at,
+            bid_prices=list(bids), bid_sizes=list(bids.values()),
+            ask_prices=list(asks), ask_sizes=list(asks.values()),
+        )
+
+    start = book(start_time.isoformat())
+    track = Orderbook_Track(
+        id=market_id, slug="will-bitcoin-hit", fetched_at=start.fetched_at, hour=hour, date=start_time.date().isoformat(),
+        start_orderbook=start, start_time_stamp=start.timestamp, condition_id="0xcondition",
+        order_price_min_tick_size=TICK_SIZE, order_min_size=5.0, clob_token_id=123, updates=UpdateLog()
+    )
+
+    previous = start
+    for i in range(1, num_updates + 1):
+        fetched_at = (start_time + timedelta(seconds=15 * i, microseconds=rng.randint(0, 999_999))).isoformat()
+        if rng.random() < quiet_fraction:
+            track.updates.append_no_change(fetched_at)
+            continue
+        for side in (bids, asks):
+            for level in rng.sample(list(side), max(1, int(len(side) * changed_fraction))):
+                if rng.random() < 0.2 and len(side) > 1:
+                    del side[level]
+                else:
+                    side[level] = float(rng.randint(5, 5000))
+        current = book(fetched_at)
+        track.updates.append(orderbook_get_updates(previous, current))
+        previous = current
+
+    metadata = MetadataEntry(
+        market_id=market_id, hour=hour, date=track.date, fetched_at=track.fetched_at, slug=track.slug,
+        condition_id=track.condition_id, clob_token_id=start.asset_id, start_time=track.start_time_stamp,
+        end_time=track.updates.last_timestamp() or track.start_time_stamp, num_updates=len(track.updates),
+        order_price_min_tick_size=TICK_SIZE, order_min_size=5.0, meta_generated_at=datetime.now(timezone.utc).isoformat(),
+    )
+    return track, metadata
+
+
+GAMMA_SLUGS = ["will-bitcoin-hit-{}k", "will-bitcoin-reach-{}k", "bitcoin-above-{}k", "will-eth-hit-{}k",
+               "fed-decision-{}", "bitcoin-up-or-down-{}", "will-trump-say-{}", "solana-above-{}"]
+GAMMA_TAGS = ["Crypto", "Bitcoin", "Politics", "Sports", "Economy"]
+
+
+def make_gamma_markets(num_markets: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """
+    Build a GAMMA /markets listing; one market in ten has a crypto/price style slug.
+    """
+    rng = random.Random(seed)
+    return [{
+        "id": str(i),
+        "slug": GAMMA_SLUGS[i // 10 % len(GAMMA_SLUGS)].format(i) if i % 10 == 0 else f"some-other-market-{i}",
+        "conditionId": f"0x{i:064x}",
+        "orderPriceMinTickSize": 0.01,
+        "orderMinSize": 5,
+        "clobTokenIds": json.dumps([str(10**20 + 2 * i), str(10**20 + 2 * i + 1)]),
+        "volumeNum": rng.lognormvariate(8, 2),
+        "tags": [{"label": tag, "slug": tag.lower()} for tag in rng.sample(GAMMA_TAGS, 2)],
+        "question": "x" * 200,  # GAMMA markets carry many more fields; pad to a realistic size
+        "description": "y" * 1000,
+    } for i in range(num_markets)]
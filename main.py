@@ -1,29 +1,28 @@
 
+import time
+PROCESS_START_S = time.perf_counter()  # before the imports below, to include them in the time to first poll
+
 from datetime import datetime, timedelta, timezone
-import os, queue, threading, time
-from typing import Any, Dict, List, Optional
+import os, queue, threading
+from typing import Dict, List, Optional, Tuple
 
 from dotenv import load_dotenv
-from src.background_tasks import thread_background_file_sender, thread_background_market_fetcher
-from src.fetcher import btc_markets_from_gamma
-from src.models import DatabaseConfig, Gamma_Market, Order_Book, Orderbook_Track, SpacesConfig 
-from src.orderbook import orderbook_fetch_and_add_updates, orderbook_initialize_orderbookTracks
-from src.utils import config, logger
+from src.background_tasks import (
+    thread_background_market_fetcher, thread_background_rollover_upload, thread_enqueue_all_orderbooks
+)
+from src.catalog import CatalogDiff, btc_markets_from_gamma
+from src.models import Book, DatabaseConfig, Gamma_Market, Orderbook_Track, SpacesConfig
+from src.orderbook import orderbook_fetch_and_add_updates, orderbook_initialize_orderbookTracks, orderbook_rollover_tracks
+from src.scheduler import TickScheduler
+from src.upload_queue import DurableUploadQueue
+from src.utils import get_config, init_config, logger, setup_logger
+
+IMPORTS_DONE_S = time.perf_counter()
 
 # ----- config ----- #
 
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '.env'))
 
-spaces_config: SpacesConfig  = SpacesConfig(
-    **{
-    "SPACES_ENDPOINT" : os.getenv("SPACES_ENDPOINT"),
-    "SPACES_ACCESS_KEY" : os.getenv("SPACES_ACCESS_KEY"),
-    "SPACES_SECRET_KEY" : os.getenv("SPACES_SECRET_KEY"),
-    "SPACES_BUCKET_NAME" : os.getenv("SPACES_BUCKET_NAME"),
-    "UPLOAD_WINDOW_S": config["spaces"]["upload_window_s"]
-    }
-)
-
 database_config: DatabaseConfig  = DatabaseConfig(
     **{
         "DB_HOST": os.getenv("DB_HOST", ""),
@@ -34,21 +33,28 @@ database_config: DatabaseConfig  = DatabaseConfig(
     }
 )
 
-
-
-
-MARKET_FETCH_INTERVAL_MIN = config["intervals"]["market_fetch_interval_min"]
-UPDATE_INTERVAL_S = config["intervals"]["update_interval_s"]
-
-gamma_markets_queue: queue.LifoQueue[Any] = queue.LifoQueue()
-file_uploading_queue: queue.LifoQueue[Any] = queue.LifoQueue()
+first_poll_done = False
 
 # ----- crawler ----- #
 
-def main() -> None:
+def main(file_uploading_queue: DurableUploadQueue) -> None:
     """
     Main loop to initialize, fetch, update, and upload order books at regular intervals.
 
+    A TickScheduler fires on every `intervals.update_interval_s` boundary of the wall clock and
+    drives the update, pre-fetch (from second 30 of the last minute of the cycle) and rollover
+    (first tick of a new hour) events. At the rollover the next hour's tracks are seeded from the
+    latest polled books and the closed hour is uploaded by a background thread, so the update of
+    the same tick runs on time.
+
+    The market queue shared with the background threads is created here. The durable upload queue
+    is passed in: it is opened once per process, as a restart of `main` would otherwise open a
+    second queue on the same SQLite file, replaying the tracks the first one still holds leased
+    for a running upload.
+
+    Args:
+        file_uploading_queue (DurableUploadQueue): Queue of the closed hours waiting for upload.
+
     Logs:
         INFO: Logs server startup and periodic status updates.
         DEBUG: Logs detailed debug information about thread execution and updates.
@@ -58,88 +64,126 @@ def main() -> None:
     Raises:
         Exception: If a fatal error occurs during the main execution loop.
     """
-    now: datetime =datetime.now(timezone.utc)
-    cycle_hour = (now.hour + 1 )%24
+    config = get_config()
+    market_fetch_interval_min = config["intervals"]["market_fetch_interval_min"]
+    spaces_config: SpacesConfig  = SpacesConfig(
+        **{
+        "SPACES_ENDPOINT" : os.getenv("SPACES_ENDPOINT"),
+        "SPACES_ACCESS_KEY" : os.getenv("SPACES_ACCESS_KEY"),
+        "SPACES_SECRET_KEY" : os.getenv("SPACES_SECRET_KEY"),
+        "SPACES_BUCKET_NAME" : os.getenv("SPACES_BUCKET_NAME"),
+        "UPLOAD_WINDOW_S": config["spaces"]["upload_window_s"]
+        }
+    )
+    gamma_markets_queue: queue.Queue[CatalogDiff] = queue.Queue()
 
     logger.info("Starting Polymarket Server...")
 
     # Fetch initial markets
     gamma_markets: List[Gamma_Market] = btc_markets_from_gamma()
-    if not gamma_markets:
+    while not gamma_markets:
         logger.warning("No markets found. Retrying in 60 seconds...")
         time.sleep(60)
-        return main()  # Restart the main loop if no markets are found
-    
+        gamma_markets = btc_markets_from_gamma()
+
+    now: datetime = datetime.now(timezone.utc)
     # Initialize order books and tracking
     current_orderbooks_track: Dict[str, Orderbook_Track]
-    track_latest_orderbook: Dict[str, Order_Book]
+    track_latest_orderbook: Dict[str, Book]
     cycle_hour = now.hour 
     cycle_date = now.date().isoformat()
     current_orderbooks_track, track_latest_orderbook = orderbook_initialize_orderbookTracks(gamma_markets, cycle_hour, cycle_date)
 
-    background_thread: Optional[threading.Thread] = None
-
-    while True:
-        now = datetime.now(timezone.utc)
-
-        # Every UPDATE_INTERVAL_S seconds, fetch updates for each market
-        if now.second % UPDATE_INTERVAL_S == 0:
-            if now.minute % MARKET_FETCH_INTERVAL_MIN != 0:
-                # Check if it's time to pre-fetch markets
-                if (
-                    now.minute % MARKET_FETCH_INTERVAL_MIN == (MARKET_FETCH_INTERVAL_MIN - 1)
-                    and now.second == 30
-                ):
-                    if background_thread is None or not background_thread.is_alive():
-                        logger.debug("Starting second thread for pre-fetching markets and saving order books.")
-                        background_thread = threading.Thread(
-                            target=thread_background_market_fetcher,
-                            args=(current_orderbooks_track,gamma_markets_queue, file_uploading_queue)
-                        )
-                        background_thread.start()
-
-
-                orderbook_fetch_and_add_updates(
-                    gamma_markets,
-                    current_orderbooks_track,
-                    track_latest_orderbook
-                    )
-
+    global first_poll_done
+    if not first_poll_done:
+        first_poll_done = True
+        logger.info(
+            f"Time to first poll: {time.perf_counter() - PROCESS_START_S:.2f}s "
+            f"(imports {IMPORTS_DONE_S - PROCESS_START_S:.2f}s)."
+        )
+
+    fetcher_thread: Optional[threading.Thread] = None
+    prefetched_cycle: Optional[Tuple[str, int]] = None
+    rollover_thread: Optional[threading.Thread] = None
+
+    def on_tick(tick: datetime) -> None:
+        """
+        Perform the work due at the scheduled boundary `tick`.
+
+        Events are derived from the boundary itself rather than the current time, and compared
+        with the cycle they last fired for, so each one fires exactly once per cycle even if the
+        tick starts late or the scheduler skipped the boundary it was due at. Nothing here waits
+        for a background thread: the tracks are double-buffered, and threads only exchange data
+        through queues.
+        """
+        nonlocal gamma_markets, current_orderbooks_track, track_latest_orderbook, fetcher_thread, rollover_thread
+        nonlocal cycle_hour, cycle_date, prefetched_cycle
+
+        tick_cycle = (tick.date().isoformat(), tick.hour)
+        if tick_cycle != (cycle_date, cycle_hour):
+            # First tick of a new hour, also when the scheduler skipped the one at second 0
+            if gamma_markets_queue.empty() and fetcher_thread is not None and fetcher_thread.is_alive():
+                logger.warning("Market pre-fetch still running, keeping the current markets for this cycle.")
+            while not gamma_markets_queue.empty():
+                # Only the added and removed markets change; the others keep their polled books
+                gamma_markets = gamma_markets_queue.get().apply(gamma_markets)
+
+            logger.info(f"Scheduler stats for the last cycle: {scheduler.lateness_stats()}")
+            closed_orderbooks_track = current_orderbooks_track
+            cycle_date, cycle_hour = tick_cycle
+            current_orderbooks_track, track_latest_orderbook = orderbook_rollover_tracks(
+                gamma_markets, track_latest_orderbook, cycle_hour, cycle_date, tick
+            )
+
+            if rollover_thread is not None and rollover_thread.is_alive():
+                # Only one uploader at a time: queue the closed hour, the next rollover uploads it
+                logger.warning("Previous upload is still running, queueing the closed hour without uploading it.")
+                threading.Thread(
+                    target=thread_enqueue_all_orderbooks,
+                    args=(closed_orderbooks_track, file_uploading_queue)
+                ).start()
             else:
-                # Refresh markets and reset order books at the start of a new cycle
-                if now.second == 0:
-                    if background_thread is not None:
-                        background_thread.join()  # Ensure thread completion before proceeding
-                        logger.debug("Fetcher-thread has completed.")
-                        if not gamma_markets_queue.empty():
-                            gamma_markets = gamma_markets_queue.get()
-
-                    cycle_hour = now.hour 
-                    cycle_date = now.date().isoformat()
-
-                    current_orderbooks_track, track_latest_orderbook = orderbook_initialize_orderbookTracks(gamma_markets, cycle_hour, cycle_date)
-
-                elif now.second == 30:
-                    if background_thread is None or not background_thread.is_alive():
-                        logger.debug("Starting sender thread.")
-                        background_thread = threading.Thread(
-                            target=thread_background_file_sender,
-                            args=(file_uploading_queue,spaces_config, database_config))
-                        background_thread.start()
-
-
-                orderbook_fetch_and_add_updates(
-                    gamma_markets,
-                    current_orderbooks_track,
-                    track_latest_orderbook
+                rollover_thread = threading.Thread(
+                    target=thread_background_rollover_upload,
+                    args=(closed_orderbooks_track, file_uploading_queue, spaces_config, database_config)
                 )
-        # Sleep briefly to avoid busy waiting
-        time.sleep(0.5)
+                rollover_thread.start()
+
+        elif (
+            prefetched_cycle != tick_cycle
+            and tick.minute % market_fetch_interval_min == (market_fetch_interval_min - 1)
+            and tick.second >= 30
+        ):
+            # Pre-fetch the markets of the next cycle once, from the first tick at or after second 30
+            prefetched_cycle = tick_cycle
+            if fetcher_thread is None or not fetcher_thread.is_alive():
+                logger.debug("Starting second thread for pre-fetching markets.")
+                fetcher_thread = threading.Thread(target=thread_background_market_fetcher, args=(gamma_markets_queue,))
+                fetcher_thread.start()
+
+        # Every tick, fetch updates for each market
+        orderbook_fetch_and_add_updates(
+            gamma_markets,
+            current_orderbooks_track,
+            track_latest_orderbook
+        )
+
+    scheduler = TickScheduler(
+        config["intervals"]["update_interval_s"],
+        policy=config["scheduler"]["policy"],
+        max_catch_up_ticks=config["scheduler"]["max_catch_up_ticks"],
+        lateness_history=config["scheduler"]["lateness_history"]
+    )
+    scheduler.run(on_tick)
 
 if __name__ == "__main__":
+    init_config()
+    setup_logger()
+    # Opened after `init_config`, and replays the uploads a previous process left behind
+    file_uploading_queue = DurableUploadQueue()
     while True:
         try:
-            main()
+            main(file_uploading_queue)
         except Exception as e:
             logger.critical(f"FATAL. Unexpected error: {e}. Restarting script in 60 seconds...")
             time.sleep(60)
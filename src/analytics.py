@@ -0,0 +1,351 @@
+"""
+Execution price and liquidity analytics over many replayed order book states at once.
+
+The states are stacked into `BookSnapshots`, one row of sizes per state and one column per
+price. Cumulative sums along the rows then give the average execution price of any order
+size, and the depth near the touch, for every state in a few array operations.
+"""
+from dataclasses import dataclass
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+from numpy.typing import NDArray
+
+from src.models import UpdateLog
+from src.replay import ReplayBook
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+@dataclass
+class BookSnapshots:
+    """
+    Order book states as (num_states, num_prices) size arrays; column j holds the size at `prices[j]`.
+
+    `prices` is increasing and only covers prices that have a level in some state.
+    """
+    timestamps: List[str]
+    prices: NDArray[np.float64]
+    bid_sizes: NDArray[np.float64]
+    ask_sizes: NDArray[np.float64]
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+
+# States copied into the dense buffer of `book_snapshots` before its empty price columns are dropped
+SNAPSHOT_BLOCK_STATES = 256
+
+# (tick size, grid indices of the occupied columns, bid sizes, ask sizes) of consecutive states
+_Block = Tuple[float, NDArray[np.int64], NDArray[np.float64], NDArray[np.float64]]
+
+
+def _occupied_block(tick_size: float, bids: NDArray[np.float64], asks: NDArray[np.float64]) -> _Block:
+    # Sizes are positive where there is a level, so a column's maximum is 0 only if it is empty
+    columns = np.flatnonzero(bids.max(axis=0) + asks.max(axis=0))
+    return tick_size, columns, bids[:, columns], asks[:, columns]
+
+
+def book_snapshots(books: Iterable[ReplayBook]) -> BookSnapshots:
+    """
+    Stack replayed book states, e.g. from `replay_market`; the books may be the same object updated in place.
+
+    The states are copied into a dense block of `SNAPSHOT_BLOCK_STATES` rows, and each full block
+    keeps only the price columns that have a level in one of its states, so memory follows the
+    occupied prices rather than the whole grid. States on different grids (a replay refines its
+    grid to finer files) are stacked on the finest one.
+    """
+    timestamps: List[str] = []
+    blocks: List[_Block] = []
+    tick_size = 0.0
+    bid_block: NDArray[np.float64] = np.empty((0, 0))
+    ask_block: NDArray[np.float64] = np.empty((0, 0))
+    filled = 0
+    for book in books:
+        if filled == len(bid_block) or book.tick_size != tick_size:
+            if filled:
+                blocks.append(_occupied_block(tick_size, bid_block[:filled], ask_block[:filled]))
+                filled = 0
+            if book.tick_size != tick_size:
+                tick_size = book.tick_size
+                bid_block = np.empty((SNAPSHOT_BLOCK_STATES, len(book.bid_sizes)))
+                ask_block = np.empty((SNAPSHOT_BLOCK_STATES, len(book.ask_sizes)))
+        bid_block[filled] = book.bid_sizes
+        ask_block[filled] = book.ask_sizes
+        filled += 1
+        timestamps.append(book.timestamp or "")
+    if not timestamps:
+        return BookSnapshots([], np.empty(0), np.empty((0, 0)), np.empty((0, 0)))
+    blocks.append(_occupied_block(tick_size, bid_block[:filled], ask_block[:filled]))
+
+    # Columns of coarser grids are spread onto the finest one
+    finest = min(block[0] for block in blocks)
+    block_columns = [block[1] * round(block[0] / finest) for block in blocks]
+    grid = np.unique(np.concatenate(block_columns))
+    bid_sizes = np.zeros((len(timestamps), len(grid)))
+    ask_sizes = np.zeros((len(timestamps), len(grid)))
+    row = 0
+    for (_, _, bids, asks), columns in zip(blocks, block_columns):
+        index = np.searchsorted(grid, columns)
+        bid_sizes[row:row + len(bids), index] = bids
+        ask_sizes[row:row + len(asks), index] = asks
+        row += len(bids)
+    return BookSnapshots(timestamps, grid * finest, bid_sizes, ask_sizes)
+
+
+def _hold_levels(
+    num_states: int,
+    file_rows: List[int],
+    rows: NDArray[np.int64],
+    columns: NDArray[np.int64],
+    sizes: NDArray[np.float64],
+    num_prices: int
+) -> NDArray[np.float64]:
+    # Each level set at (rows[i], columns[i]) holds down its column until the next level set
+    # there; every column restarts at 0 on the row of each start book
+    starts = np.array(file_rows, dtype=np.int64)
+    level_columns = np.concatenate([np.tile(np.arange(num_prices), len(starts)), columns])
+    level_rows = np.concatenate([np.repeat(starts, num_prices), rows])
+    level_sizes = np.concatenate([np.zeros(num_prices * len(starts)), sizes])
+    # Stable, so the resets come first and the last level set on a (row, column) wins
+    order = np.lexsort((level_rows, level_columns))
+    level_columns, level_rows, level_sizes = level_columns[order], level_rows[order], level_sizes[order]
+    last = np.ones(len(order), dtype=bool)
+    last[:-1] = (level_columns[1:] != level_columns[:-1]) | (level_rows[1:] != level_rows[:-1])
+    level_columns, level_rows, level_sizes = level_columns[last], level_rows[last], level_sizes[last]
+
+    ends = np.full(len(level_rows), num_states)
+    same_column = level_columns[1:] == level_columns[:-1]
+    ends[:-1][same_column] = level_rows[1:][same_column]
+    held = np.repeat(level_sizes, ends - level_rows).reshape(num_prices, num_states)
+    return np.ascontiguousarray(held.T)
+
+
+def snapshots_from_files(files: Iterable[Dict[str, Any]]) -> BookSnapshots:
+    """
+    Build the states of consecutive hourly files in the JSON layout (see `read_orderbook_file`).
+
+    Gives the states of `replay_market` without applying the levels one at a time: every level
+    of the start books and updates holds its size down its price column until the next change,
+    and the columns are written with one `np.repeat`. Each file restarts from its start book.
+    """
+    timestamps: List[str] = []
+    file_rows: List[int] = []
+    rows: List[int] = []
+    sides: List[int] = []
+    prices: List[float] = []
+    sizes: List[float] = []
+
+    def add_levels(row: int, levels: Dict[str, List[Dict[str, float]]]) -> None:
+        for side, name in ((UpdateLog.BID, "bids"), (UpdateLog.ASK, "asks")):
+            for level in levels[name]:
+                rows.append(row)
+                sides.append(side)
+                prices.append(level["price"])
+                sizes.append(level["size"])
+
+    for data in files:
+        file_rows.append(len(timestamps))
+        add_levels(len(timestamps), data["start_orderbook"])
+        timestamps.append(data["start_time_stamp"])
+        for record in data["updates"]:
+            add_levels(len(timestamps), record["changes"])
+            timestamps.append(record["timestamp"])
+
+    level_prices = np.array(prices, dtype=np.float64)
+    grid = np.unique(level_prices)
+    columns = np.searchsorted(grid, level_prices)
+    level_rows, level_sides, level_sizes = np.array(rows, dtype=np.int64), np.array(sides), np.array(sizes, dtype=np.float64)
+
+    def side_sizes(side: int) -> NDArray[np.float64]:
+        mask = level_sides == side
+        return _hold_levels(len(timestamps), file_rows, level_rows[mask], columns[mask], level_sizes[mask], len(grid))
+
+    return BookSnapshots(timestamps, grid, side_sizes(UpdateLog.BID), side_sizes(UpdateLog.ASK))
+
+
+def best_level(sizes: NDArray[np.float64]) -> NDArray[np.int64]:
+    """
+    Column of the best level of each state, for sizes ordered best first; -1 for an empty side.
+    """
+    present = sizes > 0
+    best: NDArray[np.int64] = np.where(present.any(axis=1), present.argmax(axis=1), -1)
+    return best
+
+
+def _cumulative(values: NDArray[np.float64]) -> NDArray[np.float64]:
+    # Column k holds the total of columns 0..k-1 of each row, so column 0 is 0
+    totals = np.zeros((values.shape[0], values.shape[1] + 1))
+    np.cumsum(values, axis=1, out=totals[:, 1:])
+    return totals
+
+
+def _from_best(
+    prices: NDArray[np.float64], sizes: NDArray[np.float64], best: NDArray[np.int64], start: int, stop: int
+) -> Tuple[NDArray[np.float64], NDArray[np.float64]]:
+    # Prices and sizes of columns start..stop-1 counted from the best level of each state; the
+    # sizes past the last price column and of an empty side are 0
+    index = best[:, None] + np.arange(start, stop)
+    inside = (best[:, None] >= 0) & (index < len(prices))
+    index = np.where(inside, index, 0)
+    return prices[index], np.where(inside, np.take_along_axis(sizes, index, axis=1), 0.0)
+
+
+def _near_touch(
+    prices: NDArray[np.float64],
+    sizes: NDArray[np.float64],
+    best: NDArray[np.int64],
+    max_order_size: float,
+    max_depth_ticks: int,
+    tick_size: float
+) -> Tuple[NDArray[np.float64], NDArray[np.float64]]:
+    # `_from_best` over as few columns as the largest order and the widest depth need in every
+    # state; orders fill near the touch, so this is usually a small part of the price grid
+    levels = np.count_nonzero(sizes, axis=1)
+    near_prices, near_sizes = _from_best(prices, sizes, best, 0, min(len(prices), 8))
+    while near_sizes.shape[1] < len(prices):
+        # A state is covered once it fills the largest order and passes the widest depth, or has no levels further out
+        reached = (near_sizes.sum(axis=1) >= max_order_size) & (
+            np.abs(near_prices[:, -1] - near_prices[:, 0]) / tick_size > max_depth_ticks + 1e-6
+        )
+        if np.all(reached | (np.count_nonzero(near_sizes, axis=1) == levels)):
+            break
+        columns = near_sizes.shape[1]
+        more_prices, more_sizes = _from_best(prices, sizes, best, columns, min(2 * columns, len(prices)))
+        near_prices, near_sizes = np.hstack((near_prices, more_prices)), np.hstack((near_sizes, more_sizes))
+    return near_prices, near_sizes
+
+
+def _vwap(
+    near_prices: NDArray[np.float64], near_sizes: NDArray[np.float64], order_sizes: Sequence[float]
+) -> NDArray[np.float64]:
+    # Over the columns of `_from_best`, so the prices are per state
+    num_states, num_prices = near_sizes.shape
+    result: NDArray[np.float64] = np.full((num_states, len(order_sizes)), np.nan)
+    if num_prices == 0:
+        return result
+    filled, notional = _cumulative(near_sizes), _cumulative(near_sizes * near_prices)
+
+    rows = np.arange(num_states)
+    for i, quantity in enumerate(order_sizes):
+        # The column that completes the order; num_prices if the side is too thin
+        last = (filled[:, 1:] < quantity).sum(axis=1)
+        fillable = last < num_prices
+        last = np.minimum(last, num_prices - 1)
+        cost = notional[rows, last] + (quantity - filled[rows, last]) * near_prices[rows, last]
+        result[:, i] = np.where(fillable, cost / quantity, np.nan)
+    return result
+
+
+def vwap(prices: NDArray[np.float64], sizes: NDArray[np.float64], order_sizes: Sequence[float]) -> NDArray[np.float64]:
+    """
+    Average execution price of market orders walking one side of every state.
+
+    Walk the asks to buy and the bids to sell.
+
+    Args:
+        prices: (num_prices,) prices of the columns, best first.
+        sizes: (num_states, num_prices) sizes of one side.
+        order_sizes: Order sizes in shares.
+
+    Returns:
+        NDArray: (num_states, len(order_sizes)) average prices; NaN where the side cannot fill the order.
+    """
+    return _vwap(*_from_best(prices, sizes, best_level(sizes), 0, len(prices)), order_sizes)
+
+
+def _depth_within(
+    near_prices: NDArray[np.float64], near_sizes: NDArray[np.float64], ticks: Sequence[int], tick_size: float
+) -> NDArray[np.float64]:
+    # Over the columns of `_from_best`: ticks from the best price of each state
+    offsets = np.abs(near_prices - near_prices[:, :1]) / tick_size
+    result: NDArray[np.float64] = np.zeros((len(near_sizes), len(ticks)))
+    for i, n in enumerate(ticks):
+        result[:, i] = np.where(offsets <= n + 1e-6, near_sizes, 0.0).sum(axis=1)
+    return result
+
+
+def depth_within(
+    prices: NDArray[np.float64], sizes: NDArray[np.float64], ticks: Sequence[int], tick_size: float
+) -> NDArray[np.float64]:
+    """
+    Shares resting within `ticks` ticks of the best price of one side (the best level counts as 0 ticks).
+
+    Args:
+        prices: (num_prices,) prices of the columns, best first.
+        sizes: (num_states, num_prices) sizes of one side.
+
+    Returns:
+        NDArray: (num_states, len(ticks)) depths; 0 for an empty side.
+    """
+    return _depth_within(*_from_best(prices, sizes, best_level(sizes), 0, len(prices)), ticks, tick_size)
+
+
+def _timestamp_index(timestamps: List[str]) -> "pd.DatetimeIndex":
+    import pandas as pd
+
+    if {timestamp[-6:] for timestamp in timestamps} == {"+00:00"}:
+        # The crawler writes UTC times; without the offset numpy parses them in one call
+        values = np.array([timestamp[:-6] for timestamp in timestamps], dtype="datetime64[us]")
+        return pd.DatetimeIndex(values, name="timestamp").tz_localize("UTC")
+    # Poll times with and without fractional seconds are mixed; pandas 2 infers one format from the first
+    return pd.DatetimeIndex(
+        pd.to_datetime([datetime.fromisoformat(timestamp) for timestamp in timestamps], utc=True),
+        name="timestamp"
+    )
+
+
+def book_analytics(
+    snapshots: BookSnapshots,
+    order_sizes: Sequence[float] = (100.0,),
+    depth_ticks: Sequence[int] = (5,),
+    tick_size: float = 0.01
+) -> "pd.DataFrame":
+    """
+    Spread, mid, average execution prices and depth of every state, as a DataFrame indexed by timestamp.
+
+    The best levels of each side are found once, and the orders and depths walk only the price
+    columns from the best level on that they reach, not the whole grid.
+
+    Args:
+        snapshots (BookSnapshots): The states, see `book_snapshots` and `snapshots_from_files`.
+        order_sizes (Sequence[float]): Order sizes for the `buy_vwap_<size>` (walking the asks)
+            and `sell_vwap_<size>` (walking the bids) columns.
+        depth_ticks (Sequence[int]): Distances for the `bid_depth_<n>` and `ask_depth_<n>` columns.
+        tick_size (float): Tick of the market (`order_price_min_tick_size`) the depths are measured in.
+    """
+    import pandas as pd  # analysis only; keeps pandas off the crawler's import path
+
+    prices = snapshots.prices
+    # Best first: bids from the highest price down, asks from the lowest up
+    bid_prices, bid_sizes = prices[::-1], snapshots.bid_sizes[:, ::-1]
+    ask_prices, ask_sizes = prices, snapshots.ask_sizes
+    max_order_size, max_depth_ticks = max(order_sizes, default=0.0), max(depth_ticks, default=0)
+    bid_best, ask_best = best_level(bid_sizes), best_level(ask_sizes)
+    bids = _near_touch(bid_prices, bid_sizes, bid_best, max_order_size, max_depth_ticks, tick_size)
+    asks = _near_touch(ask_prices, ask_sizes, ask_best, max_order_size, max_depth_ticks, tick_size)
+
+    def best_prices(side_prices: NDArray[np.float64], best: NDArray[np.int64]) -> NDArray[np.float64]:
+        return np.where(best >= 0, side_prices[np.maximum(best, 0)], np.nan) if len(side_prices) else np.full(len(best), np.nan)
+
+    best_bid = best_prices(bid_prices, bid_best)
+    best_ask = best_prices(ask_prices, ask_best)
+    columns = {
+        "best_bid": best_bid,
+        "best_ask": best_ask,
+        "spread": best_ask - best_bid,
+        "mid": (best_ask + best_bid) / 2,
+    }
+    buy, sell = _vwap(*asks, order_sizes), _vwap(*bids, order_sizes)
+    for i, size in enumerate(order_sizes):
+        columns[f"buy_vwap_{size:g}"] = buy[:, i]
+        columns[f"sell_vwap_{size:g}"] = sell[:, i]
+    bid_depth = _depth_within(*bids, depth_ticks, tick_size)
+    ask_depth = _depth_within(*asks, depth_ticks, tick_size)
+    for i, ticks in enumerate(depth_ticks):
+        columns[f"bid_depth_{ticks}"] = bid_depth[:, i]
+        columns[f"ask_depth_{ticks}"] = ask_depth[:, i]
+
+    return pd.DataFrame(columns, index=_timestamp_index(snapshots.timestamps))
@@ -1,15 +1,14 @@
-from datetime import datetime, timezone
-from queue import LifoQueue
-import time
-from typing import Any, Dict
-from src.fetcher import btc_markets_from_gamma
+from queue import Queue
+from typing import Dict
+from src.catalog import CatalogDiff, btc_market_changes_from_gamma
 from src.models import DatabaseConfig, Orderbook_Track, SpacesConfig
 from src.spaces import process_and_upload_orderbooks
+from src.upload_queue import DurableUploadQueue
 from src.utils import logger
 
 
 def thread_enqueue_all_orderbooks(
-        current_orderbooks_track: Dict[str, Orderbook_Track], file_uploading_queue: LifoQueue[Any]
+        current_orderbooks_track: Dict[str, Orderbook_Track], file_uploading_queue: DurableUploadQueue
         ) -> None:
     """
     Enqueue all order books into the file-uploading queue.
@@ -17,7 +16,7 @@ def thread_enqueue_all_orderbooks(
     Args:
         - current_orderbooks_track (Dict[str, Orderbook_Track]): 
             Dictionary of order books to enqueue, keyed by market ID.
-        - file_uploading_queue (Queue) with files that are for upload
+        - file_uploading_queue (DurableUploadQueue) with files that are for upload
 
     Side Effects:
         - Adds each order book to the `file_uploading_queue`.
@@ -35,53 +34,57 @@ def thread_enqueue_all_orderbooks(
     current_orderbooks_track.clear()
     logger.debug("Finished enqueuing all order books. Cleared in-memory storage.")
 
-def thread_background_market_fetcher(
-    current_orderbooks_track: Dict[str, Orderbook_Track], 
-    gamma_markets_queue: LifoQueue[Any], 
-    file_uploading_queue: LifoQueue[Any], 
-) -> None:
+def thread_background_market_fetcher(gamma_markets_queue: Queue[CatalogDiff]) -> None:
     """
-    Background thread to pre-fetch active markets and enqueue order books.
+    Background thread to pre-fetch the market changes for the next cycle.
 
-    Args:
-        - current_orderbooks_track (Dict[str, Orderbook_Track]): Current in-memory state of order books.
-        - gamma_markets_queue (LifoQueue): new BTC related markets for the next cycle
-        - cycle_hour int: this is the hour [0,23] for which the orderbook is fetched. It will be used for the naming.
+    The thread only talks to the GAMMA API and hands the added and removed markets over through
+    `gamma_markets_queue`; it never touches the order book tracks, which belong to the main loop.
+    Every diff is relative to the previous one, so the main loop applies all of them in order.
 
-    Side Effects:
-        - Updates `gamma_markets_queue` with pre-fetched markets.
-        - Enqueues finalized order books into the `file_uploading_queue`.
+    Args:
+        - gamma_markets_queue (Queue): added and removed BTC related markets for the next cycle
 
     Logs:
         DEBUG: Thread activity and progress.
-        INFO: Markets pre-fetched and order books enqueued.
+        INFO: Market changes pre-fetched.
     """
     logger.debug("Fetcher-thread started")
 
-    # Pre-fetch markets
-    new_gamma_markets = btc_markets_from_gamma()
-    if not new_gamma_markets:
+    # Pre-fetch market changes
+    market_changes = btc_market_changes_from_gamma()
+    if market_changes is None:
         logger.warning("No markets fetched from GAMMA API.")
         return
+    if not market_changes.added and not market_changes.removed:
+        logger.debug("No market changes for the next iteration.")
+        return
 
-    logger.debug(f"Pre-fetched {len(new_gamma_markets)} active markets on GAMMA")
-
-    # Wait until 57 seconds to ensure the final update occurs
-    while datetime.now(timezone.utc).second < 57:
-        time.sleep(0.5) 
-
-    # Create a snapshot of the final state of order books
-    snapshot_orderbooks = current_orderbooks_track.copy()
-    gamma_markets_queue.put(new_gamma_markets)
-    logger.info(f"Enqueued {len(new_gamma_markets)} markets for the next iteration.")
+    gamma_markets_queue.put(market_changes)
+    logger.info(
+        f"Enqueued market changes for the next iteration: +{len(market_changes.added)} / -{len(market_changes.removed)}."
+    )
 
-    # Save the snapshot of the order books
-    thread_enqueue_all_orderbooks(snapshot_orderbooks, file_uploading_queue)
-    logger.debug("Order books for upload have been enqueued.")
+def thread_background_rollover_upload(
+    closed_orderbooks_track: Dict[str, Orderbook_Track],
+    file_uploading_queue: DurableUploadQueue,
+    spaces_config: SpacesConfig,
+    database_config: DatabaseConfig
+) -> None:
+    """
+    Background thread that takes over the tracks of a closed hour: enqueue them, then upload the queue.
 
+    The main loop swaps in a fresh track dictionary at the hour boundary and never touches
+    `closed_orderbooks_track` again, so this thread owns it exclusively.
 
+    Logs:
+        DEBUG: Thread activity and progress.
+    """
+    logger.debug("Rollover-thread started")
+    thread_enqueue_all_orderbooks(closed_orderbooks_track, file_uploading_queue)
+    thread_background_file_sender(file_uploading_queue, spaces_config, database_config)
 
-def thread_background_file_sender(file_uploading_queue: LifoQueue[Any], spaces_config: SpacesConfig, database_config: DatabaseConfig ) -> None:
+def thread_background_file_sender(file_uploading_queue: DurableUploadQueue, spaces_config: SpacesConfig, database_config: DatabaseConfig ) -> None:
     """
     Background thread to process and upload order books to DigitalOcean Spaces.
 
@@ -0,0 +1,241 @@
+import json
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from src.fetcher import fetch_with_retries
+from src.models import Gamma_Market
+from src.selection import get_market_selector
+from src.utils import get_config, logger, safe_float
+
+
+def gamma_markets_from_api(market: Dict[str, Any], track_all_outcomes: bool = False) -> List[Gamma_Market]:
+    """
+    Build the Gamma_Market entries to track for a GAMMA API market.
+
+    By default only the first outcome token (YES) is tracked, under the market ID. With
+    `track_all_outcomes` every token gets its own entry; outcome `k > 0` is tracked under
+    `"<market id>_<k>"`, so its hourly files and metadata rows do not collide with the first outcome.
+
+    Returns:
+        List[Gamma_Market]: Empty if the market has no CLOB token IDs.
+    """
+    try:
+        clob_token_ids = [int(token_id) for token_id in json.loads(market["clobTokenIds"])]
+        if not clob_token_ids:
+            raise ValueError("empty clobTokenIds")
+    except (KeyError, TypeError, ValueError):
+        logger.warning(f"Skipping market {market.get('id')} without CLOB token IDs.")
+        return []
+    if not track_all_outcomes:
+        clob_token_ids = clob_token_ids[:1]
+    return [
+        Gamma_Market(
+            id=market["id"] if outcome_index == 0 else f"{market['id']}_{outcome_index}",
+            slug=market["slug"],
+            conditionId=str(market.get("conditionId") or ""),
+            orderPriceMinTickSize=safe_float(market.get("orderPriceMinTickSize")),
+            orderMinSize=safe_float(market.get("orderMinSize")),
+            clobTokenId=clob_token_id,
+            outcomeIndex=outcome_index
+        )
+        for outcome_index, clob_token_id in enumerate(clob_token_ids)
+    ]
+
+
+@dataclass
+class CatalogDiff:
+    added: List[Gamma_Market] = field(default_factory=list)
+    removed: List[Gamma_Market] = field(default_factory=list)
+    unchanged: int = 0
+
+    def apply(self, markets: List[Gamma_Market]) -> List[Gamma_Market]:
+        """
+        Return `markets` without the removed markets and with the added ones appended.
+
+        Added markets that are already in `markets` are not appended twice.
+        """
+        removed_ids = {market.id for market in self.removed}
+        kept = [market for market in markets if market.id not in removed_ids]
+        kept_ids = {market.id for market in kept}
+        return kept + [market for market in self.added if market.id not in kept_ids]
+
+
+class MarketCatalog:
+    """
+    Cached set of the GAMMA markets selected for tracking.
+
+    `refresh` pages through the open markets with up to `workers` requests in flight and
+    filters every page as it arrives, so only the selected markets are ever held in memory.
+    The result replaces the cache and is diffed against it, reporting added and removed markets.
+    """
+
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        page_size: Optional[int] = None,
+        workers: Optional[int] = None,
+        market_filter: Optional[Callable[[Dict[str, Any]], bool]] = None,
+        track_all_outcomes: Optional[bool] = None
+    ) -> None:
+        # Unset arguments come from config.json; the page size defaults to the `limit` of the base URL
+        self.base_url: str = base_url if base_url is not None else get_config()["api"]["gamma_markets_base_url"]
+        self.page_size = page_size if page_size is not None else int(
+            parse_qs(urlparse(self.base_url).query).get("limit", ["100"])[0]
+        )
+        self.workers: int = workers if workers is not None else get_config()["api"]["gamma_markets_fetch_workers"]
+        self.market_filter = market_filter if market_filter is not None else get_market_selector()
+        self.track_all_outcomes: bool = (
+            track_all_outcomes if track_all_outcomes is not None else get_config()["selection"]["track_all_outcomes"]
+        )
+        self.markets: Dict[str, Gamma_Market] = {}
+        self.last_refresh_s = 0.0
+        self.pages_fetched = 0
+        self._lock = threading.Lock()
+
+    def _fetch_page(self, offset: int) -> Tuple[List[Gamma_Market], int]:
+        """
+        Fetch one page and keep the selected markets; the raw page is dropped right away.
+
+        Returns:
+            Tuple[List[Gamma_Market], int]: The selected markets and the number of markets on the page.
+        """
+        data = fetch_with_retries(f"{self.base_url}&offset={offset}", retries=5, backoff_factor=2) or []
+        selected: List[Gamma_Market] = []
+        for market in data:
+            if self.market_filter(market):
+                selected.extend(gamma_markets_from_api(market, self.track_all_outcomes))
+        return selected, len(data)
+
+    def _fetch_all(self) -> List[Gamma_Market]:
+        """
+        Fetch and filter every page, keeping API order.
+
+        Offsets are handed out in order with up to `workers` pages in flight; the first empty
+        page marks the end of the listing and no offsets past it are requested.
+
+        Raises:
+            Exception: If a page fails after all retries.
+        """
+        pages: Dict[int, List[Gamma_Market]] = {}
+        end_offset: Optional[int] = None
+        next_offset = 0
+        in_flight: Dict[Future[Tuple[List[Gamma_Market], int]], int] = {}
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="gamma-fetch") as executor:
+            try:
+                while True:
+                    while len(in_flight) < self.workers and (end_offset is None or next_offset < end_offset):
+                        in_flight[executor.submit(self._fetch_page, next_offset)] = next_offset
+                        next_offset += self.page_size
+                    if not in_flight:
+                        break
+
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        offset = in_flight.pop(future)
+                        selected, num_markets = future.result()
+                        self.pages_fetched += 1
+                        if num_markets == 0:
+                            end_offset = offset if end_offset is None else min(end_offset, offset)
+                        pages[offset] = selected
+            except Exception:
+                for future in in_flight:
+                    future.cancel()
+                raise
+
+        return [market for offset in sorted(pages) if end_offset is None or offset < end_offset for market in pages[offset]]
+
+    def refresh(self) -> CatalogDiff:
+        """
+        Re-fetch the selected markets and diff them against the cache.
+
+        Returns:
+            CatalogDiff: Markets that appeared or disappeared since the last refresh.
+
+        Raises:
+            Exception: If the GAMMA API could not be reached; the cache is left unchanged.
+        """
+        start = time.monotonic()
+        markets = {market.id: market for market in self._fetch_all()}
+        with self._lock:
+            previous = self.markets
+            diff = CatalogDiff(
+                added=[market for market_id, market in markets.items() if market_id not in previous],
+                removed=[market for market_id, market in previous.items() if market_id not in markets],
+                unchanged=sum(1 for market_id in markets if market_id in previous),
+            )
+            self.markets = markets
+        self.last_refresh_s = time.monotonic() - start
+        logger.info(
+            f"Market catalog refreshed in {self.last_refresh_s:.2f}s: {len(markets)} markets "
+            f"(+{len(diff.added)} / -{len(diff.removed)})."
+        )
+        return diff
+
+    def get_markets(self) -> List[Gamma_Market]:
+        """
+        Return the cached markets in GAMMA API order.
+        """
+        with self._lock:
+            return list(self.markets.values())
+
+
+_catalog: Optional[MarketCatalog] = None
+_catalog_lock = threading.Lock()
+
+
+def get_market_catalog() -> MarketCatalog:
+    """
+    Return the process-wide market catalog, creating it on first use.
+    """
+    global _catalog
+    with _catalog_lock:
+        if _catalog is None:
+            _catalog = MarketCatalog()
+        return _catalog
+
+
+def btc_markets_from_gamma() -> List[Gamma_Market]:
+    """
+    Fetch all active markets from the GAMMA API, filtering for relevant tokens.
+
+    Filters:
+        - The include and exclude rules of `selection` in config.json
+          (by default: "bitcoin" in the slug plus one of "hit", "reach", "above").
+
+    Returns:
+        list[Gamma_Market]: The selected markets, or an empty list if the GAMMA API could not be reached.
+
+    Logs:
+        INFO: Successful market fetch and filtering.
+        ERROR: Failures during API calls or data parsing.
+    """
+    logger.info("Starting on GAMMA fetching active markets")
+    catalog = get_market_catalog()
+    try:
+        catalog.refresh()
+    except Exception as e:
+        logger.error(f"Failed to fetch data from GAMMA API after retries: {e}")
+        return []
+    return catalog.get_markets()
+
+
+def btc_market_changes_from_gamma() -> Optional[CatalogDiff]:
+    """
+    Refresh the market catalog and report the markets that appeared or disappeared since the last refresh.
+
+    Returns:
+        Optional[CatalogDiff]: The changes, or None if the GAMMA API could not be reached.
+
+    Logs:
+        ERROR: Failures during API calls or data parsing.
+    """
+    try:
+        return get_market_catalog().refresh()
+    except Exception as e:
+        logger.error(f"Failed to fetch data from GAMMA API after retries: {e}")
+        return None
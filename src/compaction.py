@@ -0,0 +1,268 @@
+"""
+Daily compaction of the hourly files into one file per market and day.
+
+`compact_day` rewrites the hourly files of a past day as day files (see `write_day_npz`),
+registers them in `orderbook_daily` and, optionally, retires the hourly objects: their
+`orderbook_metadata` rows are pointed at the day file and the objects are deleted.
+
+The job is idempotent and resumable: a market-day whose registered hours match its metadata
+is skipped, so a rerun only does the work an interrupted run left, and an hour uploaded late
+triggers a recompaction that includes it.
+"""
+import io
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import date, datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from src.database import pooled_db_connection
+from src.downloader import OrderbookCache, download_orderbook_files
+from src.formats import DAY_FILE_EXTENSION, read_day_npz, read_orderbook_file, write_day_npz
+from src.metadata import MetadataQuery, iter_metadata
+from src.models import DatabaseConfig, SpacesConfig
+from src.spaces import get_spaces_client_manager
+from src.utils import get_config, logger
+
+DAILY_TABLE = (
+    "CREATE TABLE IF NOT EXISTS orderbook_daily ("
+    "market_id TEXT NOT NULL, date DATE NOT NULL, file_path TEXT NOT NULL, hours INTEGER[] NOT NULL, "
+    "hourly_paths TEXT[] NOT NULL, num_updates BIGINT NOT NULL, num_bytes BIGINT NOT NULL, "
+    "compacted_at TIMESTAMPTZ NOT NULL, retired_at TIMESTAMPTZ, PRIMARY KEY (market_id, date))"
+)
+
+
+def daily_file_path(market_id: str, day: str) -> str:
+    return f"orderbooks/daily/{market_id}/{market_id}-{day}{DAY_FILE_EXTENSION}"
+
+
+@dataclass
+class CompactionResult:
+    market_id: str
+    status: str  # "skipped", "compacted", "retired" or "failed"
+    hours: int = 0
+    num_bytes: int = 0
+
+
+def ensure_daily_table(database_config: DatabaseConfig) -> None:
+    """
+    Create the `orderbook_daily` table, which registers the day files, if it is missing.
+    """
+    with pooled_db_connection(database_config) as conn:
+        with conn.cursor() as cur:
+            cur.execute(DAILY_TABLE)
+        conn.commit()
+
+def fetch_daily_entries(database_config: DatabaseConfig, day: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Return the registered day files of `day`, by market_id.
+    """
+    with pooled_db_connection(database_config) as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT market_id, file_path, hours, hourly_paths, retired_at FROM orderbook_daily WHERE date = %s",
+                (day,)
+            )
+            rows = cur.fetchall()
+        conn.commit()
+    return {row["market_id"]: dict(row) for row in rows}
+
+def register_daily_file(
+    database_config: DatabaseConfig,
+    market_id: str,
+    day: str,
+    file_path: str,
+    hours: List[int],
+    hourly_paths: List[str],
+    num_updates: int,
+    num_bytes: int
+) -> None:
+    """
+    Insert or replace the `orderbook_daily` row of a day file; a recompacted file is not retired yet.
+    """
+    with pooled_db_connection(database_config) as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "INSERT INTO orderbook_daily "
+                "(market_id, date, file_path, hours, hourly_paths, num_updates, num_bytes, compacted_at, retired_at) "
+                "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, NULL) "
+                "ON CONFLICT (market_id, date) DO UPDATE SET file_path = excluded.file_path, hours = excluded.hours, "
+                "hourly_paths = excluded.hourly_paths, num_updates = excluded.num_updates, "
+                "num_bytes = excluded.num_bytes, compacted_at = excluded.compacted_at, retired_at = NULL",
+                (market_id, day, file_path, hours, hourly_paths, num_updates, num_bytes, datetime.now(timezone.utc))
+            )
+        conn.commit()
+
+def point_metadata_to_daily_file(
+    database_config: DatabaseConfig, market_id: str, day: str, hours: List[int], file_path: str
+) -> None:
+    """
+    Point the `orderbook_metadata` rows of the given hours of a market-day at its day file.
+
+    Only the hours in the day file are repointed; an hour uploaded since keeps its hourly file.
+    """
+    with pooled_db_connection(database_config) as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "UPDATE orderbook_metadata SET file_path = %s WHERE market_id = %s AND date = %s AND hour = ANY(%s)",
+                (file_path, market_id, day, hours)
+            )
+        conn.commit()
+
+def mark_retired(database_config: DatabaseConfig, market_id: str, day: str) -> None:
+    with pooled_db_connection(database_config) as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "UPDATE orderbook_daily SET retired_at = %s WHERE market_id = %s AND date = %s",
+                (datetime.now(timezone.utc), market_id, day)
+            )
+        conn.commit()
+
+
+def _retire_hourly_files(
+    market_id: str, day: str, file_path: str, hours: List[int], hourly_paths: List[str],
+    spaces_config: SpacesConfig, database_config: DatabaseConfig
+) -> None:
+    # Readers are redirected before the objects go; `retired_at` is set last, so an interrupted
+    # retirement is redone, and deleting an object that is already gone succeeds
+    point_metadata_to_daily_file(database_config, market_id, day, hours, file_path)
+    client_manager = get_spaces_client_manager(spaces_config)
+    for first in range(0, len(hourly_paths), 1000):  # the request limit of DeleteObjects
+        client = client_manager.get_client()
+        try:
+            client.delete_objects(
+                Bucket=spaces_config.SPACES_BUCKET_NAME,
+                Delete={"Objects": [{"Key": key} for key in hourly_paths[first:first + 1000]], "Quiet": True}
+            )
+        except Exception:
+            client_manager.invalidate(client)
+            raise
+    mark_retired(database_config, market_id, day)
+    logger.info(f"Retired {len(hourly_paths)} hourly files of market {market_id} on {day}.")
+
+
+def compact_market_day(
+    market_id: str,
+    day: str,
+    rows: List[Dict[str, Any]],
+    entry: Optional[Dict[str, Any]],
+    spaces_config: SpacesConfig,
+    database_config: DatabaseConfig,
+    retire: bool,
+    cache: OrderbookCache
+) -> CompactionResult:
+    """
+    Compact one market-day, given its `orderbook_metadata` rows and its `orderbook_daily` row (None if not compacted).
+    """
+    hours = sorted(row["hour"] for row in rows)
+    file_path = daily_file_path(market_id, day)
+    if entry is not None and sorted(entry["hours"]) == hours:
+        if not retire or entry["retired_at"] is not None:
+            return CompactionResult(market_id, "skipped", len(hours))
+        _retire_hourly_files(
+            market_id, day, file_path, hours, list(entry["hourly_paths"]), spaces_config, database_config
+        )
+        return CompactionResult(market_id, "retired", len(hours))
+
+    # Hours retired by an earlier run only exist in the current day file
+    hourly_paths = [row["file_path"] for row in rows if not row["file_path"].endswith(DAY_FILE_EXTENSION)]
+    retired_hours = [row["hour"] for row in rows if row["file_path"].endswith(DAY_FILE_EXTENSION)]
+    # Markets compact in parallel over one cache: keep this market's files until they are read
+    with cache.pinned([*hourly_paths, file_path]):
+        local_paths = download_orderbook_files(hourly_paths, spaces_config, cache)
+        if retired_hours:
+            # The day file is rewritten by every compaction, so a cached copy is checked first
+            local_paths.update(download_orderbook_files([file_path], spaces_config, cache, revalidate=True))
+        missing = [path for path in hourly_paths if path not in local_paths]
+        if missing or (retired_hours and file_path not in local_paths):
+            logger.error(f"Cannot compact market {market_id} on {day}: {len(missing)} files could not be downloaded.")
+            return CompactionResult(market_id, "failed")
+
+        hour_data: List[Dict[str, Any]] = [read_orderbook_file(local_paths[path]) for path in hourly_paths]
+        if retired_hours:
+            with open(local_paths[file_path], "rb") as f:
+                hour_data.extend(read_day_npz(f, retired_hours).values())
+    if sorted(data["hour"] for data in hour_data) != hours:
+        logger.error(f"Cannot compact market {market_id} on {day}: the files do not hold hours {hours}.")
+        return CompactionResult(market_id, "failed")
+
+    payload = io.BytesIO()
+    write_day_npz(hour_data, payload)
+    num_bytes = payload.tell()
+    client_manager = get_spaces_client_manager(spaces_config)
+    client = client_manager.get_client()
+    try:
+        payload.seek(0)
+        client.upload_fileobj(payload, spaces_config.SPACES_BUCKET_NAME, file_path)
+    except Exception:
+        client_manager.invalidate(client)
+        raise
+
+    num_updates = sum(len(data["updates"]) for data in hour_data)
+    register_daily_file(database_config, market_id, day, file_path, hours, hourly_paths, num_updates, num_bytes)
+    logger.info(f"Compacted {len(hours)} hours of market {market_id} on {day} into {file_path} ({num_bytes} bytes).")
+    if retire:
+        _retire_hourly_files(market_id, day, file_path, hours, hourly_paths, spaces_config, database_config)
+    return CompactionResult(market_id, "compacted", len(hours), num_bytes)
+
+
+def compact_day(
+    day: date,
+    spaces_config: SpacesConfig,
+    database_config: DatabaseConfig,
+    retire: Optional[bool] = None,
+    max_workers: Optional[int] = None,
+    cache: Optional[OrderbookCache] = None
+) -> List[CompactionResult]:
+    """
+    Compact the hourly files of every market on a past UTC day into day files.
+
+    Markets are compacted in parallel, up to `max_workers` at a time. Reruns skip the markets
+    already compacted (and retired, with `retire`), so an interrupted run is resumed by running
+    it again; a market that failed is retried.
+
+    Args:
+        day (date): The UTC day; must be before today, whose hours are still being written.
+        spaces_config (SpacesConfig): Spaces credentials and bucket.
+        database_config (DatabaseConfig): The database configuration.
+        retire (Optional[bool]): Delete the hourly objects once their day file is registered;
+            defaults to `compaction.retire_hourly`.
+        max_workers (Optional[int]): Maximum number of markets compacted at a time; defaults to
+            `compaction.max_workers`.
+        cache (Optional[OrderbookCache]): Cache for the downloaded hourly files.
+
+    Returns:
+        List[CompactionResult]: One result per market, by market_id.
+
+    Raises:
+        ValueError: If `day` is not in the past.
+    """
+    if day >= datetime.now(timezone.utc).date():
+        raise ValueError(f"Cannot compact {day}: only past days are complete")
+    compaction_config = get_config()["compaction"]
+    retire = compaction_config["retire_hourly"] if retire is None else retire
+    max_workers = compaction_config["max_workers"] if max_workers is None else max_workers
+    day_iso = day.isoformat()
+    ensure_daily_table(database_config)
+
+    markets: Dict[str, List[Dict[str, Any]]] = {}
+    for row in iter_metadata(database_config, MetadataQuery(date=day_iso)):
+        markets.setdefault(row["market_id"], []).append(row)
+    entries = fetch_daily_entries(database_config, day_iso)
+    cache = cache or OrderbookCache()
+
+    def worker(market_id: str) -> CompactionResult:
+        try:
+            return compact_market_day(
+                market_id, day_iso, markets[market_id], entries.get(market_id),
+                spaces_config, database_config, retire, cache
+            )
+        except Exception as e:
+            logger.error(f"Failed to compact market {market_id} on {day_iso}: {e}")
+            return CompactionResult(market_id, "failed")
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(worker, sorted(markets)))
+
+    counts = {status: sum(result.status == status for result in results) for status in ("compacted", "retired", "skipped", "failed")}
+    logger.info(f"Compaction of {day_iso}: {', '.join(f'{n} {status}' for status, n in counts.items())}.")
+    return results
@@ -1,13 +1,27 @@
-from typing import Any
-import psycopg2
-from psycopg2.extras import RealDictCursor
-import os
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
 from src.models import DatabaseConfig, MetadataEntry
-import psycopg2
-from psycopg2.extras import RealDictCursor
-from typing import Any
-from src.models import DatabaseConfig
-from src.utils import logger
+from src.utils import get_config, logger
+
+METADATA_COLUMNS = (
+    "market_id, hour, date, fetched_at, slug, condition_id, clob_token_id, start_time, "
+    "end_time, num_updates, order_price_min_tick_size, order_min_size, generated_at, file_path"
+)
+
+def _db_connection_kwargs(database_config: DatabaseConfig) -> Dict[str, Any]:
+    # psycopg2 is imported where it is used, so the crawler does not load it before the first upload
+    from psycopg2.extras import RealDictCursor
+
+    return dict(
+        dbname=database_config.DB_NAME,
+        user=database_config.DB_USER,
+        password=database_config.DB_PASSWORD,
+        host=database_config.DB_HOST,
+        port=database_config.DB_PORT,
+        sslmode="require",
+        cursor_factory=RealDictCursor
+    )
 
 def get_db_connection(database_config: DatabaseConfig) -> Any:
     """
@@ -17,23 +31,82 @@ def get_db_connection(database_config: DatabaseConfig) -> Any:
     Returns:
         A psycopg2 connection object.
     """
+    import psycopg2
+
     try:
-        conn = psycopg2.connect(
-            dbname=database_config.DB_NAME,
-            user=database_config.DB_USER,
-            password=database_config.DB_PASSWORD,
-            host=database_config.DB_HOST,
-            port=database_config.DB_PORT,
-            sslmode="require",
-            cursor_factory=RealDictCursor
-        )
+        conn = psycopg2.connect(**_db_connection_kwargs(database_config))
         logger.debug("Successfully connected to the database.")
         return conn
     except psycopg2.Error as e:
         logger.critical(f"Error connecting to the database: {e}")
         raise
 
+_db_pool: Optional[Any] = None
+_db_pool_config: Optional[DatabaseConfig] = None
+_db_pool_lock = threading.Lock()
+
+def get_db_pool(database_config: DatabaseConfig) -> Any:
+    """
+    Return the process-wide connection pool, creating it on first use.
+
+    The pool keeps up to `database.pool_max_connections` SSL connections open, so inserts no
+    longer pay for a TCP and TLS handshake every time. It is safe to share between threads.
+    """
+    import psycopg2
+    from psycopg2.pool import ThreadedConnectionPool
+
+    global _db_pool, _db_pool_config
+    pool_config = get_config()["database"]
+    with _db_pool_lock:
+        if _db_pool is None or _db_pool.closed or _db_pool_config != database_config:
+            try:
+                _db_pool = ThreadedConnectionPool(
+                    pool_config["pool_min_connections"], pool_config["pool_max_connections"],
+                    **_db_connection_kwargs(database_config)
+                )
+            except psycopg2.Error as e:
+                logger.critical(f"Error creating the database connection pool: {e}")
+                raise
+            _db_pool_config = database_config
+            logger.debug(f"Database connection pool created (max {pool_config['pool_max_connections']} connections).")
+        return _db_pool
 
+@contextmanager
+def pooled_db_connection(database_config: DatabaseConfig) -> Iterator[Any]:
+    """
+    Borrow a connection from the pool and return it afterwards.
+
+    The transaction is rolled back if the block raises; a connection that was closed
+    (e.g. by a server restart) is discarded instead of being returned to the pool.
+    """
+    pool = get_db_pool(database_config)
+    conn = pool.getconn()
+    try:
+        yield conn
+    except Exception:
+        if not conn.closed:
+            conn.rollback()
+        raise
+    finally:
+        pool.putconn(conn, close=bool(conn.closed))
+
+def _metadata_row(metadata: MetadataEntry, file_path: str) -> Tuple[Any, ...]:
+    return (
+        metadata.market_id,
+        metadata.hour,
+        metadata.date,
+        metadata.fetched_at,
+        metadata.slug,
+        metadata.condition_id,
+        metadata.clob_token_id,
+        metadata.start_time,
+        metadata.end_time,
+        metadata.num_updates,
+        metadata.order_price_min_tick_size,
+        metadata.order_min_size,
+        metadata.meta_generated_at,
+        file_path
+    )
 
 def insert_metadata(
         metadata: MetadataEntry,
@@ -47,40 +120,57 @@ def insert_metadata(
         metadata (MetadataEntry): The metadata entry to insert.
         file_path (str): The file path of the uploaded orderbook.
 
+    Logs:
+        CRITICAL: If the insert failed; the error is not raised, unlike `insert_metadata_batch`.
+
     Notes:
         This function enforces a unique constraint on (market_id, date, hour).
         Duplicate entries for the same market and hour are ignored.
     """
-    query = """
-    INSERT INTO orderbook_metadata (
-        market_id, hour, date, fetched_at, slug, condition_id, clob_token_id, start_time, 
-        end_time, num_updates, order_price_min_tick_size, order_min_size, generated_at, file_path
-    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+    try:
+        insert_metadata_batch([(metadata, file_path)], database_config)
+        logger.debug(f"Successful upload: {metadata.market_id}")
+    except Exception as e:
+        logger.critical(f"Failed to upload: {e}")
+
+def insert_metadata_batch(
+        entries: Sequence[Tuple[MetadataEntry, str]],
+        database_config: DatabaseConfig
+        ) -> int:
+    """
+    Insert the metadata entries of a whole upload cycle in one statement (one round trip).
+
+    Args:
+        entries (Sequence[Tuple[MetadataEntry, str]]): Metadata entries and the file paths of their uploaded orderbooks.
+        database_config (DatabaseConfig): The database configuration.
+
+    Returns:
+        int: Number of rows inserted; duplicates count as 0.
+
+    Raises:
+        Exception: If the batch could not be inserted; nothing of it was committed.
+
+    Notes:
+        Same semantics as `insert_metadata`: entries whose (market_id, date, hour) already
+        exists are ignored by `ON CONFLICT (market_id, date, hour) DO NOTHING`.
+    """
+    if not entries:
+        return 0
+    from psycopg2.extras import execute_values
+
+    query = f"""
+    INSERT INTO orderbook_metadata ({METADATA_COLUMNS}) VALUES %s
     ON CONFLICT (market_id, date, hour) DO NOTHING;
     """
-    conn = get_db_connection(database_config)
+    rows: List[Tuple[Any, ...]] = [_metadata_row(metadata, file_path) for metadata, file_path in entries]
     try:
-        
-        with conn.cursor() as cur:
-            cur.execute(query, (
-                metadata.market_id,
-                metadata.hour,
-                metadata.date,
-                metadata.fetched_at,
-                metadata.slug,
-                metadata.condition_id,
-                metadata.clob_token_id,
-                metadata.start_time,
-                metadata.end_time,
-                metadata.num_updates,
-                metadata.order_price_min_tick_size,
-                metadata.order_min_size,
-                metadata.meta_generated_at,
-                file_path
-            ))
+        with pooled_db_connection(database_config) as conn:
+            with conn.cursor() as cur:
+                execute_values(cur, query, rows, page_size=len(rows))
+                inserted: int = max(cur.rowcount, 0)
             conn.commit()
-            logger.debug(f"Successful upload: {metadata.market_id}")
+        logger.debug(f"Successful upload of {inserted}/{len(rows)} metadata entries.")
+        return inserted
     except Exception as e:
-        logger.critical(f"Failed to upload: {e}")
-    finally:
-        conn.close()
+        logger.critical(f"Failed to upload {len(rows)} metadata entries: {e}")
+        raise
@@ -0,0 +1,290 @@
+import hashlib
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from src.models import SpacesConfig
+from src.spaces import get_spaces_client_manager
+from src.utils import get_config, logger
+
+
+class OrderbookCache:
+    """
+    Local cache of downloaded hourly files, bounded by total size with least-recently-used eviction.
+
+    Files are stored content-addressed under `objects/`, named by the hash of their remote path
+    and ETag, so a re-uploaded object never overwrites the cached copy of an older version. Each
+    current version is also linked at its remote path (`orderbooks/hourly/<market_id>/<file>`),
+    mirroring the bucket layout. The index of cached files and their last access lives in a
+    SQLite file next to them, so the cache survives restarts.
+
+    Files `pinned` by a running batch are not evicted, so the cache can exceed `max_bytes`
+    while a batch needs more than fits.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, max_bytes: Optional[int] = None) -> None:
+        downloads_config = get_config()["downloads"]
+        cache_dir = downloads_config["cache_dir"] if cache_dir is None else cache_dir
+        self.cache_dir: str = cache_dir
+        self.max_bytes: int = downloads_config["cache_max_bytes"] if max_bytes is None else max_bytes
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._pins: Dict[str, int] = {}  # remote path -> number of batches using it
+        os.makedirs(os.path.join(cache_dir, "objects"), exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(cache_dir, "index.sqlite3"), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS cache_entries ("
+            "remote_path TEXT PRIMARY KEY, etag TEXT NOT NULL, object_key TEXT NOT NULL, "
+            "nbytes INTEGER NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS cache_entries_lru ON cache_entries (last_access)")
+        self._db.commit()
+
+    @staticmethod
+    def object_key(remote_path: str, etag: str) -> str:
+        return hashlib.sha256(f"{remote_path}\0{etag}".encode()).hexdigest()
+
+    def object_path(self, object_key: str) -> str:
+        return os.path.join(self.cache_dir, "objects", object_key[:2], object_key)
+
+    def mirror_path(self, remote_path: str) -> str:
+        return os.path.join(self.cache_dir, *remote_path.split("/"))
+
+    @contextmanager
+    def pinned(self, remote_paths: Iterable[str]) -> Iterator[None]:
+        """
+        Keep the given files from being evicted until the block exits, also those stored within it.
+        """
+        remote_paths = list(remote_paths)
+        with self._lock:
+            for remote_path in remote_paths:
+                self._pins[remote_path] = self._pins.get(remote_path, 0) + 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                for remote_path in remote_paths:
+                    self._pins[remote_path] -= 1
+                    if not self._pins[remote_path]:
+                        del self._pins[remote_path]
+
+    def lookup(self, remote_path: str, etag: Optional[str] = None) -> Optional[str]:
+        """
+        Return the local path of a cached file and mark it as used, or None on a miss.
+
+        Args:
+            remote_path (str): Key of the object in the bucket.
+            etag (Optional[str]): If given, only a copy of this version is a hit.
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT etag FROM cache_entries WHERE remote_path = ?", (remote_path,)
+            ).fetchone()
+            if row is None or (etag is not None and row[0] != etag):
+                return None
+            local_path = self.mirror_path(remote_path)
+            if not os.path.exists(local_path):
+                # Removed behind the cache's back
+                self._remove(remote_path)
+                self._db.commit()
+                return None
+            self._db.execute("UPDATE cache_entries SET last_access = ? WHERE remote_path = ?", (time.time(), remote_path))
+            self._db.commit()
+            return local_path
+
+    def store(self, remote_path: str, etag: str, downloaded_path: str) -> str:
+        """
+        Move a downloaded file into the cache, replacing older versions, and evict beyond `max_bytes`.
+
+        Returns:
+            str: The local path of the file, mirroring its remote path.
+        """
+        object_key = self.object_key(remote_path, etag)
+        object_path = self.object_path(object_key)
+        local_path = self.mirror_path(remote_path)
+        nbytes = os.path.getsize(downloaded_path)
+        with self._lock:
+            self._remove(remote_path)
+            os.makedirs(os.path.dirname(object_path), exist_ok=True)
+            os.replace(downloaded_path, object_path)
+            os.makedirs(os.path.dirname(local_path), exist_ok=True)
+            try:
+                os.link(object_path, local_path)
+            except OSError:  # file systems without hard links get a copy
+                shutil.copyfile(object_path, local_path)
+            self._db.execute(
+                "INSERT INTO cache_entries (remote_path, etag, object_key, nbytes, last_access) VALUES (?, ?, ?, ?, ?)",
+                (remote_path, etag, object_key, nbytes, time.time())
+            )
+            self._evict(keep=remote_path)
+            self._db.commit()
+        return local_path
+
+    def _remove(self, remote_path: str) -> None:
+        row = self._db.execute("SELECT object_key FROM cache_entries WHERE remote_path = ?", (remote_path,)).fetchone()
+        if row is None:
+            return
+        for path in (self.mirror_path(remote_path), self.object_path(row[0])):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        self._db.execute("DELETE FROM cache_entries WHERE remote_path = ?", (remote_path,))
+
+    def _evict(self, keep: str) -> None:
+        # Least recently used first; the file just stored stays even if it alone exceeds the budget
+        total = self._db.execute("SELECT COALESCE(SUM(nbytes), 0) FROM cache_entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        victims: List[Tuple[str, int]] = self._db.execute(
+            "SELECT remote_path, nbytes FROM cache_entries WHERE remote_path != ? ORDER BY last_access", (keep,)
+        ).fetchall()
+        for remote_path, nbytes in victims:
+            if total <= self.max_bytes:
+                break
+            if remote_path in self._pins:
+                continue
+            self._remove(remote_path)
+            total -= nbytes
+            self.evictions += 1
+            logger.debug(f"Evicted {remote_path} from the download cache.")
+
+    def total_bytes(self) -> int:
+        with self._lock:
+            total: int = self._db.execute("SELECT COALESCE(SUM(nbytes), 0) FROM cache_entries").fetchone()[0]
+            return total
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+def _is_missing(error: Exception) -> bool:
+    # botocore is loaded with the client, on first connect
+    from botocore.exceptions import ClientError
+
+    return isinstance(error, ClientError) and error.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound")
+
+
+def download_orderbook_file(
+    remote_path: str,
+    spaces_config: SpacesConfig,
+    cache: OrderbookCache,
+    revalidate: bool = False,
+    retries: Optional[int] = None,
+    backoff_factor: Optional[int] = None
+) -> Tuple[str, int]:
+    """
+    Return the local copy of one archived file, downloading it unless it is cached.
+
+    Hourly files are not modified after upload, so a cached file is used as is; with `revalidate`
+    its ETag is checked against the bucket first.
+
+    Returns:
+        Tuple[str, int]: The local path and the number of bytes downloaded (0 for a cache hit).
+
+    Raises:
+        FileNotFoundError: If the object does not exist; this is not retried.
+        RuntimeError: If every attempt failed.
+    """
+    if retries is None:
+        retries = get_config()["spaces"]["connection_retries"]
+    if backoff_factor is None:
+        backoff_factor = get_config()["spaces"]["backoff_factor"]
+    client_manager = get_spaces_client_manager(spaces_config)
+    if not revalidate:
+        local_path = cache.lookup(remote_path)
+        if local_path is not None:
+            return local_path, 0
+
+    for attempt in range(1, retries + 1):
+        client = client_manager.get_client()
+        try:
+            if revalidate:
+                etag = client.head_object(Bucket=spaces_config.SPACES_BUCKET_NAME, Key=remote_path)["ETag"].strip('"')
+                local_path = cache.lookup(remote_path, etag)
+                if local_path is not None:
+                    return local_path, 0
+
+            response = client.get_object(Bucket=spaces_config.SPACES_BUCKET_NAME, Key=remote_path)
+            with tempfile.NamedTemporaryFile(dir=cache.cache_dir, suffix=".part", delete=False) as f:
+                try:
+                    shutil.copyfileobj(response["Body"], f)
+                except BaseException:
+                    os.remove(f.name)
+                    raise
+            nbytes = os.path.getsize(f.name)
+            return cache.store(remote_path, response["ETag"].strip('"'), f.name), nbytes
+        except Exception as e:
+            if _is_missing(e):
+                raise FileNotFoundError(f"{remote_path} does not exist in bucket {spaces_config.SPACES_BUCKET_NAME}") from e
+            logger.error(f"Download attempt {attempt} of {remote_path} failed: {e}")
+            client_manager.invalidate(client)
+            if attempt < retries:
+                time.sleep(backoff_factor ** attempt)
+    raise RuntimeError(f"Failed to download {remote_path} after {retries} attempts")
+
+
+def download_orderbook_files(
+    remote_paths: Iterable[str],
+    spaces_config: SpacesConfig,
+    cache: Optional[OrderbookCache] = None,
+    max_workers: Optional[int] = None,
+    revalidate: bool = False
+) -> Dict[str, str]:
+    """
+    Download archived hourly files (the `file_path` column of `orderbook_metadata`) into the local cache.
+
+    Up to `max_workers` files are fetched at a time over the shared Spaces client; cached files
+    are not downloaded again. The files stay pinned in the cache until this returns, so the
+    eviction of a later download cannot remove a file returned earlier.
+
+    Args:
+        remote_paths (Iterable[str]): Keys of the files in the bucket.
+        spaces_config (SpacesConfig): Spaces credentials and bucket.
+        cache (Optional[OrderbookCache]): Defaults to a cache in `downloads.cache_dir`.
+        max_workers (Optional[int]): Maximum number of concurrent downloads; defaults to `downloads.max_workers`.
+        revalidate (bool): Compare the ETag of cached files with the bucket before using them.
+
+    Returns:
+        Dict[str, str]: Local path per remote path, in the order given; files that failed are missing.
+    """
+    cache = cache or OrderbookCache()
+    if max_workers is None:
+        max_workers = get_config()["downloads"]["max_workers"]
+    remote_paths = list(dict.fromkeys(remote_paths))
+    local_paths: Dict[str, str] = {}
+    downloaded_files = 0
+    downloaded_bytes = 0
+    start = time.monotonic()
+
+    def worker(remote_path: str) -> Optional[Tuple[str, int]]:
+        try:
+            return download_orderbook_file(remote_path, spaces_config, cache, revalidate)
+        except Exception as e:
+            logger.error(f"Skipping {remote_path}: {e}")
+            return None
+
+    with cache.pinned(remote_paths), ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for remote_path, result in zip(remote_paths, executor.map(worker, remote_paths)):
+            if result is None:
+                continue
+            local_paths[remote_path], nbytes = result
+            if nbytes:
+                downloaded_files += 1
+                downloaded_bytes += nbytes
+
+    elapsed = max(time.monotonic() - start, 1e-9)
+    logger.info(
+        f"{len(local_paths)}/{len(remote_paths)} files available locally: {downloaded_files} downloaded "
+        f"({downloaded_bytes / 1e6:.2f} MB, {downloaded_bytes / 1e6 / elapsed:.2f} MB/s), "
+        f"{len(local_paths) - downloaded_files} from the cache, {cache.evictions} evicted."
+    )
+    return local_paths
@@ -1,38 +1,54 @@
 import json
+import threading
 import time
-import pandas as pd
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 import requests
-from typing import Any, Dict, List
-from src.models import Gamma_Market
-from src.utils import logger, config, safe_float
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+from src.session import get_session
+from src.utils import get_config, logger
 
-GAMMA_MARKETS_BASE_URL = config["api"]["gamma_markets_base_url"]
-CLOB_ORDERBOOK_BASE_URL = config["api"]["clob_orderbook_base_url"]
-GAMMA_MARKETS_FETCH_RETRIES = config["api"]["gamma_markets_fetch_retries"]
-CLOB_ORDERBOOK_FETCH_RETRIES = config["api"]["clob_orderbook_fetch_retries"]
+try:
+    import orjson
+    json_loads: Any = orjson.loads
+except ImportError:  # orjson is optional; fall back to the standard library decoder
+    json_loads = json.loads
 
+_clob_executor: Optional[ThreadPoolExecutor] = None
+_clob_executor_lock = threading.Lock()
 
-def fetch_with_retries(url: str, retries: int = 2, backoff_factor: int = 2) -> Any:
+
+def fetch_with_retries(url: str, retries: int = 2, backoff_factor: int = 2, json_body: Any = None) -> Any:
     """
-    Perform an HTTP GET request with retry and exponential backoff.
+    Perform an HTTP GET request, or a POST when `json_body` is given, with retry and exponential backoff.
+
+    Requests go through the shared keep-alive session, so repeated calls reuse pooled connections.
+    Responses are decoded with orjson when it is installed. A response that is not valid JSON is
+    retried like a failed request.
 
-  Args:
+    Args:
         url (str): The URL to fetch.
         retries (int): Number of retry attempts (default is 2).
         backoff_factor (int): Backoff factor for exponential delays (default is 2).
+        json_body (Any): JSON-serializable body. If given, the request is sent as a POST with this body
+            instead of a GET (default is None).
 
     Returns:
         dict: The JSON response as a dictionary.
 
     Raises:
         requests.RequestException: If all retries fail.
+        ValueError: If the last response is not valid JSON.
     """
+    timeout_s = get_config()["http"]["timeout_s"]
     for attempt in range(1, retries + 1):
         try:
-            response = requests.get(url, timeout=10)  # Add timeout
+            if json_body is None:
+                response = get_session().get(url, timeout=timeout_s)
+            else:
+                response = get_session().post(url, json=json_body, timeout=timeout_s)
             response.raise_for_status()
-            return response.json()
-        except requests.RequestException as e:
+            return json_loads(response.content)
+        except (requests.RequestException, ValueError) as e:
             logger.warning(f"Attempt {attempt} failed for URL {url}: {e}")
             if attempt < retries:
                 time.sleep(backoff_factor ** attempt)
@@ -41,94 +57,124 @@ def fetch_with_retries(url: str, retries: int = 2, backoff_factor: int = 2) -> A
                 raise
 
 
-def btc_markets_from_gamma()-> List[Gamma_Market]:
+def orderbook_from_clob(token_id: int)-> Any:
     """
-    Fetch all active markets from the GAMMA API, filtering for relevant tokens.
+    Fetch the order book for a given token ID from the CLOB API.
 
-    Filters:
-        - Includes markets with "bitcoin" in their slug.
-        - Further filters based on keywords: "hit", "reach", "above".
+    Args:
+        token_id (int): The unique token ID.
 
     Returns:
-        list[dict]: A list of filtered Gamma_Market objects containing:
-            - id
-            - slug
-            - conditionId (Optional)
-            - orderPriceMinTickSize (Optional)
-            - orderMinSize (Optional)
-            - clobTokenId
+        dict: The JSON response containing the order book data.
 
     Logs:
-        INFO: Successful market fetch and filtering.
-        ERROR: Failures during API calls or data parsing.
+        INFO: Successful order book retrieval.
+        ERROR: Failures during API calls or retries.
     """
-    offset = 0
-    results = []
-    logger.info("Starting on GAMMA fetching active markets")
+    api_config = get_config()["api"]
+    url = f"{api_config['clob_orderbook_base_url']}token_id={token_id}"
+    try:
+        return fetch_with_retries(url, retries=api_config["clob_orderbook_fetch_retries"], backoff_factor=2)
+    except Exception as e:
+        logger.error(f"Failed to fetch order book for token_id {token_id} after retries. Error: {e}")
+        return None
 
-    while True:
-        url = f"{GAMMA_MARKETS_BASE_URL}&offset={offset}"
 
-        try:
-            # Use the fetch_with_retries method for better stability
-            data = fetch_with_retries(url, retries=5, backoff_factor=2)
-        except Exception as e:
-            logger.error(f"Failed to fetch data from GAMMA API after retries: {e}")
-            return []
-
-        if not data:
-            break
-
-        for market in data:
-            results.append({
-                "id": market.get("id"),
-                "slug": market.get("slug"),
-                "conditionId": market.get("conditionId"),
-                "orderPriceMinTickSize": market.get("orderPriceMinTickSize"),
-                "orderMinSize": market.get("orderMinSize"),
-                "clobTokenIds": market.get("clobTokenIds"),
-            })
-
-        offset += 100
-        time.sleep(0.2)
-    logger.info(f"Successfully fetched {len(results)} markets")
-    df = pd.DataFrame(results)
-    filtered_df = df[df['slug'].str.contains("bitcoin", case=False, na=False)]
-    keywords = ["hit", "reach", "above"]
-    filtered_df = filtered_df[filtered_df['slug'].str.contains('|'.join(keywords), case=False, na=False)]
-    filtered_df['clobTokenId'] = filtered_df['clobTokenIds'].apply(lambda x: int(json.loads(x)[0]))
-    filtered_df = filtered_df.drop(columns=['clobTokenIds'])
-
-    markets = [
-        Gamma_Market(
-            id=row['id'],
-            slug=row['slug'],
-            conditionId=str(row.get('conditionId') or ""),
-            orderPriceMinTickSize=safe_float(row.get('orderPriceMinTickSize')),
-            orderMinSize=safe_float(row.get('orderMinSize')),
-            clobTokenId=row['clobTokenId']
-        )
-        for _, row in filtered_df.iterrows()
-    ]
-    return markets
+def _get_clob_executor() -> ThreadPoolExecutor:
+    """
+    Return the shared worker pool used for CLOB requests, creating it on first use.
 
-def orderbook_from_clob(token_id: int)-> Any:
+    The pool lives for the whole process so that a tick does not pay for spawning threads.
     """
-    Fetch the order book for a given token ID from the CLOB API.
+    global _clob_executor
+    with _clob_executor_lock:
+        if _clob_executor is None:
+            _clob_executor = ThreadPoolExecutor(
+                max_workers=get_config()["api"].get("clob_orderbook_fetch_workers", 16),
+                thread_name_prefix="clob-fetch"
+            )
+        return _clob_executor
+
+def orderbooks_batch_from_clob(token_ids: List[int]) -> Dict[int, Any]:
+    """
+    Fetch the order books for a batch of token IDs with a single POST to the CLOB `/books` endpoint.
 
     Args:
-        token_id (int): The unique token ID.
+        token_ids (List[int]): The token IDs of one batch.
 
     Returns:
-        dict: The JSON response containing the order book data.
+        Dict[int, Any]: The JSON order books keyed by token ID. Tokens missing from the
+            response are absent from the dictionary.
 
-    Logs:
-        INFO: Successful order book retrieval.
-        ERROR: Failures during API calls or retries.
+    Raises:
+        requests.RequestException: If all retries fail.
+    """
+    api_config = get_config()["api"]
+    payload = [{"token_id": str(token_id)} for token_id in token_ids]
+    data = fetch_with_retries(
+        api_config["clob_orderbooks_batch_url"], retries=api_config["clob_orderbook_fetch_retries"],
+        backoff_factor=2, json_body=payload
+    )
+    return {int(book["asset_id"]): book for book in data or []}
+
+def _orderbook_batch_task(token_ids: List[int]) -> Tuple[Dict[int, Any], List[int]]:
+    """
+    Fetch one batch and report which tokens still need a per-token fetch.
+
+    Returns:
+        Tuple: The order books that were returned, and the token IDs that have to fall back to GET `/book`.
     """
-    url = f"{CLOB_ORDERBOOK_BASE_URL}token_id={token_id}"
     try:
-        return fetch_with_retries(url, retries=CLOB_ORDERBOOK_FETCH_RETRIES, backoff_factor=2)
+        books = orderbooks_batch_from_clob(token_ids)
     except Exception as e:
-        logger.error(f"Failed to fetch order book for token_id {token_id} after retries. Error: {e}")
-        return None
+        logger.warning(f"Batch order book fetch for {len(token_ids)} tokens failed, falling back to single requests. Error: {e}")
+        return {}, token_ids
+    missing = [token_id for token_id in token_ids if token_id not in books]
+    if missing:
+        logger.debug(f"Batch order book response is missing {len(missing)} tokens, falling back to single requests.")
+    return books, missing
+
+def orderbooks_from_clob(token_ids: List[int]) -> Iterator[Tuple[int, Any]]:
+    """
+    Fetch the order books for many token IDs concurrently.
+
+    Token IDs are sent in batches of `clob_orderbook_batch_size` to the CLOB `/books` endpoint,
+    so a tick costs O(markets / batch) requests. Tokens of a failed batch, or missing from its
+    response, are fetched one by one. A batch size of 1 disables batching.
+
+    At most `clob_orderbook_fetch_workers` requests are in flight at once. Results are yielded
+    in completion order, so the caller can process a book while the slower ones are still loading.
+
+    Args:
+        token_ids (List[int]): The token IDs to fetch.
+
+    Yields:
+        Tuple[int, Any]: The token ID and its JSON order book, or None if the fetch failed.
+    """
+    executor = _get_clob_executor()
+    pending: Set[Future[Any]] = set()
+    single_futures: Dict[Future[Any], int] = {}
+
+    batch_size = get_config()["api"]["clob_orderbook_batch_size"]
+    if batch_size > 1:
+        for start in range(0, len(token_ids), batch_size):
+            pending.add(executor.submit(_orderbook_batch_task, token_ids[start:start + batch_size]))
+    else:
+        for token_id in token_ids:
+            future = executor.submit(orderbook_from_clob, token_id)
+            single_futures[future] = token_id
+            pending.add(future)
+
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future in single_futures:
+                yield single_futures.pop(future), future.result()
+                continue
+
+            books, fallback_token_ids = future.result()
+            yield from books.items()
+            for token_id in fallback_token_ids:
+                single_future = executor.submit(orderbook_from_clob, token_id)
+                single_futures[single_future] = token_id
+                pending.add(single_future)
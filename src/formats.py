@@ -0,0 +1,484 @@
+import gzip
+import importlib
+import json
+from array import array
+from bisect import bisect_right
+from dataclasses import dataclass
+from types import ModuleType
+from typing import IO, Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from src.models import Book, Compact_Order_Book, MetadataEntry, Orderbook_Track, UpdateLog
+from src.utils import get_config
+
+zstandard: Optional[ModuleType]
+try:
+    zstandard = importlib.import_module("zstandard")
+except ImportError:  # zstandard is optional; the "json-zstd" format is unavailable without it
+    zstandard = None
+
+
+def keyframe_index(num_updates: int, keyframe_interval: int) -> List[int]:
+    """
+    Update indices at which a keyframe is stored: every `keyframe_interval` updates, none if it is 0.
+
+    The keyframe at index i is the full book after applying `updates[:i]`.
+    """
+    return list(range(keyframe_interval, num_updates + 1, keyframe_interval)) if keyframe_interval > 0 else []
+
+def _sorted_levels(bids: Dict[float, float], asks: Dict[float, float]) -> Dict[str, List[Dict[str, float]]]:
+    # Best level first on both sides
+    return {
+        "bids": [{"price": price, "size": size} for price, size in sorted(bids.items(), reverse=True)],
+        "asks": [{"price": price, "size": size} for price, size in sorted(asks.items())],
+    }
+
+def orderbook_track_keyframes(orderbook_track: Orderbook_Track, keyframe_interval: int) -> Iterator[Dict[str, Any]]:
+    """
+    Yield the keyframes of a track one at a time, by replaying its update log from the start book.
+
+    Each keyframe is `{"update_index": i, "timestamp": ..., "bids": [...], "asks": [...]}` with the
+    timestamp of update i - 1 and the levels sorted best first.
+    """
+    books: List[Dict[float, float]] = [
+        {bid.price: bid.size for bid in orderbook_track.start_orderbook.bids},
+        {ask.price: ask.size for ask in orderbook_track.start_orderbook.asks},
+    ]
+    log = orderbook_track.updates
+    applied = 0
+    for index in keyframe_index(len(log), keyframe_interval):
+        for i in range(log.offsets[applied], log.offsets[index]):
+            side = books[log.sides[i]]
+            if log.sizes[i]:
+                side[log.prices[i]] = log.sizes[i]
+            else:
+                side.pop(log.prices[i], None)
+        applied = index
+        yield {
+            "update_index": index,
+            "timestamp": log.timestamp(index - 1),
+            **_sorted_levels(books[UpdateLog.BID], books[UpdateLog.ASK]),
+        }
+
+def orderbook_track_header(
+    orderbook_track: Orderbook_Track, metadata_entry: MetadataEntry, keyframe_interval: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Return the header fields of an hourly file, in file order.
+
+    With keyframes (`files.keyframe_interval` > 0 unless overridden), the header ends with the
+    interval and the `keyframe_index` of update indices of the stored keyframes.
+    """
+    keyframe_interval = get_config()["files"]["keyframe_interval"] if keyframe_interval is None else keyframe_interval
+    header = {
+        "id": orderbook_track.id,
+        "slug": orderbook_track.slug,
+        "initial_orderbook_fetched_at": orderbook_track.fetched_at,
+        "hour": orderbook_track.hour,
+        "date": orderbook_track.date,
+        "condition_id": orderbook_track.condition_id,
+        "clob_token_id": orderbook_track.clob_token_id,
+        "order_price_min_tick_size": orderbook_track.order_price_min_tick_size,
+        "order_min_size": orderbook_track.order_min_size,
+        "start_time_stamp": orderbook_track.start_time_stamp,
+        "end_time_stamp": metadata_entry.end_time,
+        "num_updates": metadata_entry.num_updates,
+        "object_generated_at": metadata_entry.meta_generated_at,
+    }
+    if keyframe_interval > 0:
+        header["keyframe_interval"] = keyframe_interval
+        header["keyframe_index"] = keyframe_index(len(orderbook_track.updates), keyframe_interval)
+    return header
+
+def orderbook_track_to_dict(
+    orderbook_track: Orderbook_Track, metadata_entry: MetadataEntry, keyframe_interval: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Return the full hourly file content (header, start order book, keyframes and updates) as a dictionary.
+
+    This materializes every update; the writers stream instead and only use the same layout.
+    """
+    keyframe_interval = get_config()["files"]["keyframe_interval"] if keyframe_interval is None else keyframe_interval
+    data = {
+        **orderbook_track_header(orderbook_track, metadata_entry, keyframe_interval),
+        "start_orderbook": {
+            "market": orderbook_track.start_orderbook.market,
+            "timestamp": orderbook_track.start_orderbook.timestamp,
+            "bids": [bid.__dict__ for bid in orderbook_track.start_orderbook.bids],
+            "asks": [ask.__dict__ for ask in orderbook_track.start_orderbook.asks]
+        },
+    }
+    if keyframe_interval > 0:
+        data["keyframes"] = list(orderbook_track_keyframes(orderbook_track, keyframe_interval))
+    data["updates"] = list(orderbook_track.updates.to_records())
+    return data
+
+def orderbook_levels_at(data: Dict[str, Any], update_index: int) -> Dict[str, Any]:
+    """
+    Rebuild the order book right after update `update_index` of an hourly file read into the JSON layout.
+
+    The replay starts from the closest keyframe at or before the update, so at most
+    `keyframe_interval - 1` updates are applied; files without keyframes replay from the start book.
+    An index of -1 returns the start book.
+
+    Returns:
+        Dict[str, Any]: `timestamp`, and `bids` / `asks` levels sorted best first.
+
+    Raises:
+        IndexError: If `update_index` is outside [-1, num_updates).
+    """
+    updates = data["updates"]
+    if not -1 <= update_index < len(updates):
+        raise IndexError(f"Update index {update_index} out of range for {len(updates)} updates")
+    target = update_index + 1  # number of updates applied
+
+    position = bisect_right(data.get("keyframe_index", []), target) - 1
+    if position >= 0:
+        start = data["keyframes"][position]
+        applied = start["update_index"]
+    else:
+        start = data["start_orderbook"]
+        applied = 0
+    bids = {level["price"]: level["size"] for level in start["bids"]}
+    asks = {level["price"]: level["size"] for level in start["asks"]}
+
+    for record in updates[applied:target]:
+        for side, levels in ((bids, record["changes"]["bids"]), (asks, record["changes"]["asks"])):
+            for level in levels:
+                if level["size"]:
+                    side[level["price"]] = level["size"]
+                else:
+                    side.pop(level["price"], None)
+    timestamp = updates[update_index]["timestamp"] if update_index >= 0 else start["timestamp"]
+    return {"timestamp": timestamp, **_sorted_levels(bids, asks)}
+
+# ----- JSON ----- #
+
+def _write_json(orderbook_track: Orderbook_Track, metadata_entry: MetadataEntry, f: Any, indent: Optional[int]) -> None:
+    """
+    Stream the track as JSON: the header and start order book first, then one keyframe and one update at a time.
+
+    Only one keyframe or update is encoded in memory at a time, so peak memory does not grow with the
+    number of updates. The output is identical to `json.dumps(orderbook_track_to_dict(...), indent=indent)`
+    (with compact separators when `indent` is None).
+    """
+    if indent is None:
+        separators, newline_1, newline_2 = (",", ":"), "", ""
+    else:
+        separators, newline_1, newline_2 = (",", ": "), "\n" + " " * indent, "\n" + " " * 2 * indent
+    encode = json.JSONEncoder(indent=indent, separators=separators).encode
+    key_separator = separators[1]
+
+    header = orderbook_track_header(orderbook_track, metadata_entry)
+    header["start_orderbook"] = {
+        "market": orderbook_track.start_orderbook.market,
+        "timestamp": orderbook_track.start_orderbook.timestamp,
+        "bids": [bid.__dict__ for bid in orderbook_track.start_orderbook.bids],
+        "asks": [ask.__dict__ for ask in orderbook_track.start_orderbook.asks]
+    }
+
+    def write_array(key: str, records: Iterable[Dict[str, Any]]) -> None:
+        f.write(f'{newline_1}{encode(key)}{key_separator}['.encode())
+        separator = ""
+        for record in records:
+            f.write(f"{separator}{newline_2}{encode(record).replace(chr(10), newline_2)}".encode())
+            separator = ","
+        f.write(f"{newline_1 if separator else ''}]".encode())
+
+    f.write(b"{")
+    for key, value in header.items():
+        f.write(f"{newline_1}{encode(key)}{key_separator}{encode(value).replace(chr(10), newline_1)},".encode())
+    if "keyframe_interval" in header:
+        write_array("keyframes", orderbook_track_keyframes(orderbook_track, header["keyframe_interval"]))
+        f.write(b",")
+    write_array("updates", orderbook_track.updates.to_records())
+    f.write(f"{chr(10) if indent is not None else ''}}}".encode())
+
+def write_json(orderbook_track: Orderbook_Track, metadata_entry: MetadataEntry, f: IO[bytes]) -> None:
+    _write_json(orderbook_track, metadata_entry, f, indent=2)
+
+def write_json_compact(orderbook_track: Orderbook_Track, metadata_entry: MetadataEntry, f: IO[bytes]) -> None:
+    _write_json(orderbook_track, metadata_entry, f, indent=None)
+
+def write_json_gzip(orderbook_track: Orderbook_Track, metadata_entry: MetadataEntry, f: IO[bytes]) -> None:
+    with gzip.GzipFile(fileobj=f, mode="wb", compresslevel=6, mtime=0) as gz:
+        _write_json(orderbook_track, metadata_entry, gz, indent=None)
+
+def _require_zstandard() -> ModuleType:
+    if zstandard is None:
+        raise ValueError("Orderbook file format 'json-zstd' requires zstandard, which is not installed")
+    return zstandard
+
+def write_json_zstd(orderbook_track: Orderbook_Track, metadata_entry: MetadataEntry, f: IO[bytes]) -> None:
+    with _require_zstandard().ZstdCompressor(level=10).stream_writer(f, closefd=False) as zf:
+        _write_json(orderbook_track, metadata_entry, zf, indent=None)
+
+def read_json(f: Any) -> Dict[str, Any]:
+    data: Dict[str, Any] = json.load(f)
+    return data
+
+def read_json_gzip(f: IO[bytes]) -> Dict[str, Any]:
+    with gzip.GzipFile(fileobj=f, mode="rb") as gz:
+        return read_json(gz)
+
+def read_json_zstd(f: IO[bytes]) -> Dict[str, Any]:
+    with _require_zstandard().ZstdDecompressor().stream_reader(f, closefd=False) as zf:
+        return read_json(zf)
+
+# ----- NumPy .npz ----- #
+
+def _book_arrays(orderbook: Book) -> Dict[str, Any]:
+    if isinstance(orderbook, Compact_Order_Book):
+        return {
+            "start_bid_prices": orderbook.bid_prices, "start_bid_sizes": orderbook.bid_sizes,
+            "start_ask_prices": orderbook.ask_prices, "start_ask_sizes": orderbook.ask_sizes,
+        }
+    return {
+        "start_bid_prices": array("d", [bid.price for bid in orderbook.bids]),
+        "start_bid_sizes": array("d", [bid.size for bid in orderbook.bids]),
+        "start_ask_prices": array("d", [ask.price for ask in orderbook.asks]),
+        "start_ask_sizes": array("d", [ask.size for ask in orderbook.asks]),
+    }
+
+def _keyframe_arrays(orderbook_track: Orderbook_Track, keyframe_interval: int) -> Dict[str, Any]:
+    if keyframe_interval <= 0:
+        return {}
+    offsets, sides, prices, sizes = array("q", [0]), array("b"), array("d"), array("d")
+    for keyframe in orderbook_track_keyframes(orderbook_track, keyframe_interval):
+        for side, name in ((UpdateLog.BID, "bids"), (UpdateLog.ASK, "asks")):
+            for level in keyframe[name]:
+                sides.append(side)
+                prices.append(level["price"])
+                sizes.append(level["size"])
+        offsets.append(len(prices))
+    return {"keyframe_offsets": offsets, "keyframe_sides": sides, "keyframe_prices": prices, "keyframe_sizes": sizes}
+
+def write_npz(orderbook_track: Orderbook_Track, metadata_entry: MetadataEntry, f: IO[bytes]) -> None:
+    """
+    Write the track as compressed NumPy arrays: the start book sides plus the columns of the update log.
+    The header and the start book's market/timestamp are stored as a JSON string in `header`.
+
+    Keyframes are stored as level columns too; keyframe k spans levels
+    `keyframe_offsets[k]:keyframe_offsets[k + 1]`.
+    """
+    import numpy as np  # only the npz format needs numpy; keeps it off the startup path
+
+    header = orderbook_track_header(orderbook_track, metadata_entry)
+    header["start_orderbook"] = {
+        "market": orderbook_track.start_orderbook.market,
+        "timestamp": orderbook_track.start_orderbook.timestamp,
+    }
+    updates = orderbook_track.updates
+    columns = {name: np.frombuffer(values, dtype=values.typecode) for name, values in {
+        **_book_arrays(orderbook_track.start_orderbook),
+        "update_timestamps_us": updates.timestamps_us,
+        "update_offsets": updates.offsets,
+        "level_sides": updates.sides,
+        "level_prices": updates.prices,
+        "level_sizes": updates.sizes,
+        **_keyframe_arrays(orderbook_track, header.get("keyframe_interval", 0)),
+    }.items()}
+    np.savez_compressed(f, header=np.array(json.dumps(header)), **columns)
+
+def read_npz_arrays(f: IO[bytes]) -> Dict[str, Any]:
+    """
+    Read an .npz hourly file into its header dictionary and NumPy column arrays.
+    """
+    import numpy as np
+
+    with np.load(f) as npz:
+        arrays: Dict[str, Any] = {name: npz[name] for name in npz.files if name != "header"}
+        arrays["header"] = json.loads(str(npz["header"]))
+    return arrays
+
+def read_npz(f: IO[bytes]) -> Dict[str, Any]:
+    """
+    Read an .npz hourly file into the same dictionary layout as the JSON formats.
+    """
+    arrays = read_npz_arrays(f)
+    data: Dict[str, Any] = arrays["header"]
+    start = data.pop("start_orderbook")
+
+    def levels(prices: Any, sizes: Any) -> List[Dict[str, float]]:
+        return [{"price": price, "size": size} for price, size in zip(prices.tolist(), sizes.tolist())]
+
+    log = UpdateLog()
+    log.timestamps_us = array("q", arrays["update_timestamps_us"].tobytes())
+    log.offsets = array("q", arrays["update_offsets"].tobytes())
+    log.sides = array("b", arrays["level_sides"].tobytes())
+    log.prices = array("d", arrays["level_prices"].tobytes())
+    log.sizes = array("d", arrays["level_sizes"].tobytes())
+
+    data["start_orderbook"] = {
+        "market": start["market"],
+        "timestamp": start["timestamp"],
+        "bids": levels(arrays["start_bid_prices"], arrays["start_bid_sizes"]),
+        "asks": levels(arrays["start_ask_prices"], arrays["start_ask_sizes"]),
+    }
+    if "keyframe_index" in data:
+        offsets = arrays["keyframe_offsets"].tolist()
+        sides = arrays["keyframe_sides"].tolist()
+        prices = arrays["keyframe_prices"].tolist()
+        sizes = arrays["keyframe_sizes"].tolist()
+        data["keyframes"] = []
+        for k, index in enumerate(data["keyframe_index"]):
+            span = range(offsets[k], offsets[k + 1])
+            data["keyframes"].append({
+                "update_index": index,
+                "timestamp": log.timestamp(index - 1),
+                "bids": [{"price": prices[i], "size": sizes[i]} for i in span if sides[i] == UpdateLog.BID],
+                "asks": [{"price": prices[i], "size": sizes[i]} for i in span if sides[i] == UpdateLog.ASK],
+            })
+    data["updates"] = list(log.to_records())
+    return data
+
+# ----- day files ----- #
+
+DAY_FILE_EXTENSION = ".day.npz"
+_KEYFRAME_FIELDS = ("keyframe_interval", "keyframe_index", "keyframes")
+
+def write_day_npz(hours: Sequence[Dict[str, Any]], f: IO[bytes]) -> None:
+    """
+    Write the hourly files of one market-day, each in the JSON layout, as one compressed columnar file.
+
+    The columns of all hours are concatenated; `hour_numbers` and the `hour_*_offsets` arrays are
+    the hour index: hour k spans updates `hour_update_offsets[k]:hour_update_offsets[k + 1]` and
+    start book levels `hour_start_offsets[k]:hour_start_offsets[k + 1]`. The header fields of each
+    hour are stored as JSON in `header`. Keyframes are not kept; readers replay from the start books.
+    """
+    import numpy as np
+
+    headers: List[Dict[str, Any]] = []
+    hour_numbers = array("q")
+    hour_update_offsets, hour_start_offsets = array("q", [0]), array("q", [0])
+    start_sides, start_prices, start_sizes = array("b"), array("d"), array("d")
+    log = UpdateLog()
+    for data in sorted(hours, key=lambda data: data["hour"]):
+        header = {key: value for key, value in data.items() if key not in ("start_orderbook", "updates", *_KEYFRAME_FIELDS)}
+        header["start_orderbook"] = {"market": data["start_orderbook"]["market"], "timestamp": data["start_orderbook"]["timestamp"]}
+        headers.append(header)
+        hour_numbers.append(data["hour"])
+        for side, name in ((UpdateLog.BID, "bids"), (UpdateLog.ASK, "asks")):
+            for level in data["start_orderbook"][name]:
+                start_sides.append(side)
+                start_prices.append(level["price"])
+                start_sizes.append(level["size"])
+        hour_start_offsets.append(len(start_prices))
+        for record in data["updates"]:
+            for side, name in ((UpdateLog.BID, "bids"), (UpdateLog.ASK, "asks")):
+                for level in record["changes"][name]:
+                    log.sides.append(side)
+                    log.prices.append(level["price"])
+                    log.sizes.append(level["size"])
+            log.append_no_change(record["timestamp"])
+        hour_update_offsets.append(len(log))
+
+    named: Dict[str, "array[Any]"] = {
+        "hour_numbers": hour_numbers,
+        "hour_update_offsets": hour_update_offsets,
+        "hour_start_offsets": hour_start_offsets,
+        "start_sides": start_sides,
+        "start_prices": start_prices,
+        "start_sizes": start_sizes,
+        "update_timestamps_us": log.timestamps_us,
+        "update_offsets": log.offsets,
+        "level_sides": log.sides,
+        "level_prices": log.prices,
+        "level_sizes": log.sizes,
+    }
+    columns = {name: np.frombuffer(values, dtype=values.typecode) for name, values in named.items()}
+    np.savez_compressed(f, header=np.array(json.dumps(headers)), **columns)
+
+def read_day_npz(f: IO[bytes], hours: Optional[Iterable[int]] = None) -> Dict[int, Dict[str, Any]]:
+    """
+    Read the hours of a day file (all, or those in `hours`) into the JSON layout of the hourly files.
+
+    Returns:
+        Dict[int, Dict[str, Any]]: The content of each hour, by hour.
+    """
+    arrays = read_npz_arrays(f)
+    wanted = None if hours is None else set(hours)
+    update_offsets = arrays["update_offsets"]
+    result: Dict[int, Dict[str, Any]] = {}
+    for k, header in enumerate(arrays["header"]):
+        if wanted is not None and header["hour"] not in wanted:
+            continue
+        data: Dict[str, Any] = dict(header)
+        start_span = slice(int(arrays["hour_start_offsets"][k]), int(arrays["hour_start_offsets"][k + 1]))
+        sides = arrays["start_sides"][start_span].tolist()
+        prices = arrays["start_prices"][start_span].tolist()
+        sizes = arrays["start_sizes"][start_span].tolist()
+        data["start_orderbook"] = {
+            **header["start_orderbook"],
+            "bids": [{"price": p, "size": z} for s, p, z in zip(sides, prices, sizes) if s == UpdateLog.BID],
+            "asks": [{"price": p, "size": z} for s, p, z in zip(sides, prices, sizes) if s == UpdateLog.ASK],
+        }
+
+        first, last = int(arrays["hour_update_offsets"][k]), int(arrays["hour_update_offsets"][k + 1])
+        level_span = slice(int(update_offsets[first]), int(update_offsets[last]))
+        log = UpdateLog()
+        log.timestamps_us = array("q", arrays["update_timestamps_us"][first:last].tobytes())
+        log.offsets = array("q", (update_offsets[first:last + 1] - update_offsets[first]).tobytes())
+        log.sides = array("b", arrays["level_sides"][level_span].tobytes())
+        log.prices = array("d", arrays["level_prices"][level_span].tobytes())
+        log.sizes = array("d", arrays["level_sizes"][level_span].tobytes())
+        data["updates"] = list(log.to_records())
+        result[header["hour"]] = data
+    return result
+
+# ----- registry ----- #
+
+@dataclass
+class OrderbookFormat:
+    name: str
+    extension: str  # appended to the file name; identifies the format of an uploaded file
+    write: Callable[[Orderbook_Track, MetadataEntry, IO[bytes]], None]
+    read: Callable[[IO[bytes]], Dict[str, Any]]
+    available: bool = True
+
+ORDERBOOK_FORMATS: Dict[str, OrderbookFormat] = {
+    "json": OrderbookFormat("json", ".json", write_json, read_json),
+    "json-compact": OrderbookFormat("json-compact", ".min.json", write_json_compact, read_json),
+    "json-gzip": OrderbookFormat("json-gzip", ".json.gz", write_json_gzip, read_json_gzip),
+    "json-zstd": OrderbookFormat("json-zstd", ".json.zst", write_json_zstd, read_json_zstd, available=zstandard is not None),
+    "npz": OrderbookFormat("npz", ".npz", write_npz, read_npz),
+}
+
+def get_orderbook_format(name: str) -> OrderbookFormat:
+    """
+    Look up a writer format by name.
+
+    Raises:
+        ValueError: If the format is unknown or its optional dependency is not installed.
+    """
+    if name not in ORDERBOOK_FORMATS:
+        raise ValueError(f"Unknown orderbook file format {name!r}, expected one of {sorted(ORDERBOOK_FORMATS)}")
+    orderbook_format = ORDERBOOK_FORMATS[name]
+    if not orderbook_format.available:
+        raise ValueError(f"Orderbook file format {name!r} requires an optional dependency that is not installed")
+    return orderbook_format
+
+def orderbook_format_from_path(path: str) -> OrderbookFormat:
+    """
+    Identify the format of an hourly file from its name (local path or `file_path` in `orderbook_metadata`).
+    """
+    if path.endswith(DAY_FILE_EXTENSION):
+        raise ValueError(f"{path!r} is a day file, read it with read_day_npz")
+    # Longest extensions first, so ".min.json" wins over ".json"
+    for orderbook_format in sorted(ORDERBOOK_FORMATS.values(), key=lambda fmt: -len(fmt.extension)):
+        if path.endswith(orderbook_format.extension):
+            return orderbook_format
+    raise ValueError(f"Cannot determine the orderbook file format of {path!r}")
+
+def read_orderbook_file(path: str) -> Dict[str, Any]:
+    """
+    Read an hourly file of any format into the JSON dictionary layout.
+
+    Args:
+        path (str): Local path of the file; its extension selects the reader.
+
+    Returns:
+        Dict[str, Any]: Header fields, `start_orderbook` and `updates`, as in the JSON format.
+    """
+    orderbook_format = orderbook_format_from_path(path)
+    with open(path, "rb") as f:
+        return orderbook_format.read(f)
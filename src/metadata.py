@@ -0,0 +1,308 @@
+import os
+import sqlite3
+import threading
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+from src.database import METADATA_COLUMNS, pooled_db_connection
+from src.models import DatabaseConfig
+from src.utils import get_config, logger
+
+METADATA_FIELDS = tuple(column.strip() for column in METADATA_COLUMNS.split(","))
+
+# Indexes behind the queries below; (market_id, date, hour) is covered by the table's unique constraint
+METADATA_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS orderbook_metadata_slug ON orderbook_metadata (slug, date, hour)",
+    "CREATE INDEX IF NOT EXISTS orderbook_metadata_date_hour ON orderbook_metadata (date, hour)",
+    "CREATE INDEX IF NOT EXISTS orderbook_metadata_generated_at ON orderbook_metadata (generated_at)",
+)
+
+Timestamp = Union[str, datetime]
+
+
+def _iso(value: Any) -> Any:
+    """
+    Normalize dates and timestamps to ISO strings (timestamps in UTC), so they compare as strings.
+    """
+    if isinstance(value, datetime):
+        moment = value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+        return moment.astimezone(timezone.utc).isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+def _iso_timestamp(value: Timestamp) -> str:
+    return str(_iso(datetime.fromisoformat(value) if isinstance(value, str) else value))
+
+def _hour_slot(timestamp: str) -> Tuple[str, int]:
+    # The (date, hour) of the hourly file that a moment falls into
+    moment = datetime.fromisoformat(timestamp)
+    return moment.date().isoformat(), moment.hour
+
+def _normalize_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    return {field: _iso(row[field]) for field in METADATA_FIELDS}
+
+
+@dataclass
+class MetadataQuery:
+    """
+    Filter on `orderbook_metadata`; unset fields do not filter.
+
+    `start` / `end` select the files that overlap the time range [start, end); `date` (ISO 8601)
+    selects the files of one day by their `date` column.
+    """
+    market_id: Optional[str] = None
+    slug: Optional[str] = None
+    date: Optional[str] = None
+    start: Optional[Timestamp] = None
+    end: Optional[Timestamp] = None
+
+    def where(self, after: Optional[Tuple[str, str, int]], placeholder: str) -> Tuple[str, List[Any]]:
+        """
+        Return the WHERE clause and its parameters, continuing after the (market_id, date, hour) key `after`.
+        """
+        clauses: List[str] = []
+        params: List[Any] = []
+        if self.market_id is not None:
+            clauses.append(f"market_id = {placeholder}")
+            params.append(self.market_id)
+        if self.slug is not None:
+            clauses.append(f"slug = {placeholder}")
+            params.append(self.slug)
+        if self.date is not None:
+            clauses.append(f"date = {placeholder}")
+            params.append(self.date)
+        # A file's updates fall within its (date, hour), so the hours of the range bound the scan;
+        # the times of its start book do not, as a quiet market's start book can be older
+        if self.start is not None:
+            start = _iso_timestamp(self.start)
+            clauses.append(f"(date, hour) >= ({placeholder}, {placeholder}) AND end_time >= {placeholder}")
+            params.extend([*_hour_slot(start), start])
+        if self.end is not None:
+            end = _iso_timestamp(self.end)
+            last_hour = _hour_slot(_iso_timestamp(datetime.fromisoformat(end) - timedelta(microseconds=1)))
+            clauses.append(f"(date, hour) <= ({placeholder}, {placeholder}) AND start_time < {placeholder}")
+            params.extend([*last_hour, end])
+        if after is not None:
+            clauses.append(f"(market_id, date, hour) > ({placeholder}, {placeholder}, {placeholder})")
+            params.extend(after)
+        return (f"WHERE {' AND '.join(clauses)}" if clauses else ""), params
+
+
+@dataclass
+class MetadataPage:
+    rows: List[Dict[str, Any]]
+    next_cursor: Optional[Tuple[str, str, int]]  # pass as `after` for the next page; None on the last page
+
+
+def _page_size(page_size: Optional[int]) -> int:
+    return get_config()["metadata"]["page_size"] if page_size is None else page_size
+
+
+def _page(rows: List[Dict[str, Any]], page_size: int) -> MetadataPage:
+    if len(rows) < page_size:
+        return MetadataPage(rows, None)
+    last = rows[-1]
+    return MetadataPage(rows, (last["market_id"], last["date"], last["hour"]))
+
+
+def ensure_metadata_indexes(database_config: DatabaseConfig) -> None:
+    """
+    Create the indexes used by `query_metadata` and the replica sync, if they are missing.
+    """
+    with pooled_db_connection(database_config) as conn:
+        with conn.cursor() as cur:
+            for statement in METADATA_INDEXES:
+                cur.execute(statement)
+        conn.commit()
+
+def query_metadata(
+    database_config: DatabaseConfig,
+    query: MetadataQuery,
+    after: Optional[Tuple[str, str, int]] = None,
+    page_size: Optional[int] = None
+) -> MetadataPage:
+    """
+    Return one page of the metadata rows matching `query`, ordered by (market_id, date, hour).
+
+    Filtering and pagination run on the server: each page is an indexed range scan that starts
+    after the key of the previous page (keyset pagination), not an OFFSET.
+
+    Args:
+        database_config (DatabaseConfig): The database configuration.
+        query (MetadataQuery): The filter.
+        after (Optional[Tuple[str, str, int]]): `next_cursor` of the previous page.
+        page_size (Optional[int]): Maximum number of rows; defaults to `metadata.page_size`.
+
+    Returns:
+        MetadataPage: Rows as dictionaries with ISO string dates and timestamps.
+    """
+    page_size = _page_size(page_size)
+    where, params = query.where(after, "%s")
+    sql = f"SELECT {METADATA_COLUMNS} FROM orderbook_metadata {where} ORDER BY market_id, date, hour LIMIT %s"
+    with pooled_db_connection(database_config) as conn:
+        with conn.cursor() as cur:
+            cur.execute(sql, (*params, page_size))
+            rows = [_normalize_row(row) for row in cur.fetchall()]
+        conn.commit()
+    return _page(rows, page_size)
+
+def iter_metadata(
+    database_config: DatabaseConfig, query: MetadataQuery, page_size: Optional[int] = None
+) -> Iterator[Dict[str, Any]]:
+    """
+    Yield every metadata row matching `query`, fetching one page at a time.
+    """
+    after: Optional[Tuple[str, str, int]] = None
+    while True:
+        page = query_metadata(database_config, query, after, page_size)
+        yield from page.rows
+        if page.next_cursor is None:
+            return
+        after = page.next_cursor
+
+def fetch_metadata_changes(
+    database_config: DatabaseConfig,
+    since: Optional[str],
+    after: Optional[Tuple[str, str, str, int]],
+    page_size: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    Return a page of the metadata rows generated at or after `since`, ordered by (generated_at, market_id, date, hour).
+
+    Later pages continue after the (generated_at, market_id, date, hour) key `after` of the last row.
+    """
+    page_size = _page_size(page_size)
+    if after is not None:
+        where, params = "WHERE (generated_at, market_id, date, hour) > (%s, %s, %s, %s)", list(after)
+    elif since is not None:
+        where, params = "WHERE generated_at >= %s", [since]
+    else:
+        where, params = "", []
+    sql = (
+        f"SELECT {METADATA_COLUMNS} FROM orderbook_metadata {where} "
+        f"ORDER BY generated_at, market_id, date, hour LIMIT %s"
+    )
+    with pooled_db_connection(database_config) as conn:
+        with conn.cursor() as cur:
+            cur.execute(sql, (*params, page_size))
+            rows = [_normalize_row(row) for row in cur.fetchall()]
+        conn.commit()
+    return rows
+
+
+class MetadataReplica:
+    """
+    Local SQLite copy of `orderbook_metadata` for research queries without a database round trip.
+
+    `sync` copies the rows generated since the last sync, re-reading the last
+    `metadata.sync_overlap_s` seconds so that rows committed late (an upload cycle commits after
+    generating its metadata) are not missed; rows are upserted, so the overlap is harmless.
+    `query` and `iter` take the same `MetadataQuery` as `query_metadata`.
+    """
+
+    def __init__(self, path: Optional[str] = None, sync_overlap_s: Optional[float] = None) -> None:
+        metadata_config = get_config()["metadata"]
+        path = metadata_config["replica_path"] if path is None else path
+        self.path: str = path
+        self.sync_overlap_s: float = metadata_config["sync_overlap_s"] if sync_overlap_s is None else sync_overlap_s
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS orderbook_metadata ("
+            "market_id TEXT NOT NULL, hour INTEGER NOT NULL, date TEXT NOT NULL, fetched_at TEXT, slug TEXT, "
+            "condition_id TEXT, clob_token_id TEXT, start_time TEXT, end_time TEXT, num_updates INTEGER, "
+            "order_price_min_tick_size REAL, order_min_size REAL, generated_at TEXT NOT NULL, file_path TEXT, "
+            "PRIMARY KEY (market_id, date, hour))"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS orderbook_metadata_slug ON orderbook_metadata (slug, date, hour)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS orderbook_metadata_date_hour ON orderbook_metadata (date, hour)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS sync_state (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._db.commit()
+
+    def last_generated_at(self) -> Optional[str]:
+        """
+        Return the newest `generated_at` copied so far, or None before the first sync.
+        """
+        with self._lock:
+            row = self._db.execute("SELECT value FROM sync_state WHERE key = 'last_generated_at'").fetchone()
+            return row[0] if row else None
+
+    def sync(self, database_config: DatabaseConfig, page_size: Optional[int] = None) -> int:
+        """
+        Copy the rows added to `orderbook_metadata` since the last sync.
+
+        Every page is committed together with the sync position, so an interrupted sync resumes
+        where it stopped.
+
+        Returns:
+            int: Number of rows copied (rows re-read in the overlap window included).
+        """
+        page_size = _page_size(page_size)
+        last = self.last_generated_at()
+        since = _iso_timestamp(datetime.fromisoformat(last) - timedelta(seconds=self.sync_overlap_s)) if last else None
+        after: Optional[Tuple[str, str, str, int]] = None
+        copied = 0
+        while True:
+            rows = fetch_metadata_changes(database_config, since, after, page_size)
+            if not rows:
+                break
+            with self._lock:
+                self._db.executemany(
+                    f"INSERT OR REPLACE INTO orderbook_metadata ({METADATA_COLUMNS}) "
+                    f"VALUES ({', '.join('?' for _ in METADATA_FIELDS)})",
+                    [tuple(row[field] for field in METADATA_FIELDS) for row in rows]
+                )
+                newest = rows[-1]["generated_at"]
+                self._db.execute(
+                    "INSERT INTO sync_state (key, value) VALUES ('last_generated_at', ?) "
+                    "ON CONFLICT (key) DO UPDATE SET value = MAX(value, excluded.value)",
+                    (newest,)
+                )
+                self._db.commit()
+            copied += len(rows)
+            if len(rows) < page_size:
+                break
+            last_row = rows[-1]
+            after = (last_row["generated_at"], last_row["market_id"], last_row["date"], last_row["hour"])
+        if copied:
+            with self._lock:
+                # Table statistics let SQLite choose between the key, slug and (date, hour) indexes
+                self._db.execute("ANALYZE")
+        logger.info(f"Metadata replica synced: {copied} rows copied, {self.count()} rows in {self.path}.")
+        return copied
+
+    def query(
+        self, query: MetadataQuery, after: Optional[Tuple[str, str, int]] = None, page_size: Optional[int] = None
+    ) -> MetadataPage:
+        """
+        Return one page of the local rows matching `query`; see `query_metadata`.
+        """
+        page_size = _page_size(page_size)
+        where, params = query.where(after, "?")
+        sql = f"SELECT {METADATA_COLUMNS} FROM orderbook_metadata {where} ORDER BY market_id, date, hour LIMIT ?"
+        with self._lock:
+            rows = [dict(zip(METADATA_FIELDS, row)) for row in self._db.execute(sql, (*params, page_size))]
+        return _page(rows, page_size)
+
+    def iter(self, query: MetadataQuery, page_size: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        after: Optional[Tuple[str, str, int]] = None
+        while True:
+            page = self.query(query, after, page_size)
+            yield from page.rows
+            if page.next_cursor is None:
+                return
+            after = page.next_cursor
+
+    def count(self) -> int:
+        with self._lock:
+            count: int = self._db.execute("SELECT COUNT(*) FROM orderbook_metadata").fetchone()[0]
+            return count
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
@@ -1,7 +1,9 @@
 
+import sys
+from array import array
 from dataclasses import dataclass, field
-from datetime import datetime
-from typing import List, Optional, TypedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TypedDict, Union, overload
 
 @dataclass
 class SpacesConfig: 
@@ -28,6 +30,7 @@ class Gamma_Market:
     orderPriceMinTickSize: Optional[float]
     orderMinSize: Optional[float]
     clobTokenId: int
+    outcomeIndex: int = 0  # position of clobTokenId in the market's clobTokenIds
 
 
 @dataclass
@@ -45,6 +48,89 @@ class Order_Book:
     bids: List[OrderSummary]
     asks: List[OrderSummary] 
 
+class Compact_Order_Book:
+    """
+    Order book whose price levels are stored in contiguous float64 arrays.
+
+    One instance costs a handful of objects regardless of depth, compared to one
+    `OrderSummary` per level for `Order_Book`. `bids` and `asks` are read-only
+    compatibility views that build `OrderSummary` objects on access.
+    """
+    __slots__ = (
+        "market", "asset_id", "fetched_at", "hash", "timestamp",
+        "bid_prices", "bid_sizes", "ask_prices", "ask_sizes",
+    )
+
+    def __init__(
+        self,
+        market: str,
+        asset_id: str,
+        fetched_at: str,  # ISO 8601 format
+        hash: str,
+        timestamp: str,  # ISO 8601 format
+        bid_prices: Iterable[float] = (),
+        bid_sizes: Iterable[float] = (),
+        ask_prices: Iterable[float] = (),
+        ask_sizes: Iterable[float] = ()
+    ) -> None:
+        self.market = market
+        self.asset_id = asset_id
+        self.fetched_at = fetched_at
+        self.hash = hash
+        self.timestamp = timestamp
+        self.bid_prices = array("d", bid_prices)
+        self.bid_sizes = array("d", bid_sizes)
+        self.ask_prices = array("d", ask_prices)
+        self.ask_sizes = array("d", ask_sizes)
+        if len(self.bid_prices) != len(self.bid_sizes) or len(self.ask_prices) != len(self.ask_sizes):
+            raise ValueError("Price and size arrays of a side must have the same length")
+
+    @classmethod
+    def from_order_book(cls, orderbook: "Order_Book") -> "Compact_Order_Book":
+        return cls(
+            market=orderbook.market,
+            asset_id=orderbook.asset_id,
+            fetched_at=orderbook.fetched_at,
+            hash=orderbook.hash,
+            timestamp=orderbook.timestamp,
+            bid_prices=[bid.price for bid in orderbook.bids],
+            bid_sizes=[bid.size for bid in orderbook.bids],
+            ask_prices=[ask.price for ask in orderbook.asks],
+            ask_sizes=[ask.size for ask in orderbook.asks],
+        )
+
+    def to_order_book(self) -> "Order_Book":
+        return Order_Book(
+            market=self.market,
+            asset_id=self.asset_id,
+            fetched_at=self.fetched_at,
+            hash=self.hash,
+            timestamp=self.timestamp,
+            bids=self.bids,
+            asks=self.asks,
+        )
+
+    @property
+    def bids(self) -> List[OrderSummary]:
+        return [OrderSummary(price=price, size=size) for price, size in zip(self.bid_prices, self.bid_sizes)]
+
+    @property
+    def asks(self) -> List[OrderSummary]:
+        return [OrderSummary(price=price, size=size) for price, size in zip(self.ask_prices, self.ask_sizes)]
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, Compact_Order_Book):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __repr__(self) -> str:
+        return (
+            f"Compact_Order_Book(market={self.market!r}, asset_id={self.asset_id!r}, hash={self.hash!r}, "
+            f"timestamp={self.timestamp!r}, bids={len(self.bid_prices)}, asks={len(self.ask_prices)})"
+        )
+
+Book = Union[Order_Book, Compact_Order_Book]
+
 @dataclass
 class Changes:
     bids: List[OrderSummary] = field(default_factory=list)
@@ -55,6 +141,127 @@ class Updates:
     timestamp: str # ISO 8601 format
     changes: Changes
 
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+class UpdateLog:
+    """
+    Append-only, columnar log of the `Updates` of one order book track.
+
+    Every update costs one timestamp (microseconds since epoch, UTC) and one offset; its changed
+    levels are appended to shared side/price/size arrays. An update without changes has no levels,
+    so a "no change" tick costs 16 bytes instead of an `Updates`, a `Changes` and two lists.
+
+    Indexing and iteration yield `Updates` views for existing callers; `to_records` yields the
+    upload format directly from the arrays.
+    """
+    __slots__ = ("timestamps_us", "offsets", "sides", "prices", "sizes")
+
+    BID = 0
+    ASK = 1
+
+    def __init__(self, updates: Iterable[Updates] = ()) -> None:
+        self.timestamps_us = array("q")  # per update
+        self.offsets = array("q", [0])  # update i spans levels offsets[i]:offsets[i + 1]
+        self.sides = array("b")  # per level, BID or ASK
+        self.prices = array("d")  # per level
+        self.sizes = array("d")  # per level, 0 means the level was removed
+        self.extend(updates)
+
+    @staticmethod
+    def _to_us(timestamp: Union[str, datetime]) -> int:
+        moment = datetime.fromisoformat(timestamp) if isinstance(timestamp, str) else timestamp
+        if moment.tzinfo is None:
+            moment = moment.replace(tzinfo=timezone.utc)
+        return (moment - _EPOCH) // timedelta(microseconds=1)
+
+    @staticmethod
+    def _to_iso(timestamp_us: int) -> str:
+        return (_EPOCH + timedelta(microseconds=timestamp_us)).isoformat()
+
+    def append_no_change(self, timestamp: Union[str, datetime]) -> None:
+        """
+        Record a poll that found the order book unchanged.
+        """
+        self.timestamps_us.append(self._to_us(timestamp))
+        self.offsets.append(len(self.prices))
+
+    def append(self, update: Updates) -> None:
+        for bid in update.changes.bids:
+            self.sides.append(self.BID)
+            self.prices.append(bid.price)
+            self.sizes.append(bid.size)
+        for ask in update.changes.asks:
+            self.sides.append(self.ASK)
+            self.prices.append(ask.price)
+            self.sizes.append(ask.size)
+        self.append_no_change(update.timestamp)
+
+    def extend(self, updates: Iterable[Updates]) -> None:
+        for update in updates:
+            self.append(update)
+
+    def __len__(self) -> int:
+        return len(self.timestamps_us)
+
+    def _levels(self, index: int, side: int) -> List[OrderSummary]:
+        return [
+            # removed levels keep the integer 0 of `orderbook_get_updates`
+            OrderSummary(price=self.prices[i], size=self.sizes[i] or 0)
+            for i in range(self.offsets[index], self.offsets[index + 1])
+            if self.sides[i] == side
+        ]
+
+    @overload
+    def __getitem__(self, index: int) -> Updates: ...
+    @overload
+    def __getitem__(self, index: slice) -> List[Updates]: ...
+    def __getitem__(self, index: Union[int, slice]) -> Union[Updates, List[Updates]]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("UpdateLog index out of range")
+        return Updates(
+            self._to_iso(self.timestamps_us[index]),
+            Changes(bids=self._levels(index, self.BID), asks=self._levels(index, self.ASK))
+        )
+
+    def __iter__(self) -> Iterator[Updates]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def timestamp(self, index: int) -> str:
+        """
+        Return the ISO 8601 timestamp of update `index`, as in the upload format.
+        """
+        return self._to_iso(self.timestamps_us[index])
+
+    def last_timestamp(self) -> Optional[str]:
+        """
+        Return the timestamp of the latest update, or None if the log is empty.
+        """
+        return self.timestamp(-1) if len(self) else None
+
+    def to_records(self) -> Iterator[Dict[str, Any]]:
+        """
+        Yield the updates one at a time in the upload format:
+        `{"timestamp": ..., "changes": {"bids": [{"price", "size"}, ...], "asks": [...]}}`.
+        """
+        for index in range(len(self)):
+            bids: List[Dict[str, float]] = []
+            asks: List[Dict[str, float]] = []
+            for i in range(self.offsets[index], self.offsets[index + 1]):
+                level = {"price": self.prices[i], "size": self.sizes[i] or 0}
+                (bids if self.sides[i] == self.BID else asks).append(level)
+            yield {"timestamp": self._to_iso(self.timestamps_us[index]), "changes": {"bids": bids, "asks": asks}}
+
+    def nbytes(self) -> int:
+        """
+        Return the memory held by the log's arrays, including their allocation overhead.
+        """
+        return sum(sys.getsizeof(getattr(self, name)) for name in self.__slots__)
+
 @dataclass
 class Orderbook_Track:
     id: str
@@ -62,13 +269,13 @@ class Orderbook_Track:
     fetched_at: str  # ISO 8601 format; when the orderbook was initialized
     hour: int
     date: str  # ISO 8601 format (e.g., "YYYY-MM-DD")
-    start_orderbook: Order_Book
-    start_time_stamp: str  # ISO 8601 format; first timestamp from Clob
+    start_orderbook: Book
+    start_time_stamp: str  # ISO 8601 format; CLOB timestamp of the start book, or the rollover time if seeded
     condition_id: str
     order_price_min_tick_size: float
     order_min_size: float
     clob_token_id: int
-    updates: List[Updates] 
+    updates: UpdateLog
 
 @dataclass
 class MetadataEntry:
@@ -1,20 +1,83 @@
 
 
+from __future__ import annotations
+
+import dataclasses
 from datetime import datetime, timezone
 import logging
-from typing import Dict, List, Tuple
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Tuple
+
+from src.fetcher import orderbooks_from_clob
+from src.models import Book, Changes, Compact_Order_Book, Gamma_Market, OrderSummary, Orderbook_Track, UpdateLog, Updates
+from src.session import get_session_stats
+from src.utils import get_config, logger, safe_float
+
+if TYPE_CHECKING:
+    import numpy as np
+    from numpy.typing import NDArray
+
+# How often a polled book was skipped on an unchanged hash (fast_path) or decoded and diffed (full_parse)
+orderbook_parse_stats: Dict[str, int] = {"fast_path": 0, "full_parse": 0}
 
-from src.fetcher import orderbook_from_clob
-from src.models import Changes, Gamma_Market, Order_Book, OrderSummary, Orderbook_Track, Updates
-from src.utils import logger, safe_float
 
+def orderbook_from_clob_data(data: Any) -> Compact_Order_Book:
+    """
+    Convert a CLOB `/book` response into a compact, array-backed order book.
 
+    Args:
+        data (Any): The JSON order book returned by the CLOB API.
+
+    Returns:
+        Compact_Order_Book: The order book, stamped with the current time as `fetched_at`.
+    """
+    return Compact_Order_Book(
+        market=data["market"],
+        asset_id=data["asset_id"],
+        fetched_at=datetime.now(timezone.utc).isoformat(),  # ISO 8601 format
+        hash=data["hash"],
+        timestamp=datetime.fromtimestamp(safe_float(data["timestamp"]) / 1000.0, tz=timezone.utc).isoformat(),  # ISO 8601 format
+        bid_prices=[float(bid["price"]) for bid in data["bids"]],
+        bid_sizes=[float(bid["size"]) for bid in data["bids"]],
+        ask_prices=[float(ask["price"]) for ask in data["asks"]],
+        ask_sizes=[float(ask["size"]) for ask in data["asks"]],
+    )
+
+
+def _orderbook_new_track(market: Gamma_Market, start_orderbook: Book, cycle_hour: int, cycle_date: str) -> Orderbook_Track:
+    """
+    Create an empty track for `market` that starts at `start_orderbook`.
+    """
+    return Orderbook_Track(
+        id=market.id,
+        slug=market.slug,
+        fetched_at=start_orderbook.fetched_at,  # Already ISO 8601
+        hour=cycle_hour,
+        date=cycle_date,
+        start_orderbook=start_orderbook,
+        start_time_stamp=start_orderbook.timestamp,  # Already ISO 8601
+        condition_id=market.conditionId if market.conditionId else "",
+        order_price_min_tick_size=market.orderPriceMinTickSize if market.orderPriceMinTickSize else 0.0,
+        order_min_size=market.orderMinSize if market.orderMinSize else 0.0,
+        clob_token_id=market.clobTokenId,
+        updates=UpdateLog()  # Empty updates initially
+    )
+
+def _orderbook_restamped(orderbook: Book, moment: str) -> Book:
+    """
+    Return a copy of `orderbook` with `fetched_at` and `timestamp` set to `moment` (ISO 8601).
+    """
+    if isinstance(orderbook, Compact_Order_Book):
+        return Compact_Order_Book(
+            orderbook.market, orderbook.asset_id, moment, orderbook.hash, moment,
+            orderbook.bid_prices, orderbook.bid_sizes, orderbook.ask_prices, orderbook.ask_sizes,
+        )
+    return dataclasses.replace(orderbook, fetched_at=moment, timestamp=moment)
 
 def orderbook_initialize_orderbookTracks(
         gamma_markets: List[Gamma_Market],
         cycle_hour: int,
         cycle_date: str
-        ) -> Tuple[Dict[str, Orderbook_Track], Dict[str, Order_Book]]:
+        ) -> Tuple[Dict[str, Orderbook_Track], Dict[str, Book]]:
     """
     Initialize the in-memory order books for all markets.
 
@@ -26,52 +89,28 @@ def orderbook_initialize_orderbookTracks(
         Tuple:
             - current_orderbooks_track (Dict[str, Orderbook_Track]): A dictionary of initialized order books for all markets,
               keyed by market ID, containing metadata and tracking details.
-            - latest_orderbooks (Dict[str, Order_Book]): A dictionary of the latest snapshots of order books
+            - latest_orderbooks (Dict[str, Book]): A dictionary of the latest snapshots of order books
               for tracking, keyed by market ID.
 
     Logs:
         DEBUG: Initialization progress for each market.
         INFO: Completion and details of markets initialized.
     """
-    latest_orderbooks: Dict[str, Order_Book] = {}
+    latest_orderbooks: Dict[str, Book] = {}
     current_orderbooks_track: Dict[str, Orderbook_Track] = {}
 
     logger.debug("Refreshing markets and initializing order books.")
-    log_string = ""
 
-    for market in gamma_markets:
-        log_string += market.slug + " / "
-        initial_orderbook = orderbook_from_clob(market.clobTokenId)
+    markets_by_token = {market.clobTokenId: market for market in gamma_markets}
+    log_string = " / ".join(market.slug for market in gamma_markets)
+
+    for token_id, initial_orderbook in orderbooks_from_clob(list(markets_by_token)):
+        market = markets_by_token[token_id]
         if initial_orderbook:
-            # Convert clob timestamp (milliseconds) to ISO 8601 string
-            clob_timestamp_iso = datetime.fromtimestamp(safe_float(initial_orderbook["timestamp"]) / 1000.0, tz=timezone.utc).isoformat()
-
-            # Construct Order_Book object with ISO 8601 timestamps
-            initial_orderbook = Order_Book(
-                market=initial_orderbook["market"],
-                asset_id=initial_orderbook["asset_id"],
-                fetched_at=datetime.now(timezone.utc).isoformat(),  # Current time in ISO 8601
-                hash=initial_orderbook["hash"],
-                timestamp=clob_timestamp_iso,  # CLOB timestamp in ISO 8601
-                bids=[OrderSummary(price=float(bid["price"]), size=float(bid["size"])) for bid in initial_orderbook["bids"]],
-                asks=[OrderSummary(price=float(ask["price"]), size=float(ask["size"])) for ask in initial_orderbook["asks"]]
-            )
+            initial_orderbook = orderbook_from_clob_data(initial_orderbook)
 
             # Create the Orderbook_Track object
-            current_orderbooks_track[market.id] = Orderbook_Track(
-                id=market.id,
-                slug=market.slug,
-                fetched_at=initial_orderbook.fetched_at,  # Already ISO 8601
-                hour=cycle_hour,
-                date=cycle_date,
-                start_orderbook=initial_orderbook,
-                start_time_stamp=initial_orderbook.timestamp,  # Already ISO 8601
-                condition_id=market.conditionId if market.conditionId else "",
-                order_price_min_tick_size=market.orderPriceMinTickSize if market.orderPriceMinTickSize else 0.0,
-                order_min_size=market.orderMinSize if market.orderMinSize else 0.0,
-                clob_token_id=market.clobTokenId,
-                updates=[]  # Empty updates initially
-            )
+            current_orderbooks_track[market.id] = _orderbook_new_track(market, initial_orderbook, cycle_hour, cycle_date)
 
             # Track the latest order book snapshot
             latest_orderbooks[market.id] = initial_orderbook
@@ -79,18 +118,82 @@ def orderbook_initialize_orderbookTracks(
     logger.info(f"Refreshing done for: {log_string}")
     return current_orderbooks_track, latest_orderbooks
 
+def orderbook_rollover_tracks(
+        gamma_markets: List[Gamma_Market],
+        latest_orderbooks: Dict[str, Book],
+        cycle_hour: int,
+        cycle_date: str,
+        rollover_time: Optional[datetime] = None
+        ) -> Tuple[Dict[str, Orderbook_Track], Dict[str, Book]]:
+    """
+    Start the tracks of a new hour without re-fetching the books that are already being polled.
+
+    Each market's new track starts at the last book polled in the previous hour. That book is
+    only replaced when its hash changes, so for a quiet market it can be hours old: the start
+    book is stamped with `rollover_time` instead, as it was still current at the last poll. Only
+    markets without a polled book, i.e. markets new to `gamma_markets`, are fetched. Fresh
+    dictionaries are returned, so the caller can swap them in and hand the closed hour's tracks
+    to another thread without sharing anything mutable.
+
+    Args:
+        gamma_markets (List[Gamma_Market]): Markets to track in the new hour.
+        latest_orderbooks (Dict[str, Book]): Latest polled books of the closing hour, keyed by market ID.
+        cycle_hour (int): The hour the new tracks belong to.
+        cycle_date (str): The date the new tracks belong to (ISO 8601).
+        rollover_time (Optional[datetime]): Start time of the new tracks; defaults to now.
 
+    Returns:
+        Tuple[Dict[str, Orderbook_Track], Dict[str, Book]]: The new tracks and latest books, keyed by market ID.
+    """
+    current_orderbooks_track: Dict[str, Orderbook_Track] = {}
+    seeded_orderbooks: Dict[str, Book] = {}
+    new_markets: List[Gamma_Market] = []
+    start_time = (rollover_time or datetime.now(timezone.utc)).isoformat()
+
+    for market in gamma_markets:
+        latest_orderbook = latest_orderbooks.get(market.id)
+        if latest_orderbook is None:
+            new_markets.append(market)
+            continue
+        # Books are replaced, never mutated, on every poll, so the copy can be shared by the track and the polls
+        start_orderbook = _orderbook_restamped(latest_orderbook, start_time)
+        current_orderbooks_track[market.id] = _orderbook_new_track(market, start_orderbook, cycle_hour, cycle_date)
+        seeded_orderbooks[market.id] = start_orderbook
+
+    num_seeded = len(current_orderbooks_track)
+    if new_markets:
+        new_tracks, new_orderbooks = orderbook_initialize_orderbookTracks(new_markets, cycle_hour, cycle_date)
+        current_orderbooks_track.update(new_tracks)
+        seeded_orderbooks.update(new_orderbooks)
+
+    logger.info(
+        f"Rolled over to {cycle_date} {cycle_hour:02d}:00: {num_seeded} tracks seeded "
+        f"from polled books, {len(new_markets)} new markets fetched."
+    )
+    return current_orderbooks_track, seeded_orderbooks
+
+
+
+def _orderbook_levels(orderbook: Book, side: str) -> Iterator[Tuple[float, float]]:
+    """
+    Iterate over the (price, size) levels of one side ("bids" or "asks") without building OrderSummary objects.
+    """
+    if isinstance(orderbook, Compact_Order_Book):
+        if side == "bids":
+            return zip(orderbook.bid_prices, orderbook.bid_sizes)
+        return zip(orderbook.ask_prices, orderbook.ask_sizes)
+    return ((level.price, level.size) for level in getattr(orderbook, side))
 
 def orderbook_get_updates(
-    old_orderbook: Order_Book,
-    new_orderbook: Order_Book
+    old_orderbook: Book,
+    new_orderbook: Book
 ) -> Updates:
     """
     Compute the differences between two order books.
 
     Args:
-        old_orderbook (Order_Book): The previous order book data.
-        new_orderbook (Order_Book): The latest order book data.
+        old_orderbook (Book): The previous order book data.
+        new_orderbook (Book): The latest order book data.
 
     Returns:
         Changes: An object containing the differences between the bid and ask levels.
@@ -100,8 +203,8 @@ def orderbook_get_updates(
     changes = Changes()
 
     # Compare bids
-    old_bids = {bid.price: bid.size for bid in old_orderbook.bids}
-    new_bids = {bid.price: bid.size for bid in new_orderbook.bids}
+    old_bids = dict(_orderbook_levels(old_orderbook, "bids"))
+    new_bids = dict(_orderbook_levels(new_orderbook, "bids"))
     for price, size in new_bids.items():
         if price not in old_bids or old_bids[price] != size:
             changes.bids.append(OrderSummary(price=price, size=size))
@@ -109,8 +212,8 @@ def orderbook_get_updates(
         changes.bids.append(OrderSummary(price=price, size=0))  # Price level removed
 
     # Compare asks
-    old_asks = {ask.price: ask.size for ask in old_orderbook.asks}
-    new_asks = {ask.price: ask.size for ask in new_orderbook.asks}
+    old_asks = dict(_orderbook_levels(old_orderbook, "asks"))
+    new_asks = dict(_orderbook_levels(new_orderbook, "asks"))
     for price, size in new_asks.items():
         if price not in old_asks or old_asks[price] != size:
             changes.asks.append(OrderSummary(price=price, size=size))
@@ -125,18 +228,147 @@ def orderbook_get_updates(
     updates = Updates(new_orderbook.fetched_at,changes ) # ISO 8601 format
     return updates
 
+def _orderbook_levels_to_arrays(orderbook: Book, side: str) -> Tuple[NDArray[np.float64], NDArray[np.float64]]:
+    """
+    Return the price and size arrays of one side ("bids" or "asks").
+
+    Compact order books are wrapped without copying.
+    """
+    import numpy as np  # only the "numpy" diff engine needs it; keeps it off the startup path
+
+    if isinstance(orderbook, Compact_Order_Book):
+        if side == "bids":
+            prices, sizes = orderbook.bid_prices, orderbook.bid_sizes
+        else:
+            prices, sizes = orderbook.ask_prices, orderbook.ask_sizes
+        return np.frombuffer(prices, dtype=np.float64), np.frombuffer(sizes, dtype=np.float64)
+
+    levels = getattr(orderbook, side)
+    return (
+        np.fromiter((level.price for level in levels), dtype=np.float64, count=len(levels)),
+        np.fromiter((level.size for level in levels), dtype=np.float64, count=len(levels)),
+    )
+
+def _orderbook_diff_side_vectorized(
+    old_prices: NDArray[np.float64],
+    old_sizes: NDArray[np.float64],
+    new_prices: NDArray[np.float64],
+    new_sizes: NDArray[np.float64],
+    tick_size: float
+) -> Optional[List[OrderSummary]]:
+    """
+    Diff one side of two order books on integer tick indices.
+
+    Returns:
+        Optional[List[OrderSummary]]: The changed levels sorted by price (descending), with removed
+            levels reported as size 0. None if the side cannot be diffed on the tick grid
+            (duplicate levels, or distinct prices that fall on the same tick).
+    """
+    import numpy as np
+
+    old_ticks = np.rint(old_prices / tick_size).astype(np.int64)
+    new_ticks = np.rint(new_prices / tick_size).astype(np.int64)
+
+    old_order = np.argsort(old_ticks, kind="stable")
+    old_sorted = old_ticks[old_order]
+    if np.any(old_sorted[1:] == old_sorted[:-1]) or len(np.unique(new_ticks)) != len(new_ticks):
+        return None
+
+    # Locate every new level in the old book with a sorted merge
+    if len(old_ticks):
+        position = np.minimum(np.searchsorted(old_sorted, new_ticks), len(old_ticks) - 1)
+        old_index = old_order[position]
+        found = old_sorted[position] == new_ticks
+    else:
+        old_index = np.zeros(len(new_ticks), dtype=np.int64)
+        found = np.zeros(len(new_ticks), dtype=bool)
+
+    # Matching ticks must also be matching prices, otherwise the dict semantics differ
+    if not np.array_equal(old_prices[old_index[found]], new_prices[found]):
+        return None
+
+    changed = ~found
+    changed[found] = old_sizes[old_index[found]] != new_sizes[found]
+    removed = np.ones(len(old_ticks), dtype=bool)
+    removed[old_index[found]] = False
+
+    prices = np.concatenate((new_prices[changed], old_prices[removed]))
+    sizes = np.concatenate((new_sizes[changed], np.zeros(np.count_nonzero(removed))))
+    is_removed = np.concatenate((np.zeros(np.count_nonzero(changed), dtype=bool), np.ones(np.count_nonzero(removed), dtype=bool)))
+    order = np.argsort(-np.concatenate((new_ticks[changed], old_ticks[removed])), kind="stable")
+
+    return [
+        OrderSummary(price=price, size=0 if was_removed else size)
+        for price, size, was_removed in zip(prices[order].tolist(), sizes[order].tolist(), is_removed[order].tolist())
+    ]
+
+def orderbook_get_updates_vectorized(
+    old_orderbook: Book,
+    new_orderbook: Book,
+    tick_size: float
+) -> Updates:
+    """
+    Compute the differences between two order books on price/size arrays.
+
+    Prices are mapped to integer tick indices using the market's `order_price_min_tick_size` and
+    diffed with sorted merges. The result is identical to `orderbook_get_updates`, which is used
+    as a fallback when the tick size is unknown or a side does not fit the tick grid.
+
+    Args:
+        old_orderbook (Book): The previous order book data.
+        new_orderbook (Book): The latest order book data.
+        tick_size (float): The minimum price increment of the market.
+
+    Returns:
+        Updates: The changes, stamped with the fetch time of the new order book.
+    """
+    if tick_size <= 0:
+        return orderbook_get_updates(old_orderbook, new_orderbook)
+
+    bids = _orderbook_diff_side_vectorized(
+        *_orderbook_levels_to_arrays(old_orderbook, "bids"), *_orderbook_levels_to_arrays(new_orderbook, "bids"), tick_size
+    )
+    asks = _orderbook_diff_side_vectorized(
+        *_orderbook_levels_to_arrays(old_orderbook, "asks"), *_orderbook_levels_to_arrays(new_orderbook, "asks"), tick_size
+    )
+    if bids is None or asks is None:
+        return orderbook_get_updates(old_orderbook, new_orderbook)
+
+    return Updates(new_orderbook.fetched_at, Changes(bids=bids, asks=asks))
+
+def orderbook_diff(
+    old_orderbook: Book,
+    new_orderbook: Book,
+    tick_size: float
+) -> Updates:
+    """
+    Compute the differences between two order books with the engine set in `orderbook.diff_engine`.
+
+    Both engines ("dict" and "numpy") produce identical output.
+    """
+    if get_config()["orderbook"]["diff_engine"] == "numpy":
+        return orderbook_get_updates_vectorized(old_orderbook, new_orderbook, tick_size)
+    return orderbook_get_updates(old_orderbook, new_orderbook)
+
 def orderbook_fetch_and_add_updates(
     gamma_markets: List[Gamma_Market],
     current_orderbooks_track: Dict[str, Orderbook_Track],
-    latest_orderbooks: Dict[str, Order_Book]
+    latest_orderbooks: Dict[str, Book]
 ) -> None:
     """
     Fetch updates for all markets and apply changes to in-memory order books.
 
+    The `hash` of each response is compared before anything else; only books whose hash changed
+    are decoded into price levels and diffed. `orderbook_parse_stats` counts both paths.
+
+    The order books of a tick are requested in batches through the CLOB `/books` endpoint, and the
+    batches are issued concurrently (bounded by `clob_orderbook_fetch_workers`), so the wall time of
+    a tick is bounded by the slowest request rather than the sum of all markets.
+
     Args:
         gamma_markets (List[Gamma_Market]): List of market metadata objects.
         current_orderbooks_track (Dict[str, Orderbook_Track]): Dictionary of in-memory order books keyed by market ID.
-        latest_orderbooks (Dict[str, Order_Book]): Dictionary of latest order book snapshots for comparison,
+        latest_orderbooks (Dict[str, Book]): Dictionary of latest order book snapshots for comparison,
             keyed by market ID.
 
     Logs:
@@ -149,39 +381,36 @@ def orderbook_fetch_and_add_updates(
     """
     logger.debug(f"Updating Markets started.")
 
-    for market in gamma_markets:
-        market_id = market.id
-        new_orderbook_data = orderbook_from_clob(market.clobTokenId)  
-
-        if new_orderbook_data:
-            # Convert raw data into Order_Book
-            new_orderbook = Order_Book(
-                market=new_orderbook_data["market"],
-                asset_id=new_orderbook_data["asset_id"],
-                fetched_at=datetime.now(timezone.utc).isoformat(),  # ISO 8601 format
-                hash=new_orderbook_data["hash"],
-                timestamp=datetime.fromtimestamp(safe_float(new_orderbook_data["timestamp"]) / 1000.0, tz=timezone.utc).isoformat(),  # ISO 8601 format
-                bids=[OrderSummary(price=float(bid["price"]), size=float(bid["size"])) for bid in new_orderbook_data["bids"]],
-                asks=[OrderSummary(price=float(ask["price"]), size=float(ask["size"])) for ask in new_orderbook_data["asks"]]
-            )
+    markets_by_token = {market.clobTokenId: market for market in gamma_markets}
+
+    # Requests are fanned out concurrently; each diff is applied as soon as its response arrives
+    for token_id, new_orderbook_data in orderbooks_from_clob(list(markets_by_token)):
+        market_id = markets_by_token[token_id].id
 
+        # A market whose initial book could not be fetched has no track yet
+        if new_orderbook_data and market_id in latest_orderbooks:
             current_orderbook = latest_orderbooks[market_id]
-            current_hash = current_orderbook.hash
-            new_hash = new_orderbook.hash
 
-            if current_hash != new_hash:
-                # Calculate changes using a helper function
-                updates = orderbook_get_updates(current_orderbook, new_orderbook)
+            # Fast path: an unchanged hash means an unchanged book, so the levels are never decoded
+            if new_orderbook_data["hash"] == current_orderbook.hash:
+                orderbook_parse_stats["fast_path"] += 1
+                current_orderbooks_track[market_id].updates.append_no_change(datetime.now(timezone.utc))
+                continue
+
+            # Convert raw data into a compact order book
+            orderbook_parse_stats["full_parse"] += 1
+            new_orderbook = orderbook_from_clob_data(new_orderbook_data)
+
+            # Calculate changes using a helper function
+            updates = orderbook_diff(
+                current_orderbook, new_orderbook, current_orderbooks_track[market_id].order_price_min_tick_size
+            )
 
-                # Update the order book track with new changes
-                current_orderbooks_track[market_id].updates.append(updates)
+            # Update the order book track with new changes
+            current_orderbooks_track[market_id].updates.append(updates)
 
-                # Update the latest order book snapshot
-                latest_orderbooks[market_id] = new_orderbook
-            
-            else:
-                current_orderbooks_track[market_id].updates.append(
-                    Updates(new_orderbook.fetched_at, Changes())
-                )
+            # Update the latest order book snapshot
+            latest_orderbooks[market_id] = new_orderbook
 
-    logger.info(f"Updating Markets complete.")
\ No newline at end of file
+    logger.info(f"Updating Markets complete.")
+    logger.debug(f"HTTP session stats: {get_session_stats()}, parse stats: {orderbook_parse_stats}")
\ No newline at end of file
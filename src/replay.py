@@ -0,0 +1,238 @@
+"""
+Replay archived hourly files into order book states.
+
+A file holds a start book and the `Changes` of every poll (see `orderbook_get_updates`); a
+level with size 0 was removed. `ReplayBook` keeps both sides on a dense price grid, so applying
+a change is one array store and a snapshot is one array copy.
+"""
+import re
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+from numpy.typing import NDArray
+
+from src.formats import orderbook_format_from_path, read_npz_arrays, read_orderbook_file
+from src.models import Book, Changes, OrderSummary, UpdateLog
+
+# Default price grid; prices are in [0, 1]. A file whose `order_price_min_tick_size` is finer
+# (Polymarket ticks go down to 0.0001) refines the grid of the book it is replayed into.
+REPLAY_TICK_SIZE = 0.001
+
+
+class ReplayBook:
+    """
+    Order book whose sides are size arrays indexed by price tick.
+
+    `bid_sizes[i]` / `ask_sizes[i]` is the size at price `i * tick_size`, 0 if there is no level.
+    `timestamp` is the time of the last applied start book or update.
+    """
+    __slots__ = ("tick_size", "timestamp", "bid_sizes", "ask_sizes")
+
+    def __init__(self, tick_size: float = REPLAY_TICK_SIZE, timestamp: Optional[str] = None) -> None:
+        self.tick_size = tick_size
+        self.timestamp = timestamp
+        num_ticks = round(1 / tick_size) + 1
+        self.bid_sizes: NDArray[np.float64] = np.zeros(num_ticks)
+        self.ask_sizes: NDArray[np.float64] = np.zeros(num_ticks)
+
+    @property
+    def prices(self) -> NDArray[np.float64]:
+        return np.arange(len(self.bid_sizes)) * self.tick_size
+
+    def refine(self, tick_size: float) -> None:
+        """
+        Move the book onto a finer grid, keeping its levels; a tick size that is not finer is ignored.
+
+        Raises:
+            ValueError: If the current tick size is not a multiple of `tick_size`.
+        """
+        if not 0 < tick_size < self.tick_size * (1 - 1e-6):
+            return
+        ratio = round(self.tick_size / tick_size)
+        if abs(ratio * tick_size - self.tick_size) > tick_size * 1e-6:
+            raise ValueError(f"Cannot refine a grid of tick size {self.tick_size} to {tick_size}")
+        for name in ("bid_sizes", "ask_sizes"):
+            sizes = np.zeros(round(1 / tick_size) + 1)
+            sizes[::ratio] = getattr(self, name)
+            setattr(self, name, sizes)
+        self.tick_size = tick_size
+
+    def _tick(self, price: float) -> int:
+        tick = round(price / self.tick_size)
+        if abs(price - tick * self.tick_size) > self.tick_size * 1e-6 or not 0 <= tick < len(self.bid_sizes):
+            raise ValueError(f"Price {price} is not on the grid of tick size {self.tick_size}")
+        return tick
+
+    def ticks(self, prices: NDArray[np.float64]) -> NDArray[np.int64]:
+        """
+        Grid indices of an array of prices.
+
+        Raises:
+            ValueError: If a price is not on the grid.
+        """
+        ticks: NDArray[np.int64] = np.rint(prices / self.tick_size).astype(np.int64)
+        off_grid = (np.abs(prices - ticks * self.tick_size) > self.tick_size * 1e-6) | (ticks < 0) | (ticks >= len(self.bid_sizes))
+        if off_grid.any():
+            raise ValueError(f"Price {prices[off_grid][0]} is not on the grid of tick size {self.tick_size}")
+        return ticks
+
+    def set_level(self, side: int, price: float, size: float) -> None:
+        """
+        Set the size of a level; `side` is `UpdateLog.BID` or `UpdateLog.ASK`, a size of 0 removes the level.
+        """
+        (self.bid_sizes if side == UpdateLog.BID else self.ask_sizes)[self._tick(price)] = size
+
+    def reset(self, bids: Iterable[Tuple[float, float]], asks: Iterable[Tuple[float, float]], timestamp: Optional[str]) -> None:
+        """
+        Replace the book with the given (price, size) levels.
+        """
+        self.bid_sizes[:] = 0
+        self.ask_sizes[:] = 0
+        for price, size in bids:
+            self.set_level(UpdateLog.BID, price, size)
+        for price, size in asks:
+            self.set_level(UpdateLog.ASK, price, size)
+        self.timestamp = timestamp
+
+    def reset_to(self, orderbook: Book) -> None:
+        self.reset(
+            ((bid.price, bid.size) for bid in orderbook.bids),
+            ((ask.price, ask.size) for ask in orderbook.asks),
+            orderbook.timestamp,
+        )
+
+    def apply(self, changes: Union[Changes, Dict[str, Any]], timestamp: Optional[str] = None) -> None:
+        """
+        Apply one update, either a `Changes` or the `changes` of a file record.
+        """
+        if isinstance(changes, Changes):
+            for bid in changes.bids:
+                self.set_level(UpdateLog.BID, bid.price, bid.size)
+            for ask in changes.asks:
+                self.set_level(UpdateLog.ASK, ask.price, ask.size)
+        else:
+            for level in changes["bids"]:
+                self.set_level(UpdateLog.BID, level["price"], level["size"])
+            for level in changes["asks"]:
+                self.set_level(UpdateLog.ASK, level["price"], level["size"])
+        if timestamp is not None:
+            self.timestamp = timestamp
+
+    def copy(self) -> "ReplayBook":
+        book = ReplayBook(self.tick_size, self.timestamp)
+        book.bid_sizes[:] = self.bid_sizes
+        book.ask_sizes[:] = self.ask_sizes
+        return book
+
+    def best_bid(self) -> Optional[float]:
+        ticks = np.flatnonzero(self.bid_sizes)
+        return float(ticks[-1] * self.tick_size) if len(ticks) else None
+
+    def best_ask(self) -> Optional[float]:
+        ticks = np.flatnonzero(self.ask_sizes)
+        return float(ticks[0] * self.tick_size) if len(ticks) else None
+
+    @property
+    def bids(self) -> List[OrderSummary]:
+        """
+        Bid levels, best (highest price) first.
+        """
+        ticks = np.flatnonzero(self.bid_sizes)[::-1]
+        return [OrderSummary(price=float(t * self.tick_size), size=float(self.bid_sizes[t])) for t in ticks]
+
+    @property
+    def asks(self) -> List[OrderSummary]:
+        """
+        Ask levels, best (lowest price) first.
+        """
+        ticks = np.flatnonzero(self.ask_sizes)
+        return [OrderSummary(price=float(t * self.tick_size), size=float(self.ask_sizes[t])) for t in ticks]
+
+
+def replay_orderbook_data(data: Dict[str, Any], book: Optional[ReplayBook] = None) -> Iterator[ReplayBook]:
+    """
+    Yield the book after the start order book and after every update of an hourly file in the JSON layout.
+
+    The same `book` is updated in place and yielded each time; `copy()` a state to keep it. Its
+    grid is refined to the file's `order_price_min_tick_size` if that is finer.
+    """
+    book = book or ReplayBook()
+    book.refine(data.get("order_price_min_tick_size") or 0.0)
+    start = data["start_orderbook"]
+    book.reset(
+        ((level["price"], level["size"]) for level in start["bids"]),
+        ((level["price"], level["size"]) for level in start["asks"]),
+        data["start_time_stamp"],
+    )
+    yield book
+    for record in data["updates"]:
+        book.apply(record["changes"], record["timestamp"])
+        yield book
+
+
+def _iso_timestamps(timestamps_us: NDArray[np.int64]) -> List[str]:
+    # Same strings as `UpdateLog.timestamp`, converted in bulk
+    strings = np.datetime_as_string(timestamps_us.astype("datetime64[us]"), unit="us").tolist()
+    return [(s[:-7] if s.endswith(".000000") else s) + "+00:00" for s in strings]
+
+def _replay_npz(path: str, book: ReplayBook) -> Iterator[ReplayBook]:
+    # Straight from the columns: the grid indices of all levels are computed at once
+    with open(path, "rb") as f:
+        arrays = read_npz_arrays(f)
+    book.refine(arrays["header"].get("order_price_min_tick_size") or 0.0)
+    book.bid_sizes[:] = 0
+    book.ask_sizes[:] = 0
+    book.bid_sizes[book.ticks(arrays["start_bid_prices"])] = arrays["start_bid_sizes"]
+    book.ask_sizes[book.ticks(arrays["start_ask_prices"])] = arrays["start_ask_sizes"]
+    book.timestamp = arrays["header"]["start_time_stamp"]
+    yield book
+
+    offsets = arrays["update_offsets"].tolist()
+    sides = arrays["level_sides"].tolist()
+    ticks = book.ticks(arrays["level_prices"]).tolist()
+    sizes = arrays["level_sizes"].tolist()
+    book_sides = (book.bid_sizes, book.ask_sizes)  # indexed by UpdateLog.BID / UpdateLog.ASK
+    for index, timestamp in enumerate(_iso_timestamps(arrays["update_timestamps_us"])):
+        for i in range(offsets[index], offsets[index + 1]):
+            book_sides[sides[i]][ticks[i]] = sizes[i]
+        book.timestamp = timestamp
+        yield book
+
+
+def replay_orderbook_file(path: str, book: Optional[ReplayBook] = None) -> Iterator[ReplayBook]:
+    """
+    Yield the book states of one local hourly file of any format; see `replay_orderbook_data`.
+    """
+    book = book or ReplayBook()
+    if orderbook_format_from_path(path).name == "npz":
+        return _replay_npz(path, book)
+    return replay_orderbook_data(read_orderbook_file(path), book)
+
+
+_FILE_HOUR = re.compile(r"-(\d{4}-\d{2}-\d{2})-(\d{1,2})\.[^/\\]*$")
+
+def _file_hour(path: str) -> Tuple[str, int]:
+    # File names are "<market_id>-<YYYY-MM-DD>-<hour><extension>"
+    match = _FILE_HOUR.search(path)
+    if match is None:
+        raise ValueError(f"Cannot determine the date and hour of {path!r}")
+    return match.group(1), int(match.group(2))
+
+
+def replay_market(paths: Iterable[str], tick_size: float = REPLAY_TICK_SIZE) -> Iterator[ReplayBook]:
+    """
+    Yield the book states of a market across its hourly files, in time order.
+
+    Each file restarts from its own start order book, which is a fresh snapshot of the book at the hour boundary.
+
+    Args:
+        paths (Iterable[str]): Local hourly files of one market, in any order and format.
+        tick_size (float): Initial price grid of the book, refined by files with a finer
+            `order_price_min_tick_size`; every price must be a multiple of the file's grid.
+
+    Yields:
+        ReplayBook: The same book, updated in place; `copy()` a state to keep it.
+    """
+    book = ReplayBook(tick_size)
+    for path in sorted(paths, key=_file_hour):
+        yield from replay_orderbook_file(path, book)
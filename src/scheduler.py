@@ -0,0 +1,161 @@
+import math
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Callable, Deque, Dict, Optional
+
+from src.utils import logger
+
+SCHEDULER_POLICIES = ("skip", "catch_up")
+
+
+@dataclass
+class TickRecord:
+    scheduled: datetime  # wall-clock boundary the tick belongs to
+    lateness_s: float  # how late the tick started after its deadline
+    duration_s: float  # how long the tick callback ran
+    overrun: bool  # True if the callback ran past the next deadline
+
+
+class TickScheduler:
+    """
+    Fire a callback on every wall-clock boundary that is a multiple of `interval_s`.
+
+    Deadlines are kept on the monotonic clock, anchored to the wall clock once (and again
+    if the wall clock jumps), so ticks do not drift and a boundary can never fire twice.
+    Every tick is passed the boundary it belongs to, not the time it actually started.
+
+    Overrun policies, applied when a tick runs past one or more following boundaries:
+        - "skip": resume at the next boundary that is still in the future.
+        - "catch_up": run the missed boundaries back to back, at most `max_catch_up_ticks`
+          in a row; anything beyond that is skipped.
+
+    `monotonic`, `wall_time` and `sleep` default to `time.monotonic`, `time.time` and a wait that
+    `stop()` interrupts; tests pass a fake clock instead.
+    """
+
+    def __init__(
+        self,
+        interval_s: float,
+        policy: str = "skip",
+        max_catch_up_ticks: int = 2,
+        lateness_history: int = 240,
+        resync_threshold_s: float = 1.0,
+        monotonic: Callable[[], float] = time.monotonic,
+        wall_time: Callable[[], float] = time.time,
+        sleep: Optional[Callable[[float], object]] = None
+    ) -> None:
+        if interval_s <= 0:
+            raise ValueError(f"interval_s must be positive, got {interval_s}")
+        if policy not in SCHEDULER_POLICIES:
+            raise ValueError(f"Unknown scheduler policy {policy!r}, expected one of {SCHEDULER_POLICIES}")
+
+        self.interval_s = interval_s
+        self.policy = policy
+        self.max_catch_up_ticks = max_catch_up_ticks
+        self.resync_threshold_s = resync_threshold_s
+        self.history: Deque[TickRecord] = deque(maxlen=lateness_history)
+        self.ticks = 0
+        self.overruns = 0
+        self.skipped_ticks = 0
+        self._stop_event = threading.Event()
+        self._monotonic = monotonic
+        self._wall_time = wall_time
+        self._sleep = self._stop_event.wait if sleep is None else sleep
+        self._wall_offset = wall_time() - monotonic()
+
+    def stop(self) -> None:
+        """
+        Stop the scheduler after the current tick.
+        """
+        self._stop_event.set()
+
+    def _next_boundary(self, wall_time: float) -> float:
+        return math.floor(wall_time / self.interval_s + 1) * self.interval_s
+
+    def _resync(self) -> None:
+        """
+        Re-anchor monotonic deadlines if the wall clock was stepped (e.g. by NTP).
+        """
+        offset = self._wall_time() - self._monotonic()
+        if abs(offset - self._wall_offset) > self.resync_threshold_s:
+            logger.warning(f"Wall clock moved by {offset - self._wall_offset:.3f}s, re-anchoring scheduler.")
+            self._wall_offset = offset
+
+    def run(self, on_tick: Callable[[datetime], None]) -> None:
+        """
+        Run until `stop()` is called, calling `on_tick` with each scheduled boundary (UTC).
+
+        Args:
+            on_tick (Callable[[datetime], None]): Work to perform for a boundary.
+
+        Logs:
+            DEBUG: Lateness and duration of every tick.
+            WARNING: Overruns and skipped boundaries.
+        """
+        tick_wall = self._next_boundary(self._wall_time())
+        catch_up_streak = 0
+
+        while not self._stop_event.is_set():
+            deadline = tick_wall - self._wall_offset
+            delay = deadline - self._monotonic()
+            if delay > 0:
+                self._sleep(delay)
+                if self._stop_event.is_set():
+                    break
+
+            started = self._monotonic()
+            scheduled = datetime.fromtimestamp(tick_wall, tz=timezone.utc)
+            on_tick(scheduled)
+            finished = self._monotonic()
+
+            next_tick_wall = tick_wall + self.interval_s
+            overrun = finished > next_tick_wall - self._wall_offset
+            record = TickRecord(scheduled, started - deadline, finished - started, overrun)
+            self.history.append(record)
+            self.ticks += 1
+            logger.debug(
+                f"Tick {scheduled.isoformat()} lateness={record.lateness_s * 1000:.1f}ms "
+                f"duration={record.duration_s * 1000:.1f}ms"
+            )
+
+            self._resync()
+            if overrun:
+                resume_wall = self._next_boundary(finished + self._wall_offset)
+                missed = round((resume_wall - next_tick_wall) / self.interval_s)
+                if catch_up_streak == 0:
+                    self.overruns += 1
+                    logger.warning(
+                        f"Tick {scheduled.isoformat()} overran its slot "
+                        f"(lateness {record.lateness_s:.2f}s, duration {record.duration_s:.2f}s), {missed} tick(s) missed."
+                    )
+                if self.policy == "catch_up" and catch_up_streak < self.max_catch_up_ticks:
+                    catch_up_streak += 1
+                else:
+                    catch_up_streak = 0
+                    self.skipped_ticks += missed
+                    logger.warning(f"Skipping {missed} tick(s), resuming at {datetime.fromtimestamp(resume_wall, tz=timezone.utc).isoformat()}.")
+                    next_tick_wall = resume_wall
+            else:
+                catch_up_streak = 0
+
+            tick_wall = next_tick_wall
+
+    def lateness_stats(self) -> Dict[str, float]:
+        """
+        Summarize the recorded tick history.
+
+        Returns:
+            Dict[str, float]: Number of ticks, overruns and skipped boundaries, and the mean and
+                maximum lateness (seconds) over the recorded history.
+        """
+        lateness = [record.lateness_s for record in self.history]
+        return {
+            "ticks": self.ticks,
+            "overruns": self.overruns,
+            "skipped_ticks": self.skipped_ticks,
+            "mean_lateness_s": sum(lateness) / len(lateness) if lateness else 0.0,
+            "max_lateness_s": max(lateness) if lateness else 0.0,
+        }
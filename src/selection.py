@@ -0,0 +1,144 @@
+import re
+from dataclasses import dataclass, field, fields
+from typing import Any, Dict, List, Optional, Pattern
+
+from src.utils import get_config, safe_float
+
+
+@dataclass
+class SelectionRule:
+    """
+    Conditions on a GAMMA market; a market matches the rule if all given conditions hold.
+
+    Slug and tag comparisons are case-insensitive.
+
+    Raises:
+        ValueError: If no condition is given, as the rule would match every market.
+    """
+    slug_all: List[str] = field(default_factory=list)  # every substring must occur in the slug
+    slug_any: List[str] = field(default_factory=list)  # at least one substring must occur in the slug
+    tags_any: List[str] = field(default_factory=list)  # the market carries at least one of these tags
+    min_volume: Optional[float] = None
+    max_volume: Optional[float] = None
+
+    def __post_init__(self) -> None:
+        if not (self.slug_all or self.slug_any or self.tags_any) and self.min_volume is None and self.max_volume is None:
+            raise ValueError("A selection rule needs at least one condition")
+
+    @classmethod
+    def from_config(cls, rule: Dict[str, Any]) -> "SelectionRule":
+        """
+        Raises:
+            ValueError: If the rule has keys that are not SelectionRule fields, or no condition.
+        """
+        known = {f.name for f in fields(cls)}
+        unknown = set(rule) - known
+        if unknown:
+            raise ValueError(f"Unknown selection rule keys {sorted(unknown)}, expected some of {sorted(known)}")
+        return cls(**rule)
+
+    def slug_pattern(self) -> str:
+        """
+        Regular expression (lookaheads only) matching the slugs allowed by this rule.
+        """
+        pattern = "".join(f"(?=.*{re.escape(s.lower())})" for s in self.slug_all)
+        if self.slug_any:
+            pattern += f"(?=.*(?:{'|'.join(re.escape(s.lower()) for s in self.slug_any)}))"
+        return pattern
+
+
+def market_tags(market: Dict[str, Any]) -> List[str]:
+    """
+    Lower-cased tag labels and slugs of a GAMMA market (tags may be strings or objects).
+    """
+    tags: List[str] = []
+    for tag in market.get("tags") or []:
+        if isinstance(tag, dict):
+            tags.extend(str(tag[key]).lower() for key in ("label", "slug") if tag.get(key))
+        else:
+            tags.append(str(tag).lower())
+    return tags
+
+
+def market_volume(market: Dict[str, Any]) -> float:
+    return safe_float(market.get("volumeNum", market.get("volume")))
+
+
+class _CompiledRule:
+    __slots__ = ("slug", "tags", "min_volume", "max_volume")
+
+    def __init__(self, rule: SelectionRule) -> None:
+        self.slug: Optional[Pattern[str]] = re.compile(rule.slug_pattern(), re.DOTALL) if rule.slug_pattern() else None
+        self.tags = frozenset(tag.lower() for tag in rule.tags_any)
+        self.min_volume = rule.min_volume
+        self.max_volume = rule.max_volume
+
+    def matches(self, slug: str, market: Dict[str, Any]) -> bool:
+        if self.slug is not None and self.slug.match(slug) is None:
+            return False
+        if self.tags and self.tags.isdisjoint(market_tags(market)):
+            return False
+        if self.min_volume is not None or self.max_volume is not None:
+            volume = market_volume(market)
+            if self.min_volume is not None and volume < self.min_volume:
+                return False
+            if self.max_volume is not None and volume > self.max_volume:
+                return False
+        return True
+
+
+def _combined_slug_pattern(rules: List[SelectionRule]) -> Optional[Pattern[str]]:
+    """
+    One regex that matches a slug if any rule could match it; None if some rule has no slug condition.
+    """
+    patterns = [rule.slug_pattern() for rule in rules]
+    if not patterns or not all(patterns):
+        return None
+    return re.compile("|".join(f"(?:{pattern})" for pattern in patterns), re.DOTALL)
+
+
+class MarketSelector:
+    """
+    Decide which GAMMA markets to track from include and exclude rules.
+
+    A market is selected if it matches at least one include rule and no exclude rule. The rules
+    are compiled once: the slug conditions of all include rules are merged into a single regex,
+    which rejects almost every market in one match before any per-rule check runs.
+    """
+
+    def __init__(self, include: List[SelectionRule], exclude: Optional[List[SelectionRule]] = None) -> None:
+        if not include:
+            raise ValueError("At least one include rule is required")
+        self.include = [_CompiledRule(rule) for rule in include]
+        self.exclude = [_CompiledRule(rule) for rule in exclude or []]
+        self._include_slugs = _combined_slug_pattern(include)
+
+    def __call__(self, market: Dict[str, Any]) -> bool:
+        slug = (market.get("slug") or "").lower()
+        if self._include_slugs is not None and self._include_slugs.match(slug) is None:
+            return False
+        if not any(rule.matches(slug, market) for rule in self.include):
+            return False
+        return not any(rule.matches(slug, market) for rule in self.exclude)
+
+
+def market_selector_from_config(selection: Dict[str, Any]) -> MarketSelector:
+    """
+    Build a MarketSelector from the `selection` section of config.json.
+    """
+    return MarketSelector(
+        include=[SelectionRule.from_config(rule) for rule in selection["include"]],
+        exclude=[SelectionRule.from_config(rule) for rule in selection.get("exclude", [])],
+    )
+
+
+_market_selector: Optional[MarketSelector] = None
+
+def get_market_selector() -> MarketSelector:
+    """
+    Return the selector built from config.json, compiling it on first use.
+    """
+    global _market_selector
+    if _market_selector is None:
+        _market_selector = market_selector_from_config(get_config()["selection"])
+    return _market_selector
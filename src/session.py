@@ -0,0 +1,130 @@
+import threading
+from typing import Any, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from src.utils import get_config, logger
+
+
+class SessionStats:
+    """
+    Thread-safe counters for the shared HTTP session.
+
+    `connections_opened` counts new TCP/TLS connections; every other request reused a pooled one.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.connections_opened = 0
+
+    def add_request(self) -> None:
+        with self._lock:
+            self.requests += 1
+
+    def add_connection(self) -> None:
+        with self._lock:
+            self.connections_opened += 1
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "connections_opened": self.connections_opened,
+                "connections_reused": max(self.requests - self.connections_opened, 0),
+            }
+
+
+session_stats = SessionStats()
+
+
+class _CountingHTTPConnectionPool(HTTPConnectionPool):
+    def _new_conn(self) -> Any:
+        session_stats.add_connection()
+        return super()._new_conn()
+
+
+class _CountingHTTPSConnectionPool(HTTPSConnectionPool):
+    def _new_conn(self) -> Any:
+        session_stats.add_connection()
+        return super()._new_conn()
+
+
+class PooledHTTPAdapter(HTTPAdapter):  # type: ignore[misc]
+    """
+    HTTPAdapter whose connection pools report every new connection to `session_stats`.
+    """
+
+    def init_poolmanager(self, *args: Any, **kwargs: Any) -> None:
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _CountingHTTPConnectionPool,
+            "https": _CountingHTTPSConnectionPool,
+        }
+
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def _count_response(response: requests.Response, *args: Any, **kwargs: Any) -> None:
+    session_stats.add_request()
+
+
+def create_session(
+    pool_connections: Optional[int] = None,
+    pool_maxsize: Optional[int] = None
+) -> requests.Session:
+    """
+    Create a keep-alive session with connection pooling and gzip negotiation.
+
+    Args:
+        pool_connections (Optional[int]): Number of hosts to keep a connection pool for
+            (default is `http.pool_connections` in config.json).
+        pool_maxsize (Optional[int]): Maximum number of pooled connections per host
+            (default is `http.pool_maxsize` in config.json).
+
+    Returns:
+        requests.Session: The configured session.
+    """
+    http_config = get_config()["http"]
+    pool_connections = http_config["pool_connections"] if pool_connections is None else pool_connections
+    pool_maxsize = http_config["pool_maxsize"] if pool_maxsize is None else pool_maxsize
+    session = requests.Session()
+    adapter = PooledHTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({
+        "Accept-Encoding": "gzip, deflate",
+        "Connection": "keep-alive",
+    })
+    session.hooks["response"].append(_count_response)
+    return session
+
+
+def get_session() -> requests.Session:
+    """
+    Return the process-wide HTTP session, creating it on first use.
+
+    The session is shared by all fetcher threads; its urllib3 pools are thread-safe,
+    so connections to the GAMMA and CLOB hosts are reused across ticks and workers.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = create_session()
+            http_config = get_config()["http"]
+            logger.debug(
+                f"HTTP session created (pool_connections={http_config['pool_connections']}, "
+                f"pool_maxsize={http_config['pool_maxsize']})"
+            )
+        return _session
+
+
+def get_session_stats() -> Dict[str, int]:
+    """
+    Return the request and connection-reuse counters of the shared session.
+    """
+    return session_stats.snapshot()
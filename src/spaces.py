@@ -1,31 +1,42 @@
 import os
-import json
-from datetime import datetime, timedelta, timezone
-from typing import Any, List, Tuple, Dict
-import boto3
+import queue
+import shutil
+import tempfile
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+from typing import IO, Any, List, Optional, Tuple, Dict
 import time
-from botocore.client import Config
-from queue import LifoQueue
-from src.database import get_db_connection, insert_metadata
-from src.utils import config, logger
+from src.database import insert_metadata_batch
+from src.formats import get_orderbook_format
+from src.utils import get_config, logger
 from src.models import DatabaseConfig, MetadataEntry, Orderbook_Track, SpacesConfig
+from src.upload_queue import DurableUploadQueue, UploadQueueItem
 
 
 
-SPACES_CONNECTION_RETRIES = config["spaces"]["connection_retries"]
-BACKOFF_FACTOR = config["spaces"]["backoff_factor"]
-FILE_STORAGE_DIR = config["files"]["storage_dir"]
-
 def spaces_establish_connection(
     endpoint_url: str ,
     access_key: str ,
     secret_key: str ,
     retries: int = 5,
-    backoff_factor: int = 2
-) -> boto3.client:
+    backoff_factor: int = 2,
+    max_pool_connections: Optional[int] = None
+) -> Any:
     """
     Establish a connection to DigitalOcean Spaces with retries and exponential backoff.
+
+    `max_pool_connections` sizes botocore's HTTP pool (default is `spaces.max_pool_connections`);
+    keep it at least `spaces.max_inflight_uploads` so concurrent uploads do not wait for (or
+    discard) pooled connections.
     """
+    # boto3 takes a noticeable part of a cold start to import, so it is loaded on first connect
+    import boto3
+    from botocore.client import Config
+
+    if max_pool_connections is None:
+        max_pool_connections = get_config()["spaces"]["max_pool_connections"]
+
     logger.debug("Attempting to establish connection to DigitalOcean Spaces.")
 
     for attempt in range(1, retries + 1):
@@ -35,7 +46,7 @@ def spaces_establish_connection(
                 endpoint_url=endpoint_url,
                 aws_access_key_id=access_key,
                 aws_secret_access_key=secret_key,
-                config=Config(signature_version="s3v4"),
+                config=Config(signature_version="s3v4", max_pool_connections=max_pool_connections),
             )
             logger.debug(f"Successfully established connection to Spaces on attempt {attempt}.")
             return client
@@ -49,6 +60,85 @@ def spaces_establish_connection(
                 logger.critical("Failed to establish connection to Spaces after all retries.")
                 raise
 
+class SpacesClientManager:
+    """
+    Long-lived, thread-safe holder of the Spaces client, shared by uploads and readers.
+
+    Building a boto3 client resolves the endpoint, loads the service model and opens a new
+    connection pool, so the client is created once on first use and reused across upload cycles.
+    boto3 clients are thread-safe, but creating them is not, hence the lock. After a failed
+    request `invalidate()` drops the client and the next `get_client()` reconnects.
+    """
+
+    def __init__(self, spaces_config: SpacesConfig, max_pool_connections: Optional[int] = None) -> None:
+        self.spaces_config = spaces_config
+        self.max_pool_connections: int = (
+            get_config()["spaces"]["max_pool_connections"] if max_pool_connections is None else max_pool_connections
+        )
+        self._client: Optional[Any] = None
+        self._lock = threading.Lock()
+        self.clients_created = 0
+        self.invalidations = 0
+        self.total_setup_s = 0.0
+        self.last_setup_s = 0.0
+
+    def get_client(self) -> Any:
+        """
+        Return the shared client, creating it on first use or after `invalidate()`.
+        """
+        with self._lock:
+            if self._client is None:
+                start = time.monotonic()
+                self._client = spaces_establish_connection(
+                    access_key=self.spaces_config.SPACES_ACCESS_KEY,
+                    secret_key=self.spaces_config.SPACES_SECRET_KEY,
+                    endpoint_url=self.spaces_config.SPACES_ENDPOINT,
+                    retries=get_config()["spaces"]["connection_retries"],
+                    backoff_factor=get_config()["spaces"]["backoff_factor"],
+                    max_pool_connections=self.max_pool_connections
+                )
+                self.last_setup_s = time.monotonic() - start
+                self.total_setup_s += self.last_setup_s
+                self.clients_created += 1
+                logger.info(f"Spaces client created in {self.last_setup_s * 1000:.1f}ms (client #{self.clients_created}).")
+            return self._client
+
+    def invalidate(self, client: Any) -> None:
+        """
+        Drop `client` after an error, unless another thread already replaced it.
+        """
+        with self._lock:
+            if self._client is client and client is not None:
+                self._client = None
+                self.invalidations += 1
+                logger.warning("Spaces client invalidated, reconnecting on next use.")
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Return client creation counts and setup times (seconds).
+        """
+        with self._lock:
+            return {
+                "clients_created": self.clients_created,
+                "invalidations": self.invalidations,
+                "last_setup_s": self.last_setup_s,
+                "total_setup_s": self.total_setup_s,
+            }
+
+
+_client_manager: Optional[SpacesClientManager] = None
+_client_manager_lock = threading.Lock()
+
+def get_spaces_client_manager(spaces_config: SpacesConfig) -> SpacesClientManager:
+    """
+    Return the process-wide Spaces client manager, creating it on first use.
+    """
+    global _client_manager
+    with _client_manager_lock:
+        if _client_manager is None or _client_manager.spaces_config != spaces_config:
+            _client_manager = SpacesClientManager(spaces_config)
+        return _client_manager
+
 def spaces_prepare_metadata_entry(market_id: str, orderbook_track: Orderbook_Track) -> MetadataEntry:
     """
     Prepare metadata for a given order book.
@@ -65,7 +155,7 @@ def spaces_prepare_metadata_entry(market_id: str, orderbook_track: Orderbook_Tra
         - If no updates exist, `end_time` will be set to an empty string.
     """
     # Ensure timestamps are in ISO 8601 format
-    end_time = orderbook_track.updates[-1].timestamp if len(orderbook_track.updates)!=0 else orderbook_track.start_time_stamp
+    end_time = orderbook_track.updates.last_timestamp() or orderbook_track.start_time_stamp
 
     return MetadataEntry(
         market_id=market_id,
@@ -87,129 +177,205 @@ def spaces_upload_orderbook(
     market_id: str,
     orderbook_track: Orderbook_Track,
     metadata_entry: MetadataEntry,
-    spaces_client: boto3.client,
+    spaces_client: Any,
     SPACES_BUCKET_NAME: str
-) -> str:
+) -> Tuple[str, int]:
     """
     Upload an order book to DigitalOcean Spaces.
+
+    The file is written in the format set by `files.format` in config.json (see `src.formats`).
+    With `spaces.upload_mode` "memory" it is serialized into a spooled buffer that only rolls over
+    to disk above `spaces.spool_max_bytes`, and written to the local storage directory only if
+    every upload attempt failed. With "file" it goes through a local file as before.
+
+    Returns:
+        Tuple[str, int]: The remote path of the uploaded file and its size in bytes.
     """
     logger.debug(f"Preparing order book upload for market_id: {market_id}")
 
-    # Reorder fields for the JSON structure
-    ordered_data = {
-        "id": orderbook_track.id,
-        "slug": orderbook_track.slug,
-        "initial_orderbook_fetched_at": orderbook_track.fetched_at,
-        "hour": orderbook_track.hour,
-        "date": orderbook_track.date,
-        "condition_id": orderbook_track.condition_id,
-        "clob_token_id": orderbook_track.clob_token_id,
-        "order_price_min_tick_size": orderbook_track.order_price_min_tick_size,
-        "order_min_size": orderbook_track.order_min_size,
-        "start_time_stamp": orderbook_track.start_time_stamp,
-        "end_time_stamp": metadata_entry.end_time,
-        "num_updates": metadata_entry.num_updates,
-        "object_generated_at": metadata_entry.meta_generated_at,
-        "start_orderbook": {
-            "market": orderbook_track.start_orderbook.market,
-            "timestamp": orderbook_track.start_orderbook.timestamp,
-            "bids": [bid.__dict__ for bid in orderbook_track.start_orderbook.bids],
-            "asks": [ask.__dict__ for ask in orderbook_track.start_orderbook.asks]
-        },
-        "updates": [
-        {
-            "timestamp": update.timestamp,
-            "changes": {
-                "bids": [change.__dict__ for change in update.changes.bids],
-                "asks": [change.__dict__ for change in update.changes.asks]
-            }
-        }
-        for update in orderbook_track.updates
-        ]
-    }
-
-    # Prepare file paths
+    files_config, upload_config = get_config()["files"], get_config()["spaces"]
+    upload_mode = upload_config["upload_mode"]
+    orderbook_format = get_orderbook_format(files_config["format"])
 
-    filename = f"{orderbook_track.id}-{orderbook_track.date}-{orderbook_track.hour}.json"
-    local_file_path = os.path.join(FILE_STORAGE_DIR, f"hourly/{market_id}/{filename}")
+    # Prepare file paths; the extension identifies the file format
+    filename = f"{orderbook_track.id}-{orderbook_track.date}-{orderbook_track.hour}{orderbook_format.extension}"
+    local_file_path = os.path.join(files_config["storage_dir"], f"hourly/{market_id}/{filename}")
     remote_file_path = f"orderbooks/hourly/{market_id}/{filename}"
 
-    os.makedirs(os.path.dirname(local_file_path), exist_ok=True)
-    try:
-        with open(local_file_path, "w") as f:
-            json.dump(ordered_data, f, indent=2)
-    except Exception as e:
-        logger.error(f"Failed to save order book locally for market_id: {market_id}. Error: {e}")
-        raise
-    
-    # Upload to Spaces with retries
-    retries = 5
-    for attempt in range(retries):
+    # In memory mode the payload only reaches the disk if it outgrows the spool or the upload fails
+    payload: IO[bytes]
+    if upload_mode == "file":
+        os.makedirs(os.path.dirname(local_file_path), exist_ok=True)
+        payload = open(local_file_path, "w+b")
+    else:
+        spool_dir = os.path.join(files_config["storage_dir"], "spool")
+        os.makedirs(spool_dir, exist_ok=True)
+        payload = tempfile.SpooledTemporaryFile(max_size=upload_config["spool_max_bytes"], dir=spool_dir)
+
+    with payload:
         try:
-            if not os.path.exists(local_file_path):
-                logger.error(f"Local file does not exist: {local_file_path}")
-            else:
-                logger.debug(f"Local file path is valid: {local_file_path}")
-            spaces_client.upload_file(local_file_path, SPACES_BUCKET_NAME, remote_file_path)
-            logger.debug(f"Successfully uploaded {local_file_path} to {remote_file_path} in Spaces.")
+            orderbook_format.write(orderbook_track, metadata_entry, payload)
+        except Exception as e:
+            logger.error(f"Failed to serialize order book for market_id: {market_id}. Error: {e}")
+            raise
+        num_bytes = payload.tell()
+        logger.debug(f"Serialized {num_bytes} bytes for {remote_file_path} ({upload_mode} mode).")
+
+        # Upload to Spaces with retries
+        retries = 5
+        for attempt in range(retries):
             try:
-                os.remove(local_file_path)
-                logger.debug(f"Deleted local file: {local_file_path}")
+                payload.seek(0)
+                spaces_client.upload_fileobj(payload, SPACES_BUCKET_NAME, remote_file_path)
+                logger.debug(f"Successfully uploaded {remote_file_path} to Spaces.")
+                break
             except Exception as e:
-                logger.error(f"Failed to delete local file {local_file_path}. Error: {e}")
-            break
+                logger.error(f"Upload attempt {attempt + 1} failed for {remote_file_path}. Error: {e}")
+                if attempt < retries - 1:
+                    time.sleep(2 ** attempt)  # Exponential backoff
+                else:
+                    logger.critical(f"All upload attempts failed for {remote_file_path}.")
+                    if upload_mode != "file":
+                        spaces_spill_payload(payload, local_file_path)
+                    raise
+
+    # Remove the local copy: the upload file in file mode, or a spill left by an earlier failed cycle
+    if os.path.exists(local_file_path):
+        try:
+            os.remove(local_file_path)
+            logger.debug(f"Deleted local file: {local_file_path}")
         except Exception as e:
-            logger.error(f"Upload attempt {attempt + 1} failed for {local_file_path}. Error: {e}")
-            if attempt < retries - 1:
-                time.sleep(2 ** attempt)  # Exponential backoff
-            else:
-                logger.critical(f"All upload attempts failed for {local_file_path}.")
-                raise
-    return remote_file_path
+            logger.error(f"Failed to delete local file {local_file_path}. Error: {e}")
+    return remote_file_path, num_bytes
+
+def spaces_spill_payload(payload: IO[bytes], local_file_path: str) -> None:
+    """
+    Write a payload that could not be uploaded to `local_file_path`, so it survives the failed cycle.
+    """
+    try:
+        os.makedirs(os.path.dirname(local_file_path), exist_ok=True)
+        payload.seek(0)
+        with open(local_file_path, "wb") as f:
+            shutil.copyfileobj(payload, f)
+        logger.warning(f"Spilled failed upload to local file: {local_file_path}")
+    except Exception as e:
+        logger.error(f"Failed to spill payload to {local_file_path}. Error: {e}")
+
+def spaces_upload_worker(
+    market_id: str,
+    orderbook_track: Orderbook_Track,
+    client_manager: SpacesClientManager
+) -> Tuple[MetadataEntry, str, int]:
+    """
+    Upload one order book track. Runs on an uploader worker thread.
+
+    Returns:
+        Tuple[MetadataEntry, str, int]: The metadata, the remote file path and the uploaded size in bytes.
+    """
+    metadata_entry = spaces_prepare_metadata_entry(market_id, orderbook_track)
+    spaces_client = client_manager.get_client()
+    try:
+        spaces_filepath, num_bytes = spaces_upload_orderbook(
+            market_id, orderbook_track, metadata_entry, spaces_client,
+            SPACES_BUCKET_NAME=client_manager.spaces_config.SPACES_BUCKET_NAME
+        )
+    except Exception:
+        client_manager.invalidate(spaces_client)
+        raise
+    return metadata_entry, spaces_filepath, num_bytes
 
 def process_and_upload_orderbooks(
-        file_uploading_queue: LifoQueue[Any], 
+        file_uploading_queue: DurableUploadQueue, 
         spaces_config: SpacesConfig, 
         database_config: DatabaseConfig
         ) -> List[Tuple[MetadataEntry, str]]:
     """
     Process and upload all order books from the queue.
 
+    Uploads run on a pool of `spaces.max_inflight_uploads` workers; each worker retries its own
+    object, so a slow or failing PUT does not hold up the others. No new upload is started after
+    `UPLOAD_WINDOW_S`; tracks that failed are released back to their place in the queue.
+    The metadata of all uploaded files is then inserted with a single batched statement, and
+    only then are the uploaded tracks acknowledged (removed from the durable queue); if the insert
+    fails they are released and uploaded again in the next cycle.
+
     Returns:
-        List[Tuple[MetadataEntry, str]]: List of tuples containing metadata and file paths for FAILED uploaded files.
+        List[Tuple[MetadataEntry, str]]: List of tuples containing metadata and file paths of the uploaded files.
 
     Logs:
-        INFO: Upload completion.
+        INFO: Upload completion and throughput (objects/s, MB/s).
         ERROR: Issues during processing or upload.
     """
     database_metadata_list: List[Tuple[MetadataEntry, str]] = []
+    uploaded_items: List[UploadQueueItem] = []
+    uploaded_bytes = 0
+
+    # The client is reused across cycles; only the first cycle (or one after an error) pays for setup
+    upload_start = time.monotonic()
+    client_manager = get_spaces_client_manager(spaces_config)
+    client_manager.get_client()
+    client_setup_s = time.monotonic() - upload_start
 
-    spaces_client = spaces_establish_connection(
-        access_key=spaces_config.SPACES_ACCESS_KEY,
-        secret_key=spaces_config.SPACES_SECRET_KEY,
-        endpoint_url=spaces_config.SPACES_ENDPOINT
-)
     # control upload time
-    upload_start_time = datetime.now(timezone.utc)
-    upload_end_time = upload_start_time + timedelta(seconds=spaces_config.UPLOAD_WINDOW_S)
+    upload_end = upload_start + spaces_config.UPLOAD_WINDOW_S
 
-    while not file_uploading_queue.empty() and datetime.now(timezone.utc) < upload_end_time:
-        item: Dict[str, Orderbook_Track] = file_uploading_queue.get()
-        for market_id, orderbook_track in item.items():
-            metadata_entry = spaces_prepare_metadata_entry(market_id, orderbook_track)
-            try:
-                spaces_filepath = spaces_upload_orderbook(
-                    market_id, orderbook_track, metadata_entry, spaces_client,
-                    SPACES_BUCKET_NAME=spaces_config.SPACES_BUCKET_NAME
+    max_inflight_uploads = get_config()["spaces"]["max_inflight_uploads"]
+    leased: List[UploadQueueItem] = []
+    in_flight: Dict[Future[Tuple[MetadataEntry, str, int]], UploadQueueItem] = {}
+    try:
+        with ThreadPoolExecutor(max_workers=max_inflight_uploads, thread_name_prefix="spaces-upload") as executor:
+            while True:
+                # Keep the pool full while the window is open
+                while len(in_flight) < max_inflight_uploads and time.monotonic() < upload_end:
+                    try:
+                        queue_item = file_uploading_queue.get()
+                    except queue.Empty:  # also when another uploader leased the last track
+                        break
+                    leased.append(queue_item)
+                    if queue_item.orderbook_track is None:
+                        # Released with the other failed tracks at the end of the cycle
+                        logger.error(f"Leased upload for market_id {queue_item.market_id} has no track, skipping it.")
+                        continue
+                    future = executor.submit(
+                        spaces_upload_worker, queue_item.market_id, queue_item.orderbook_track, client_manager
                     )
-                insert_metadata(metadata_entry, spaces_filepath, database_config)
-                database_metadata_list.append((metadata_entry, spaces_filepath))
-                time.sleep(0.1)
-            except Exception as e:
-                logger.error(f"Failed to process or upload orderbook for market_id {market_id}. Error: {e}")
-                file_uploading_queue.put({market_id: orderbook_track})
-   
+                    in_flight[future] = queue_item
+
+                if not in_flight:
+                    break
 
-    logger.error(f"Upload Queue left with {file_uploading_queue.qsize()} files.")
-    spaces_client.close()
-    return database_metadata_list
\ No newline at end of file
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    queue_item = in_flight.pop(future)
+                    try:
+                        metadata_entry, spaces_filepath, num_bytes = future.result()
+                        database_metadata_list.append((metadata_entry, spaces_filepath))
+                        uploaded_items.append(queue_item)
+                        uploaded_bytes += num_bytes
+                    except Exception as e:
+                        logger.error(f"Failed to process or upload orderbook for market_id {queue_item.market_id}. Error: {e}")
+
+        try:
+            insert_metadata_batch(database_metadata_list, database_config)
+        except Exception as e:
+            # Without their metadata rows the files are not registered: upload them again next cycle
+            logger.error(f"Releasing {len(uploaded_items)} uploaded tracks, their metadata was not inserted: {e}")
+            database_metadata_list = []
+        else:
+            for queue_item in uploaded_items:
+                file_uploading_queue.ack(queue_item)
+    finally:
+        # Failed tracks go back only now, so they are not retried in a hot loop within this window;
+        # acknowledged tracks are no longer leased, everything else is released, also after an error
+        for queue_item in leased:
+            file_uploading_queue.release(queue_item)
+
+    elapsed = max(time.monotonic() - upload_start, 1e-9)
+    logger.info(
+        f"Uploaded {len(database_metadata_list)} objects ({uploaded_bytes / 1e6:.2f} MB) in {elapsed:.1f}s: "
+        f"{len(database_metadata_list) / elapsed:.1f} objects/s, {uploaded_bytes / 1e6 / elapsed:.2f} MB/s "
+        f"(client setup {client_setup_s * 1000:.1f}ms, {client_manager.stats()})."
+    )
+    if not file_uploading_queue.empty():
+        logger.error(f"Upload Queue left with {file_uploading_queue.qsize()} files: {file_uploading_queue.metrics()}")
+    return database_metadata_list
@@ -0,0 +1,175 @@
+import heapq
+import os
+import pickle
+import queue
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from src.models import Orderbook_Track
+from src.utils import get_config, logger
+
+
+@dataclass
+class UploadQueueItem:
+    seq: int  # position in the queue; lower is older
+    market_id: str
+    enqueued_at: float  # wall-clock time (seconds since epoch) of the `put`
+    nbytes: int  # size of the persisted track
+    orderbook_track: Optional[Orderbook_Track] = None  # None while the track only lives on disk
+
+
+class DurableUploadQueue:
+    """
+    FIFO queue of finished hourly tracks waiting for upload, persisted in a SQLite file.
+
+    Every `put` is written to disk before it returns, so queued tracks survive a crash and are
+    replayed when the queue is reopened. Tracks also stay in memory until their total size
+    reaches `memory_budget_bytes`; beyond that they are kept on disk only and loaded again
+    by `get`, so a long Spaces outage grows the file instead of the process.
+
+    `get` leases the oldest track. The track is removed only by `ack` after a successful upload;
+    `release` returns it to its original position, so failed uploads are retried oldest first.
+    Tracks leased but not acknowledged when the process stops are replayed as well.
+    """
+
+    def __init__(self, path: Optional[str] = None, memory_budget_bytes: Optional[int] = None) -> None:
+        # Unset arguments come from the `upload_queue` section of config.json
+        queue_config = get_config()["upload_queue"]
+        path = queue_config["path"] if path is None else path
+        self.path: str = path
+        self.memory_budget_bytes: int = (
+            queue_config["memory_budget_bytes"] if memory_budget_bytes is None else memory_budget_bytes
+        )
+        self.resident_bytes = 0
+        self.spilled = 0
+        self._lock = threading.Lock()
+        self._pending: Dict[int, UploadQueueItem] = {}
+        self._order: List[int] = []  # min-heap of the pending seqs, so the oldest track is leased first
+        self._leased: Dict[int, UploadQueueItem] = {}
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS upload_queue ("
+            "seq INTEGER PRIMARY KEY AUTOINCREMENT, market_id TEXT NOT NULL, "
+            "enqueued_at REAL NOT NULL, nbytes INTEGER NOT NULL, payload BLOB NOT NULL)"
+        )
+        self._db.commit()
+
+        # Replay whatever a previous process left behind; payloads are loaded lazily by `get`
+        for seq, market_id, enqueued_at, nbytes in self._db.execute(
+            "SELECT seq, market_id, enqueued_at, nbytes FROM upload_queue ORDER BY seq"
+        ):
+            self._pending[seq] = UploadQueueItem(seq, market_id, enqueued_at, nbytes)
+            self._order.append(seq)  # ascending, hence already a heap
+        if self._pending:
+            logger.warning(f"Replaying {len(self._pending)} queued uploads from {path}.")
+
+    def put(self, item: Dict[str, Orderbook_Track]) -> None:
+        """
+        Persist and enqueue the tracks of `item` ({market_id: Orderbook_Track}).
+        """
+        for market_id, orderbook_track in item.items():
+            payload = pickle.dumps(orderbook_track, protocol=pickle.HIGHEST_PROTOCOL)
+            enqueued_at = time.time()
+            with self._lock:
+                cursor = self._db.execute(
+                    "INSERT INTO upload_queue (market_id, enqueued_at, nbytes, payload) VALUES (?, ?, ?, ?)",
+                    (market_id, enqueued_at, len(payload), payload)
+                )
+                self._db.commit()
+                seq = cursor.lastrowid
+                if seq is None:
+                    raise sqlite3.DatabaseError(f"Upload queue insert for {market_id} returned no row id")
+                queue_item = UploadQueueItem(seq, market_id, enqueued_at, len(payload))
+                if self.resident_bytes + len(payload) <= self.memory_budget_bytes:
+                    queue_item.orderbook_track = orderbook_track
+                    self.resident_bytes += len(payload)
+                else:
+                    self.spilled += 1
+                    logger.debug(f"Upload queue memory budget reached, {market_id} kept on disk only.")
+                self._pending[seq] = queue_item
+                heapq.heappush(self._order, seq)
+
+    def get(self) -> UploadQueueItem:
+        """
+        Lease the oldest queued track, loading it from disk if it is not held in memory.
+
+        Raises:
+            queue.Empty: If the queue is empty.
+        """
+        with self._lock:
+            while True:
+                if not self._pending:
+                    raise queue.Empty
+                queue_item = self._pending.pop(heapq.heappop(self._order))
+                if queue_item.orderbook_track is None:
+                    row = self._db.execute("SELECT payload FROM upload_queue WHERE seq = ?", (queue_item.seq,)).fetchone()
+                    try:
+                        queue_item.orderbook_track = pickle.loads(row[0])
+                    except Exception as e:
+                        logger.error(f"Dropping unreadable queued upload {queue_item.market_id} (seq {queue_item.seq}): {e}")
+                        self._db.execute("DELETE FROM upload_queue WHERE seq = ?", (queue_item.seq,))
+                        self._db.commit()
+                        continue
+                    self.resident_bytes += queue_item.nbytes
+                self._leased[queue_item.seq] = queue_item
+                return queue_item
+
+    def ack(self, queue_item: UploadQueueItem) -> None:
+        """
+        Remove a leased track for good, after it was uploaded and registered.
+        """
+        with self._lock:
+            self._db.execute("DELETE FROM upload_queue WHERE seq = ?", (queue_item.seq,))
+            self._db.commit()
+            if self._leased.pop(queue_item.seq, None) is not None:
+                self.resident_bytes -= queue_item.nbytes
+
+    def release(self, queue_item: UploadQueueItem) -> None:
+        """
+        Return a leased track to its original position in the queue (e.g. after a failed upload).
+        """
+        with self._lock:
+            if self._leased.pop(queue_item.seq, None) is None:
+                return
+            if self.resident_bytes > self.memory_budget_bytes:
+                queue_item.orderbook_track = None
+                self.resident_bytes -= queue_item.nbytes
+            self._pending[queue_item.seq] = queue_item
+            heapq.heappush(self._order, queue_item.seq)
+
+    def empty(self) -> bool:
+        with self._lock:
+            return not self._pending
+
+    def qsize(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def metrics(self) -> Dict[str, float]:
+        """
+        Return queue depth (queued and leased tracks), memory use and the age of the oldest track (seconds).
+        """
+        with self._lock:
+            oldest = min(
+                (queue_item.enqueued_at for queue_item in [*self._pending.values(), *self._leased.values()]),
+                default=None
+            )
+            return {
+                "depth": len(self._pending),
+                "leased": len(self._leased),
+                "resident_bytes": self.resident_bytes,
+                "spilled": self.spilled,
+                "oldest_age_s": time.time() - oldest if oldest is not None else 0.0,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
@@ -1,20 +1,53 @@
 import logging
 import json
-from typing import Any
+import os
+from typing import Any, Dict, Optional
 
 from datetime import datetime
 
-def load_config(config_file: Any="config.json")-> Any:
+CONFIG_FILE = os.environ.get("POLYMARKET_CONFIG", "config.json")
+
+def load_config(config_file: Any=CONFIG_FILE)-> Any:
     """
     Load the configuration from a JSON file.
     """
     with open(config_file, "r") as file:
         return json.load(file)
-    
-config = load_config()
+
+_config: Optional[Dict[str, Any]] = None
+
+def init_config(config_file: str = CONFIG_FILE) -> Dict[str, Any]:
+    """
+    Load the configuration once, replacing any loaded before.
+
+    Called explicitly by the crawler entry point. Modules read their settings through
+    `get_config` when they use them, so importing `src` does not touch the file.
+    """
+    global _config
+    config: Dict[str, Any] = load_config(config_file)
+    _config = config
+    return config
+
+def get_config() -> Dict[str, Any]:
+    """
+    Return the loaded configuration.
+
+    Tests, benchmarks and notebooks that never call `init_config` get `CONFIG_FILE`, loaded on first use.
+    """
+    if _config is None:
+        return init_config()
+    return _config
+
+logger = logging.getLogger(__name__)
 
 def setup_logger() -> logging.Logger:
-    logging_config = config.get("logging", {})
+    """
+    Configure the log handlers (file and console) from the `logging` section of the config.
+
+    Called explicitly by the crawler entry point, so importing `src` (tests, benchmarks,
+    notebooks) neither creates the log file nor changes the caller's logging setup.
+    """
+    logging_config = get_config().get("logging", {})
 
     log_level = logging_config.get("log_level", "INFO").upper()  # Default to INFO if not specified
     log_format = logging_config.get("log_format", "%(asctime)s - %(levelname)s - %(message)s")
@@ -29,12 +62,9 @@ def setup_logger() -> logging.Logger:
         ]
     )
 
-    logger = logging.getLogger(__name__)
     logger.debug("Logger configured successfully with level: %s", log_level)
     return logger
 
-logger = setup_logger()
-
 def safe_float(value: Any) -> float:
     if isinstance(value, (int, float, str)) and value != "":
         try:
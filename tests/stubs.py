@@ -0,0 +1,228 @@
+import hashlib
+import io
+import threading
+from datetime import datetime, timezone
+from typing import IO, Any, Callable, Dict, Iterable, Iterator, List, Literal, Mapping, Optional, Sequence, Set, Tuple, Union
+
+from botocore.exceptions import ClientError
+from psycopg2.extensions import adapt
+
+from src.metadata import METADATA_FIELDS, MetadataQuery, MetadataReplica
+from src.models import DatabaseConfig
+
+
+class StubS3Client:
+    """
+    In-memory bucket with the calls used by the uploader, the downloader and the compaction job.
+
+    Downloads and uploads take `delay` seconds, keys in `failing_keys` always raise, and so do
+    the first `failures` uploads.
+    """
+
+    def __init__(
+        self,
+        objects: Optional[Mapping[str, bytes]] = None,
+        delay: float = 0.0,
+        failing_keys: Iterable[str] = (),
+        failures: int = 0
+    ) -> None:
+        self.objects: Dict[str, bytes] = dict(objects or {})
+        self.delay = delay
+        self.failing_keys = set(failing_keys)
+        self.failures = failures
+        self.attempts = 0
+        self.gets: List[str] = []
+        self.heads = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.uploads: List[str] = []
+        self.deleted: List[str] = []
+        self.lock = threading.Lock()
+
+    def etag(self, key: str) -> str:
+        return f'"{hashlib.md5(self.objects[key]).hexdigest()}"'
+
+    def head_object(self, Bucket: str, Key: str) -> Dict[str, Any]:
+        with self.lock:
+            self.heads += 1
+        if Key not in self.objects:
+            raise ClientError({"Error": {"Code": "404", "Message": "Not Found"}}, "HeadObject")
+        return {"ETag": self.etag(Key), "ContentLength": len(self.objects[Key])}
+
+    def get_object(self, Bucket: str, Key: str) -> Dict[str, Any]:
+        with self.lock:
+            self.gets.append(Key)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            threading.Event().wait(self.delay)  # time.sleep is patched out to skip retry backoff
+            if Key in self.failing_keys:
+                raise ConnectionError("simulated Spaces outage")
+            if Key not in self.objects:
+                raise ClientError({"Error": {"Code": "NoSuchKey", "Message": "Not Found"}}, "GetObject")
+            return {"Body": io.BytesIO(self.objects[Key]), "ETag": self.etag(Key)}
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+    def upload_fileobj(self, Fileobj: IO[bytes], Bucket: str, Key: str) -> None:
+        with self.lock:
+            self.attempts += 1
+            attempt = self.attempts
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            threading.Event().wait(self.delay)
+            if attempt <= self.failures or Key in self.failing_keys:
+                Fileobj.read(10)  # a failed attempt may leave the stream half-read
+                raise ConnectionError("simulated Spaces outage")
+            data = Fileobj.read()
+            with self.lock:
+                self.objects[Key] = data
+                self.uploads.append(Key)
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+    def delete_objects(self, Bucket: str, Delete: Dict[str, List[Dict[str, str]]]) -> None:
+        with self.lock:
+            for item in Delete["Objects"]:
+                self.objects.pop(item["Key"], None)
+                self.deleted.append(item["Key"])
+
+
+class StubCursor:
+    """
+    Cursor stand-in that records the executed SQL and its parameters, and returns one of
+    `conn.pages` per `fetchall`; inserted rows whose market_id is already in `conn.existing`
+    are dropped, like ON CONFLICT DO NOTHING would.
+    """
+
+    def __init__(self, conn: "StubConnection") -> None:
+        self.connection = conn
+        self.rowcount = -1
+
+    def mogrify(self, template: bytes, args: Sequence[Any]) -> bytes:
+        return template % tuple(adapt(arg).getquoted() for arg in args)
+
+    def execute(self, query: Union[str, bytes], args: Optional[Sequence[Any]] = None) -> None:
+        self.connection.executed.append((query, args))
+        inserting = isinstance(query, bytes)  # the batched insert is built with `mogrify`
+        if inserting and b"ON CONFLICT (market_id, date, hour) DO NOTHING" not in query:
+            raise AssertionError("conflict clause missing")
+        if self.connection.fail:
+            raise RuntimeError("simulated database error")
+        if inserting:
+            market_ids = {market_id for market_id in self.connection.candidates if f"'{market_id}'".encode() in query}
+            self.rowcount = len(market_ids - self.connection.existing)
+
+    def fetchall(self) -> List[Dict[str, Any]]:
+        return self.connection.pages.pop(0)
+
+    def __enter__(self) -> "StubCursor":
+        return self
+
+    def __exit__(self, *exc: Any) -> Literal[False]:
+        return False
+
+
+class StubConnection:
+    encoding = "UTF8"
+
+    def __init__(self) -> None:
+        self.executed: List[Tuple[Union[str, bytes], Optional[Sequence[Any]]]] = []
+        self.pages: List[List[Dict[str, Any]]] = []
+        self.commits = 0
+        self.rollbacks = 0
+        self.closed = 0
+        self.fail = False
+        self.existing: Set[str] = set()
+        self.candidates: Set[str] = set()
+
+    def cursor(self) -> StubCursor:
+        return StubCursor(self)
+
+    def commit(self) -> None:
+        self.commits += 1
+
+    def rollback(self) -> None:
+        self.rollbacks += 1
+
+
+class StubPool:
+    """
+    Stands in for `psycopg2.pool.ThreadedConnectionPool`, handing out a single `StubConnection`.
+    """
+
+    def __init__(self, minconn: int, maxconn: int, **kwargs: Any) -> None:
+        self.maxconn = maxconn
+        self.kwargs = kwargs
+        self.closed = False
+        self.conn = StubConnection()
+        self.checked_out = 0
+        self.lock = threading.Lock()
+
+    def getconn(self) -> StubConnection:
+        with self.lock:
+            self.checked_out += 1
+        return self.conn
+
+    def putconn(self, conn: StubConnection, close: bool = False) -> None:
+        with self.lock:
+            self.checked_out -= 1
+
+
+class StubDatabase:
+    """
+    Stands in for `orderbook_metadata`, kept in a `MetadataReplica` so that queries run its WHERE clause, and `orderbook_daily`.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.replica = MetadataReplica(path)
+        self.daily: Dict[Tuple[str, str], Dict[str, Any]] = {}  # (market_id, date) -> row
+        self.lock = threading.Lock()
+        self.on_register: Optional[Callable[[str], None]] = None
+
+    def add_metadata(self, row: Dict[str, Any]) -> None:
+        with self.replica._lock:
+            self.replica._db.execute(
+                f"INSERT INTO orderbook_metadata ({', '.join(METADATA_FIELDS)}) VALUES ({', '.join('?' for _ in METADATA_FIELDS)})",
+                tuple(row[field] for field in METADATA_FIELDS)
+            )
+            self.replica._db.commit()
+
+    def metadata(self) -> List[Dict[str, Any]]:
+        return list(self.replica.iter(MetadataQuery()))
+
+    def iter_metadata(self, database_config: DatabaseConfig, query: MetadataQuery) -> Iterator[Dict[str, Any]]:
+        return self.replica.iter(query)
+
+    def fetch_daily_entries(self, database_config: DatabaseConfig, day: str) -> Dict[str, Dict[str, Any]]:
+        return {market_id: dict(row) for (market_id, d), row in self.daily.items() if d == day}
+
+    def register_daily_file(
+        self, database_config: DatabaseConfig, market_id: str, day: str, file_path: str, hours: List[int],
+        hourly_paths: List[str], num_updates: int, num_bytes: int
+    ) -> None:
+        with self.lock:
+            self.daily[(market_id, day)] = {
+                "market_id": market_id, "file_path": file_path, "hours": list(hours),
+                "hourly_paths": list(hourly_paths), "num_updates": num_updates, "retired_at": None,
+            }
+        if self.on_register is not None:
+            self.on_register(market_id)
+
+    def point_metadata_to_daily_file(
+        self, database_config: DatabaseConfig, market_id: str, day: str, hours: List[int], file_path: str
+    ) -> None:
+        with self.replica._lock:
+            self.replica._db.execute(
+                f"UPDATE orderbook_metadata SET file_path = ? WHERE market_id = ? AND date = ? "
+                f"AND hour IN ({', '.join('?' for _ in hours)})",
+                (file_path, market_id, day, *hours)
+            )
+            self.replica._db.commit()
+
+    def mark_retired(self, database_config: DatabaseConfig, market_id: str, day: str) -> None:
+        with self.lock:
+            self.daily[(market_id, day)]["retired_at"] = datetime.now(timezone.utc)
@@ -0,0 +1,129 @@
+import math
+import unittest
+from typing import Iterable, List, Tuple
+from unittest.mock import patch
+
+import numpy.testing
+
+from benchmarks.synthetic import make_track
+from src.analytics import book_analytics, book_snapshots, snapshots_from_files
+from src.formats import orderbook_track_to_dict
+from src.models import OrderSummary, UpdateLog
+from src.replay import ReplayBook, replay_orderbook_data
+
+
+def walk(levels: Iterable[OrderSummary], shares: float) -> float:
+    """
+    Reference: fill `shares` level by level, best first.
+    """
+    cost, remaining = 0.0, shares
+    for level in levels:
+        trade = min(remaining, level.size)
+        cost += trade * level.price
+        remaining -= trade
+        if remaining <= 0:
+            return cost / shares
+    return math.nan
+
+
+def book(
+    bids: List[Tuple[float, float]], asks: List[Tuple[float, float]], timestamp: str = "2024-12-17T12:00:00+00:00"
+) -> ReplayBook:
+    replay_book = ReplayBook(tick_size=0.01)
+    replay_book.reset(bids, asks, timestamp)
+    return replay_book
+
+
+class TestBookAnalytics(unittest.TestCase):
+    def test_buying_walks_the_asks(self) -> None:
+        snapshots = book_snapshots([book([(0.48, 50.0), (0.47, 100.0)], [(0.52, 30.0), (0.55, 100.0)])])
+
+        row = book_analytics(snapshots, order_sizes=(10, 100, 500), depth_ticks=(0, 1, 3)).iloc[0]
+
+        self.assertAlmostEqual(row["best_bid"], 0.48)
+        self.assertAlmostEqual(row["best_ask"], 0.52)
+        self.assertAlmostEqual(row["spread"], 0.04)
+        self.assertAlmostEqual(row["mid"], 0.50)
+        self.assertAlmostEqual(row["buy_vwap_10"], 0.52)
+        self.assertAlmostEqual(row["buy_vwap_100"], (30 * 0.52 + 70 * 0.55) / 100)
+        self.assertAlmostEqual(row["sell_vwap_100"], (50 * 0.48 + 50 * 0.47) / 100)
+        self.assertTrue(math.isnan(row["buy_vwap_500"]))
+        self.assertEqual((row["bid_depth_0"], row["bid_depth_1"]), (50.0, 150.0))
+        self.assertEqual((row["ask_depth_1"], row["ask_depth_3"]), (30.0, 130.0))
+
+    def test_states_on_different_grids(self) -> None:
+        fine = book([], [(0.52, 30.0)])
+        fine.refine(0.001)
+        fine.set_level(UpdateLog.BID, 0.485, 20.0)
+        snapshots = book_snapshots([book([(0.48, 50.0)], [(0.52, 30.0)]), fine])
+
+        table = book_analytics(snapshots, depth_ticks=(1,), tick_size=0.01)
+
+        self.assertEqual(list(table["best_bid"].round(3)), [0.48, 0.485])
+        self.assertEqual(list(table["best_ask"].round(3)), [0.52, 0.52])
+
+    def test_empty_side(self) -> None:
+        row = book_analytics(book_snapshots([book([(0.48, 50.0)], [])])).iloc[0]
+
+        self.assertTrue(math.isnan(row["best_ask"]))
+        self.assertTrue(math.isnan(row["buy_vwap_100"]))
+        self.assertEqual(row["ask_depth_5"], 0.0)
+
+    def test_mixed_timestamp_formats(self) -> None:
+        """
+        CLOB poll times come with and without fractional seconds, in any order.
+        """
+        timestamps = ["2024-12-17T12:00:00+00:00", "2024-12-17T12:00:15.250000+00:00", "2024-12-17T12:00:30Z"]
+        snapshots = book_snapshots([book([(0.48, 50.0)], [(0.52, 30.0)], timestamp) for timestamp in timestamps])
+
+        table = book_analytics(snapshots)
+
+        self.assertEqual([t.isoformat() for t in table.index], [
+            "2024-12-17T12:00:00+00:00", "2024-12-17T12:00:15.250000+00:00", "2024-12-17T12:00:30+00:00"
+        ])
+
+    def test_matches_a_level_walk_over_a_replay(self) -> None:
+        track, metadata = make_track(num_updates=60, depth=30)
+        data = orderbook_track_to_dict(track, metadata)
+        order_sizes = (1, 500, 5000, 20000)
+
+        states = [state.copy() for state in replay_orderbook_data(data)]
+        table = book_analytics(book_snapshots(states), order_sizes=order_sizes, tick_size=0.001)
+
+        self.assertEqual(len(table), 61)
+        for state, (_, row) in zip(states, table.iterrows()):
+            for size in order_sizes:
+                for column, levels in ((f"buy_vwap_{size}", state.asks), (f"sell_vwap_{size}", state.bids)):
+                    expected = walk(levels, size)
+                    if math.isnan(expected):
+                        self.assertTrue(math.isnan(row[column]))
+                    else:
+                        self.assertAlmostEqual(row[column], expected)
+
+    def test_scattered_states_match_the_replay(self) -> None:
+        files = [orderbook_track_to_dict(*make_track(num_updates=40, depth=15, seed=hour, hour=hour)) for hour in (3, 4)]
+
+        replayed = book_snapshots(state for data in files for state in replay_orderbook_data(data))
+        scattered = snapshots_from_files(files)
+
+        self.assertEqual(scattered.timestamps, replayed.timestamps)
+        numpy.testing.assert_allclose(scattered.prices, replayed.prices)
+        numpy.testing.assert_array_equal(scattered.bid_sizes, replayed.bid_sizes)
+        numpy.testing.assert_array_equal(scattered.ask_sizes, replayed.ask_sizes)
+
+    def test_blocks_keep_their_occupied_columns(self) -> None:
+        files = [orderbook_track_to_dict(*make_track(num_updates=40, depth=15, seed=hour, hour=hour)) for hour in (3, 4)]
+
+        # Blocks of 7 states end mid-file, so each keeps a different set of columns
+        with patch("src.analytics.SNAPSHOT_BLOCK_STATES", 7):
+            replayed = book_snapshots(state for data in files for state in replay_orderbook_data(data))
+        scattered = snapshots_from_files(files)
+
+        numpy.testing.assert_allclose(replayed.prices, scattered.prices)
+        numpy.testing.assert_array_equal(replayed.bid_sizes, scattered.bid_sizes)
+        numpy.testing.assert_array_equal(replayed.ask_sizes, scattered.ask_sizes)
+
+
+
+if __name__ == "__main__":
+    unittest.main()
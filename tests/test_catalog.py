@@ -0,0 +1,119 @@
+import json
+import threading
+import time
+import unittest
+from typing import Any, Dict, Iterable, List
+from unittest.mock import patch
+
+from src import catalog
+from src.models import Gamma_Market
+
+
+def make_api_market(market_id: int, slug: str, tokens: Iterable[str] = ("111", "222")) -> Dict[str, Any]:
+    return {
+        "id": str(market_id),
+        "slug": slug,
+        "conditionId": f"0xcondition{market_id}",
+        "orderPriceMinTickSize": 0.01,
+        "orderMinSize": 5,
+        "clobTokenIds": json.dumps(list(tokens)),
+    }
+
+
+class StubGamma:
+    """
+    Serves `markets` in pages of `page_size` for URLs ending in `&offset=<n>`, after `delay` seconds.
+    """
+
+    def __init__(self, markets: List[Dict[str, Any]], page_size: int = 100, delay: float = 0.0) -> None:
+        self.markets = markets
+        self.page_size = page_size
+        self.delay = delay
+        self.requested_offsets: List[int] = []
+        self.lock = threading.Lock()
+
+    def __call__(self, url: str, retries: int = 2, backoff_factor: int = 2) -> List[Dict[str, Any]]:
+        offset = int(url.rsplit("offset=", 1)[1])
+        with self.lock:
+            self.requested_offsets.append(offset)
+        time.sleep(self.delay)
+        return self.markets[offset:offset + self.page_size]
+
+
+class TestMarketCatalog(unittest.TestCase):
+    def make_markets(self, num_markets: int) -> List[Dict[str, Any]]:
+        slugs = ["will-bitcoin-hit-100k", "will-bitcoin-reach-90k", "bitcoin-above-80k", "will-eth-hit-5k", "bitcoin-up-or-down"]
+        return [make_api_market(i, slugs[i % len(slugs)]) for i in range(num_markets)]
+
+    def refresh(self, market_catalog: catalog.MarketCatalog, gamma: StubGamma) -> catalog.CatalogDiff:
+        with patch.object(catalog, "fetch_with_retries", side_effect=gamma):
+            return market_catalog.refresh()
+
+    def test_filters_like_the_pandas_implementation(self) -> None:
+        markets = self.make_markets(250)
+        market_catalog = catalog.MarketCatalog(base_url="stub?limit=100", page_size=100, workers=3)
+        diff = self.refresh(market_catalog, StubGamma(markets))
+
+        expected = [m["id"] for m in markets if "bitcoin" in m["slug"] and any(k in m["slug"] for k in ("hit", "reach", "above"))]
+        self.assertEqual([market.id for market in market_catalog.get_markets()], expected)
+        self.assertEqual(len(diff.added), len(expected))
+        self.assertEqual(market_catalog.get_markets()[0].clobTokenId, 111)
+        self.assertEqual(market_catalog.get_markets()[0].orderMinSize, 5.0)
+
+    def test_pages_are_fetched_concurrently(self) -> None:
+        gamma = StubGamma(self.make_markets(1000), delay=0.05)
+        market_catalog = catalog.MarketCatalog(base_url="stub?limit=100", page_size=100, workers=4)
+
+        start = time.monotonic()
+        self.refresh(market_catalog, gamma)
+        elapsed = time.monotonic() - start
+
+        # 10 full pages plus the empty one that ends the listing
+        self.assertLess(elapsed, 0.05 * 11 / 2)
+        self.assertTrue(set(range(0, 1100, 100)) <= set(gamma.requested_offsets))
+        self.assertLessEqual(max(gamma.requested_offsets), 1000 + 3 * 100)
+
+    def test_refresh_reports_added_and_removed_markets(self) -> None:
+        market_catalog = catalog.MarketCatalog(base_url="stub?limit=100", page_size=100, workers=2)
+        first = [make_api_market(1, "will-bitcoin-hit-1"), make_api_market(2, "will-bitcoin-hit-2")]
+        second = [make_api_market(2, "will-bitcoin-hit-2"), make_api_market(3, "will-bitcoin-hit-3")]
+
+        self.refresh(market_catalog, StubGamma(first))
+        diff = self.refresh(market_catalog, StubGamma(second))
+
+        self.assertEqual([market.id for market in diff.added], ["3"])
+        self.assertEqual([market.id for market in diff.removed], ["1"])
+        self.assertEqual(diff.unchanged, 1)
+
+    def test_failed_refresh_keeps_the_cache(self) -> None:
+        market_catalog = catalog.MarketCatalog(base_url="stub?limit=100", page_size=100, workers=2)
+        self.refresh(market_catalog, StubGamma([make_api_market(1, "will-bitcoin-hit-1")]))
+
+        with patch.object(catalog, "fetch_with_retries", side_effect=ConnectionError("GAMMA down")):
+            with self.assertRaises(ConnectionError):
+                market_catalog.refresh()
+        self.assertEqual([market.id for market in market_catalog.get_markets()], ["1"])
+
+    def test_markets_without_tokens_are_skipped(self) -> None:
+        market = make_api_market(1, "will-bitcoin-hit-1")
+        market["clobTokenIds"] = None
+        market_catalog = catalog.MarketCatalog(base_url="stub?limit=100", page_size=100, workers=1)
+        self.refresh(market_catalog, StubGamma([market, make_api_market(2, "will-bitcoin-hit-2")]))
+
+        self.assertEqual([m.id for m in market_catalog.get_markets()], ["2"])
+
+
+class TestCatalogDiff(unittest.TestCase):
+    def test_apply_keeps_order_and_skips_known_markets(self) -> None:
+        markets = [
+            Gamma_Market(id=str(i), slug=f"will-bitcoin-hit-{i}", conditionId="c", orderPriceMinTickSize=0.01,
+                         orderMinSize=5.0, clobTokenId=i)
+            for i in range(4)
+        ]
+        changes = catalog.CatalogDiff(added=[markets[1], markets[3]], removed=[markets[0]])
+
+        self.assertEqual([market.id for market in changes.apply(markets[:3])], ["1", "2", "3"])
+
+
+if __name__ == "__main__":
+    unittest.main()
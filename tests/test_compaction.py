@@ -0,0 +1,162 @@
+import io
+import os
+import tempfile
+import time
+import unittest
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, List, Tuple
+from unittest.mock import patch
+
+from benchmarks.synthetic import make_track
+from src import compaction, spaces
+from src.compaction import compact_day, daily_file_path
+from src.downloader import OrderbookCache
+from src.formats import get_orderbook_format, orderbook_track_to_dict, read_day_npz
+from src.models import DatabaseConfig, SpacesConfig
+from tests.stubs import StubDatabase, StubS3Client
+
+DAY = date(2024, 12, 17)
+
+
+class TestCompactDay(unittest.TestCase):
+    def setUp(self) -> None:
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.client = StubS3Client()
+        self.db = StubDatabase(os.path.join(self.cache_dir.name, "metadata.sqlite3"))
+        self.addCleanup(self.db.replica.close)
+        self.hours: Dict[Tuple[str, str, int], Dict[str, Any]] = {}
+        self.patches: List[Any] = [
+            patch.object(spaces, "_client_manager", None),
+            patch.object(spaces, "spaces_establish_connection", return_value=self.client),
+            patch.object(time, "sleep"),
+            patch.object(compaction, "ensure_daily_table"),
+        ]
+        for name in ("iter_metadata", "fetch_daily_entries", "register_daily_file", "point_metadata_to_daily_file", "mark_retired"):
+            self.patches.append(patch.object(compaction, name, side_effect=getattr(self.db, name)))
+        for p in self.patches:
+            p.start()
+        self.spaces_config = SpacesConfig("endpoint", "key", "secret", "orderbooks", UPLOAD_WINDOW_S=60)
+        self.database_config = DatabaseConfig("host", "5432", "db", "user", "password")
+        for market_id in ("1", "2", "3"):
+            for hour in range(4):
+                self.add_hour(market_id, hour)
+        # The previous day is not compacted
+        self.add_hour("1", 23, day="2024-12-16")
+
+    def tearDown(self) -> None:
+        for p in self.patches:
+            p.stop()
+        self.cache_dir.cleanup()
+
+    def add_hour(self, market_id: str, hour: int, day: str = DAY.isoformat()) -> None:
+        track, metadata = make_track(num_updates=20, depth=5, seed=hour, market_id=market_id, hour=hour)
+        track.date = day
+        buffer = io.BytesIO()
+        get_orderbook_format("json").write(track, metadata, buffer)
+        path = f"orderbooks/hourly/{market_id}/{market_id}-{day}-{hour}.json"
+        self.client.objects[path] = buffer.getvalue()
+        self.hours[(market_id, day, hour)] = orderbook_track_to_dict(track, metadata, keyframe_interval=0)
+        start = datetime.fromisoformat(day).replace(hour=hour, tzinfo=timezone.utc)
+        self.db.add_metadata({
+            "market_id": market_id, "hour": hour, "date": day, "fetched_at": start.isoformat(), "slug": "will-bitcoin-hit",
+            "condition_id": "0xcondition", "clob_token_id": "123", "start_time": start.isoformat(),
+            "end_time": (start + timedelta(minutes=59, seconds=45)).isoformat(), "num_updates": 20,
+            "order_price_min_tick_size": 0.01, "order_min_size": 5.0,
+            "generated_at": (start + timedelta(hours=1)).isoformat(), "file_path": path,
+        })
+
+    def compact(self, **kwargs: Any) -> Dict[str, str]:
+        cache = OrderbookCache(self.cache_dir.name)
+        self.addCleanup(cache.close)
+        return {result.market_id: result.status for result in compact_day(
+            DAY, self.spaces_config, self.database_config, cache=cache, max_workers=3, **kwargs
+        )}
+
+    def day_file(self, market_id: str) -> Dict[int, Dict[str, Any]]:
+        return read_day_npz(io.BytesIO(self.client.objects[daily_file_path(market_id, DAY.isoformat())]))
+
+    def expected(self, market_id: str) -> Dict[int, Dict[str, Any]]:
+        return {hour: data for (m, d, hour), data in self.hours.items() if (m, d) == (market_id, DAY.isoformat())}
+
+    def test_every_market_gets_one_day_file(self) -> None:
+        self.assertEqual(self.compact(retire=False), {"1": "compacted", "2": "compacted", "3": "compacted"})
+
+        for market_id in ("1", "2", "3"):
+            self.assertEqual(self.day_file(market_id), self.expected(market_id))
+            self.assertEqual(self.db.daily[(market_id, DAY.isoformat())]["hours"], [0, 1, 2, 3])
+        self.assertEqual(self.client.deleted, [])
+
+    def test_rerun_is_a_no_op(self) -> None:
+        self.compact(retire=False)
+        self.client.uploads.clear()
+
+        self.assertEqual(self.compact(retire=False), {"1": "skipped", "2": "skipped", "3": "skipped"})
+        self.assertEqual(self.client.uploads, [])
+
+    def test_retirement_redirects_metadata_and_deletes_hourly_objects(self) -> None:
+        self.compact(retire=False)
+
+        self.assertEqual(self.compact(retire=True), {"1": "retired", "2": "retired", "3": "retired"})
+        self.assertEqual(len(self.client.deleted), 12)
+        self.assertEqual(
+            [key for key in self.client.objects if key.startswith("orderbooks/hourly/")],
+            ["orderbooks/hourly/1/1-2024-12-16-23.json"]
+        )
+        for row in self.db.metadata():
+            if row["date"] == DAY.isoformat():
+                self.assertEqual(row["file_path"], daily_file_path(row["market_id"], row["date"]))
+        self.assertEqual(self.compact(retire=True), {"1": "skipped", "2": "skipped", "3": "skipped"})
+
+    def test_late_hour_is_merged_into_a_retired_day(self) -> None:
+        self.compact(retire=True)
+        self.add_hour("2", 4)
+
+        self.assertEqual(self.compact(retire=True), {"1": "skipped", "2": "compacted", "3": "skipped"})
+        self.assertEqual(self.day_file("2"), self.expected("2"))
+        self.assertEqual(list(self.day_file("2")), [0, 1, 2, 3, 4])
+        self.assertNotIn("orderbooks/hourly/2/2-2024-12-17-4.json", self.client.objects)
+
+    def test_stale_start_time_does_not_hide_an_hour(self) -> None:
+        # A quiet market's start book is stamped with the time of its last change
+        self.add_hour("3", 5)
+        with self.db.replica._lock:
+            self.db.replica._db.execute(
+                "UPDATE orderbook_metadata SET start_time = '2024-12-16T20:00:00+00:00' WHERE market_id = '3' AND hour = 5"
+            )
+
+        self.compact(retire=False)
+        self.assertEqual(list(self.day_file("3")), [0, 1, 2, 3, 5])
+
+    def test_hour_uploaded_during_retirement_keeps_its_hourly_file(self) -> None:
+        late_path = "orderbooks/hourly/2/2-2024-12-17-4.json"
+
+        def upload_late_hour(market_id: str) -> None:
+            if market_id == "2" and self.db.on_register is not None:
+                self.db.on_register = None
+                self.add_hour("2", 4)
+
+        self.db.on_register = upload_late_hour
+        self.compact(retire=True)
+
+        late_row = next(row for row in self.db.metadata() if (row["market_id"], row["hour"]) == ("2", 4))
+        self.assertEqual(late_row["file_path"], late_path)
+        self.assertIn(late_path, self.client.objects)
+
+        self.assertEqual(self.compact(retire=True), {"1": "skipped", "2": "compacted", "3": "skipped"})
+        self.assertEqual(list(self.day_file("2")), [0, 1, 2, 3, 4])
+        self.assertNotIn(late_path, self.client.objects)
+
+    def test_failed_download_leaves_the_market_for_the_next_run(self) -> None:
+        del self.client.objects["orderbooks/hourly/3/3-2024-12-17-2.json"]
+
+        self.assertEqual(self.compact(retire=True), {"1": "compacted", "2": "compacted", "3": "failed"})
+        self.assertNotIn(("3", DAY.isoformat()), self.db.daily)
+        self.assertIn("orderbooks/hourly/3/3-2024-12-17-0.json", self.client.objects)
+
+    def test_today_is_refused(self) -> None:
+        with self.assertRaises(ValueError):
+            compact_day(datetime.now(timezone.utc).date(), self.spaces_config, self.database_config)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+import unittest
+from typing import Any, List
+from unittest.mock import patch
+
+from src import database
+from src.models import DatabaseConfig, MetadataEntry
+from src.utils import logger
+from tests.stubs import StubPool
+
+
+def make_entry(market_id: str, hour: int = 12) -> MetadataEntry:
+    return MetadataEntry(
+        market_id=market_id,
+        hour=hour,
+        date="2024-12-17",
+        fetched_at="2024-12-17T12:00:00+00:00",
+        slug="will-bitcoin-hit",
+        condition_id="condition-123",
+        clob_token_id="clob-123",
+        start_time="2024-12-17T12:00:00+00:00",
+        end_time="2024-12-17T12:59:45+00:00",
+        num_updates=10,
+        order_price_min_tick_size=0.01,
+        order_min_size=5.0,
+        meta_generated_at="2024-12-17T13:00:01+00:00",
+    )
+
+
+class TestInsertMetadataBatch(unittest.TestCase):
+    def setUp(self) -> None:
+        self.database_config = DatabaseConfig("host", "5432", "db", "user", "password")
+        self.patches: List[Any] = [
+            patch("psycopg2.pool.ThreadedConnectionPool", StubPool),
+            patch.object(database, "_db_pool", None),
+        ]
+        for p in self.patches:
+            p.start()
+        self.pool = database.get_db_pool(self.database_config)
+        self.conn = self.pool.conn
+
+    def tearDown(self) -> None:
+        for p in self.patches:
+            p.stop()
+
+    def test_whole_cycle_is_one_round_trip(self) -> None:
+        entries = [(make_entry(str(500000 + i)), f"orderbooks/hourly/{500000 + i}.json") for i in range(250)]
+        self.conn.candidates = {metadata.market_id for metadata, _ in entries}
+
+        inserted = database.insert_metadata_batch(entries, self.database_config)
+
+        self.assertEqual(inserted, 250)
+        [(query, _)] = self.conn.executed
+        assert isinstance(query, bytes)
+        self.assertEqual(query.count(b"orderbooks/hourly/"), 250)
+        self.assertEqual(self.conn.commits, 1)
+        self.assertEqual(self.pool.checked_out, 0)
+
+    def test_duplicates_are_ignored(self) -> None:
+        entries = [(make_entry("1"), "a.json"), (make_entry("2"), "b.json")]
+        self.conn.candidates = {"1", "2"}
+        self.conn.existing = {"1"}
+
+        self.assertEqual(database.insert_metadata_batch(entries, self.database_config), 1)
+
+    def test_failed_batch_rolls_back_and_returns_connection(self) -> None:
+        self.conn.fail = True
+
+        with self.assertRaises(RuntimeError):
+            database.insert_metadata_batch([(make_entry("1"), "a.json")], self.database_config)
+        self.assertEqual(self.conn.rollbacks, 1)
+        self.assertEqual(self.conn.commits, 0)
+        self.assertEqual(self.pool.checked_out, 0)
+
+    def test_single_insert_logs_failures_instead_of_raising(self) -> None:
+        self.conn.fail = True
+
+        with self.assertLogs(logger, level="CRITICAL"):
+            database.insert_metadata(make_entry("1"), "a.json", self.database_config)
+        self.assertEqual(self.conn.rollbacks, 1)
+        self.assertEqual(self.pool.checked_out, 0)
+
+    def test_empty_batch_skips_the_database(self) -> None:
+        self.assertEqual(database.insert_metadata_batch([], self.database_config), 0)
+        self.assertEqual(self.conn.executed, [])
+
+    def test_pool_is_shared(self) -> None:
+        database.insert_metadata(make_entry("1"), "a.json", self.database_config)
+        database.insert_metadata(make_entry("2"), "b.json", self.database_config)
+
+        self.assertIs(database.get_db_pool(self.database_config), self.pool)
+        self.assertEqual(self.pool.kwargs["sslmode"], "require")
+        self.assertEqual(len(self.conn.executed), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
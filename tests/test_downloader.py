@@ -0,0 +1,140 @@
+import os
+import tempfile
+import time
+import unittest
+from typing import Any, Dict, Iterable, List
+from unittest.mock import patch
+
+from src import spaces
+from src.downloader import OrderbookCache, download_orderbook_files
+from src.models import SpacesConfig
+from src.utils import get_config
+from tests.stubs import StubS3Client
+
+
+def remote_path(market_id: str, hour: int) -> str:
+    return f"orderbooks/hourly/{market_id}/{market_id}-2024-12-17-{hour}.json"
+
+
+class TestDownloadOrderbookFiles(unittest.TestCase):
+    def setUp(self) -> None:
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.patches: List[Any] = [
+            patch.object(spaces, "_client_manager", None),
+            patch.object(time, "sleep"),
+        ]
+        for p in self.patches:
+            p.start()
+        self.spaces_config = SpacesConfig("endpoint", "key", "secret", "orderbooks", UPLOAD_WINDOW_S=60)
+        self.paths = [remote_path(market_id, hour) for market_id in ("1", "2") for hour in range(6)]
+        self.client = StubS3Client({path: path.encode() * 10 for path in self.paths})
+
+    def tearDown(self) -> None:
+        for p in self.patches:
+            p.stop()
+        self.cache_dir.cleanup()
+
+    def make_cache(self, max_bytes: int = 1 << 30) -> OrderbookCache:
+        cache = OrderbookCache(self.cache_dir.name, max_bytes)
+        self.addCleanup(cache.close)
+        return cache
+
+    def download(self, paths: Iterable[str], cache: OrderbookCache, **kwargs: Any) -> Dict[str, str]:
+        with patch.object(spaces, "spaces_establish_connection", return_value=self.client):
+            return download_orderbook_files(paths, self.spaces_config, cache, **kwargs)
+
+    def test_parallel_download_mirrors_the_bucket_layout(self) -> None:
+        self.client.delay = 0.05
+        start = time.monotonic()
+        local_paths = self.download(self.paths, self.make_cache(), max_workers=4)
+        elapsed = time.monotonic() - start
+
+        self.assertEqual(list(local_paths), self.paths)
+        self.assertEqual(self.client.max_in_flight, 4)
+        self.assertLess(elapsed, 0.05 * 12 / 2)
+        for path, local_path in local_paths.items():
+            self.assertEqual(local_path, os.path.join(self.cache_dir.name, "orderbooks", "hourly", path.split("/")[2], path.rsplit("/", 1)[1]))
+            with open(local_path, "rb") as f:
+                self.assertEqual(f.read(), self.client.objects[path])
+
+    def test_cached_files_are_not_downloaded_again(self) -> None:
+        self.download(self.paths[:4], self.make_cache())
+        self.client.gets.clear()
+
+        # A new cache instance reads the index left on disk
+        local_paths = self.download(self.paths, self.make_cache())
+
+        self.assertEqual(len(local_paths), 12)
+        self.assertEqual(sorted(self.client.gets), sorted(self.paths[4:]))
+
+    def test_revalidate_downloads_changed_objects(self) -> None:
+        cache = self.make_cache()
+        self.download(self.paths[:2], cache)
+        self.client.objects[self.paths[0]] = b"re-uploaded"
+        self.client.gets.clear()
+
+        local_paths = self.download(self.paths[:2], cache, revalidate=True)
+
+        self.assertEqual(self.client.gets, [self.paths[0]])
+        self.assertEqual(self.client.heads, 2)
+        with open(local_paths[self.paths[0]], "rb") as f:
+            self.assertEqual(f.read(), b"re-uploaded")
+        objects = [name for _, _, names in os.walk(os.path.join(self.cache_dir.name, "objects")) for name in names]
+        self.assertEqual(len(objects), 2)
+
+    def test_least_recently_used_files_are_evicted(self) -> None:
+        size = len(self.client.objects[self.paths[0]])
+        cache = self.make_cache(max_bytes=3 * size)
+        for path in self.paths[:3]:
+            self.download([path], cache)
+        self.download([self.paths[0]], cache)  # used again: now the most recent
+
+        self.download([self.paths[3]], cache)
+
+        self.assertLessEqual(cache.total_bytes(), 3 * size)
+        self.assertEqual(cache.evictions, 1)
+        self.assertIsNone(cache.lookup(self.paths[1]))
+        self.assertFalse(os.path.exists(cache.mirror_path(self.paths[1])))
+        for path in (self.paths[0], self.paths[2], self.paths[3]):
+            self.assertIsNotNone(cache.lookup(path))
+
+    def test_failed_file_does_not_block_the_others(self) -> None:
+        self.client.failing_keys = {self.paths[5]}
+
+        local_paths = self.download(self.paths, self.make_cache(), max_workers=4)
+
+        self.assertEqual(len(local_paths), 11)
+        self.assertNotIn(self.paths[5], local_paths)
+        self.assertEqual(self.client.gets.count(self.paths[5]), get_config()["spaces"]["connection_retries"])
+        self.assertEqual([name for name in os.listdir(self.cache_dir.name) if name.endswith(".part")], [])
+
+    def test_missing_object_is_not_retried(self) -> None:
+        missing = remote_path("9", 0)
+
+        with patch.object(spaces.SpacesClientManager, "invalidate") as invalidate, patch.object(time, "sleep") as sleep:
+            local_paths = self.download([missing, self.paths[0]], self.make_cache())
+
+        self.assertEqual(list(local_paths), [self.paths[0]])
+        self.assertEqual(self.client.gets.count(missing), 1)
+        invalidate.assert_not_called()
+        sleep.assert_not_called()
+
+    def test_files_of_a_batch_are_not_evicted_before_it_returns(self) -> None:
+        size = len(self.client.objects[self.paths[0]])
+        cache = self.make_cache(max_bytes=2 * size)
+
+        local_paths = self.download(self.paths[:4], cache, max_workers=1)
+
+        self.assertEqual(len(local_paths), 4)
+        for local_path in local_paths.values():
+            self.assertTrue(os.path.exists(local_path))
+        self.assertEqual(cache.evictions, 0)
+
+        # Unpinned, they make room for the next batch
+        self.download(self.paths[4:5], cache)
+        self.assertLessEqual(cache.total_bytes(), 2 * size)
+        self.assertEqual(cache.evictions, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
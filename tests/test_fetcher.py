@@ -0,0 +1,163 @@
+import json
+import threading
+import time
+import unittest
+from typing import Any, Dict, List, Set
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+from src import fetcher
+from src.utils import get_config
+
+
+def _stub_book(token_id: int) -> Dict[str, Any]:
+    return {
+        "market": "0xmarket",
+        "asset_id": str(token_id),
+        "hash": f"hash-{token_id}",
+        "timestamp": "1734394653982",
+        "bids": [{"price": "0.45", "size": "100"}],
+        "asks": [{"price": "0.55", "size": "80"}],
+    }
+
+
+class _StubClobHandler(BaseHTTPRequestHandler):
+    """
+    Minimal CLOB stand-in serving GET /book and POST /books.
+
+    Token IDs listed in `server.failing_batch_tokens` make any batch containing them fail with 500,
+    token IDs in `server.dropped_tokens` are silently left out of batch responses.
+    """
+    protocol_version = "HTTP/1.1"
+    server: "_StubClobServer"
+
+    def _send_json(self, status: int, payload: Any) -> None:
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:
+        with self.server.lock:
+            self.server.get_requests += 1
+        token_id = int(self.path.split("token_id=")[1])
+        self._send_json(200, _stub_book(token_id))
+
+    def do_POST(self) -> None:
+        length = int(self.headers["Content-Length"])
+        token_ids = [int(item["token_id"]) for item in json.loads(self.rfile.read(length))]
+        with self.server.lock:
+            self.server.post_requests += 1
+        if any(token_id in self.server.failing_batch_tokens for token_id in token_ids):
+            self._send_json(500, {"error": "internal"})
+            return
+        self._send_json(200, [_stub_book(t) for t in token_ids if t not in self.server.dropped_tokens])
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+class _StubClobServer(ThreadingHTTPServer):
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), _StubClobHandler)
+        self.lock = threading.Lock()
+        self.get_requests = 0
+        self.post_requests = 0
+        self.failing_batch_tokens: Set[int] = set()
+        self.dropped_tokens: Set[int] = set()
+
+
+class TestOrderbooksFromClob(unittest.TestCase):
+    def test_requests_run_concurrently(self) -> None:
+        """
+        A tick over many slow markets should take about as long as the slowest request.
+        """
+        def slow_orderbook(token_id: int) -> Dict[str, str]:
+            time.sleep(0.2)
+            return {"asset_id": str(token_id)}
+
+        token_ids = list(range(8))
+        with patch.dict(get_config()["api"], clob_orderbook_batch_size=1), \
+                patch.object(fetcher, "orderbook_from_clob", side_effect=slow_orderbook):
+            start = time.monotonic()
+            results = dict(fetcher.orderbooks_from_clob(token_ids))
+            elapsed = time.monotonic() - start
+
+        self.assertEqual(set(results), set(token_ids))
+        self.assertEqual(results[3], {"asset_id": "3"})
+        self.assertLess(elapsed, 0.2 * len(token_ids) / 2)
+
+    def test_failed_fetch_yields_none(self) -> None:
+        """
+        A market whose fetch failed is still reported, with None as its order book.
+        """
+        with patch.dict(get_config()["api"], clob_orderbook_batch_size=1), \
+                patch.object(fetcher, "orderbook_from_clob", side_effect=lambda token_id: None if token_id == 2 else {}):
+            results = dict(fetcher.orderbooks_from_clob([1, 2, 3]))
+
+        self.assertIsNone(results[2])
+        self.assertEqual(results[1], {})
+
+
+class TestBatchOrderbooksFromClob(unittest.TestCase):
+    def setUp(self) -> None:
+        self.server = _StubClobServer()
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+        base_url = f"http://127.0.0.1:{self.server.server_port}"
+        self.patches: List[Any] = [
+            patch.dict(get_config()["api"], {
+                "clob_orderbook_base_url": f"{base_url}/book?",
+                "clob_orderbooks_batch_url": f"{base_url}/books",
+                "clob_orderbook_batch_size": 10,
+                "clob_orderbook_fetch_retries": 1,
+            }),
+        ]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self) -> None:
+        for p in self.patches:
+            p.stop()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_batches_are_chunked(self) -> None:
+        """
+        25 tokens with a batch size of 10 should cost three POSTs and no single GETs.
+        """
+        token_ids = list(range(100, 125))
+        results = dict(fetcher.orderbooks_from_clob(token_ids))
+
+        self.assertEqual(set(results), set(token_ids))
+        self.assertEqual(results[110]["hash"], "hash-110")
+        self.assertEqual(self.server.post_requests, 3)
+        self.assertEqual(self.server.get_requests, 0)
+
+    def test_failed_batch_falls_back_to_single_requests(self) -> None:
+        """
+        Every token of a failed batch is fetched on its own; the other batches are unaffected.
+        """
+        self.server.failing_batch_tokens = {5}
+        token_ids = list(range(20))
+        results = dict(fetcher.orderbooks_from_clob(token_ids))
+
+        self.assertEqual(set(results), set(token_ids))
+        self.assertTrue(all(results[token_id] for token_id in token_ids))
+        self.assertEqual(self.server.post_requests, 2)
+        self.assertEqual(self.server.get_requests, 10)
+
+    def test_missing_tokens_fall_back_to_single_requests(self) -> None:
+        self.server.dropped_tokens = {3, 4}
+        results = dict(fetcher.orderbooks_from_clob(list(range(10))))
+
+        self.assertEqual(results[3]["asset_id"], "3")
+        self.assertEqual(results[4]["asset_id"], "4")
+        self.assertEqual(self.server.get_requests, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
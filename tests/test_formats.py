@@ -0,0 +1,153 @@
+import io
+import json
+import tracemalloc
+import unittest
+from typing import Any
+
+from benchmarks.synthetic import make_track
+from unittest.mock import patch
+
+from src.utils import get_config
+from src.formats import (
+    ORDERBOOK_FORMATS, get_orderbook_format, orderbook_format_from_path, orderbook_levels_at, orderbook_track_to_dict,
+    read_day_npz, write_day_npz
+)
+
+
+class TestOrderbookFormats(unittest.TestCase):
+    def setUp(self) -> None:
+        self.track, self.metadata = make_track(num_updates=40, depth=20)
+        self.expected = orderbook_track_to_dict(self.track, self.metadata)
+
+    def test_json_is_unchanged(self) -> None:
+        """
+        The default format is byte-identical to the previous `json.dump(ordered_data, f, indent=2)`.
+        """
+        buffer = io.BytesIO()
+        get_orderbook_format("json").write(self.track, self.metadata, buffer)
+        self.assertEqual(buffer.getvalue().decode(), json.dumps(self.expected, indent=2))
+
+    def test_streamed_json_matches_json_dumps(self) -> None:
+        """
+        The streaming encoder produces the same bytes as encoding the whole dictionary at once.
+        """
+        empty_track, empty_metadata = make_track(num_updates=0, depth=3)
+        for track, metadata in ((self.track, self.metadata), (empty_track, empty_metadata)):
+            expected = orderbook_track_to_dict(track, metadata)
+            for name, dumped in (
+                ("json", json.dumps(expected, indent=2)),
+                ("json-compact", json.dumps(expected, separators=(",", ":"))),
+            ):
+                with self.subTest(format=name, num_updates=len(track.updates)):
+                    buffer = io.BytesIO()
+                    get_orderbook_format(name).write(track, metadata, buffer)
+                    self.assertEqual(buffer.getvalue().decode(), dumped)
+
+    def test_streamed_json_peak_memory_is_flat(self) -> None:
+        """
+        Writing to a sink keeps only one update encoded at a time, whatever the number of updates.
+        """
+        class NullSink(io.BytesIO):
+            def __init__(self) -> None:
+                super().__init__()
+                self.size = 0
+
+            def write(self, data: Any) -> int:
+                self.size += len(data)
+                return len(data)
+
+        def peak_memory(num_updates: int) -> int:
+            track, metadata = make_track(num_updates=num_updates, depth=20)
+            tracemalloc.start()
+            get_orderbook_format("json").write(track, metadata, NullSink())
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            return peak
+
+        self.assertLess(peak_memory(2000), 2 * peak_memory(200))
+
+    def test_every_format_round_trips(self) -> None:
+        for orderbook_format in ORDERBOOK_FORMATS.values():
+            if not orderbook_format.available:
+                continue
+            with self.subTest(format=orderbook_format.name):
+                buffer = io.BytesIO()
+                orderbook_format.write(self.track, self.metadata, buffer)
+                buffer.seek(0)
+                self.assertEqual(orderbook_format.read(buffer), self.expected)
+
+    def test_format_is_identified_by_extension(self) -> None:
+        self.assertEqual(orderbook_format_from_path("orderbooks/hourly/1/1-2024-12-17-3.json").name, "json")
+        self.assertEqual(orderbook_format_from_path("1-2024-12-17-3.min.json").name, "json-compact")
+        self.assertEqual(orderbook_format_from_path("1-2024-12-17-3.json.gz").name, "json-gzip")
+        self.assertEqual(orderbook_format_from_path("1-2024-12-17-3.npz").name, "npz")
+        with self.assertRaises(ValueError):
+            orderbook_format_from_path("1-2024-12-17-3.csv")
+        with self.assertRaises(ValueError):
+            get_orderbook_format("parquet")
+
+
+class TestKeyframes(unittest.TestCase):
+    def setUp(self) -> None:
+        self.track, self.metadata = make_track(num_updates=95, depth=20)
+
+    def test_keyframes_match_a_full_replay(self) -> None:
+        data = orderbook_track_to_dict(self.track, self.metadata, keyframe_interval=10)
+        plain = orderbook_track_to_dict(self.track, self.metadata, keyframe_interval=0)
+
+        self.assertEqual(data["keyframe_index"], list(range(10, 91, 10)))
+        self.assertNotIn("keyframes", plain)
+        for keyframe in data["keyframes"]:
+            replayed = orderbook_levels_at(plain, keyframe["update_index"] - 1)
+            self.assertEqual({k: keyframe[k] for k in ("timestamp", "bids", "asks")}, replayed)
+        for update_index in (-1, 0, 9, 10, 55, 94):
+            self.assertEqual(orderbook_levels_at(data, update_index), orderbook_levels_at(plain, update_index))
+        with self.assertRaises(IndexError):
+            orderbook_levels_at(data, 95)
+
+    def test_every_format_round_trips_keyframes(self) -> None:
+        with patch.dict(get_config()["files"], keyframe_interval=7):
+            expected = orderbook_track_to_dict(self.track, self.metadata)
+            for orderbook_format in ORDERBOOK_FORMATS.values():
+                if not orderbook_format.available:
+                    continue
+                with self.subTest(format=orderbook_format.name):
+                    buffer = io.BytesIO()
+                    orderbook_format.write(self.track, self.metadata, buffer)
+                    buffer.seek(0)
+                    self.assertEqual(orderbook_format.read(buffer), expected)
+            buffer = io.BytesIO()
+            get_orderbook_format("json").write(self.track, self.metadata, buffer)
+            self.assertEqual(buffer.getvalue().decode(), json.dumps(expected, indent=2))
+        self.assertEqual(len(expected["keyframes"]), 13)
+
+
+class TestDayFiles(unittest.TestCase):
+    def setUp(self) -> None:
+        self.hours = {}
+        for hour in (3, 0, 1):
+            track, metadata = make_track(num_updates=30 + hour, depth=10, seed=hour, hour=hour)
+            self.hours[hour] = orderbook_track_to_dict(track, metadata, keyframe_interval=0)
+
+    def test_day_file_round_trips_every_hour(self) -> None:
+        buffer = io.BytesIO()
+        write_day_npz(list(self.hours.values()), buffer)
+
+        buffer.seek(0)
+        self.assertEqual(read_day_npz(buffer), self.hours)
+        buffer.seek(0)
+        self.assertEqual(read_day_npz(buffer, hours=[1]), {1: self.hours[1]})
+
+    def test_keyframes_are_dropped(self) -> None:
+        track, metadata = make_track(num_updates=30, depth=10)
+        buffer = io.BytesIO()
+        write_day_npz([orderbook_track_to_dict(track, metadata, keyframe_interval=10)], buffer)
+
+        buffer.seek(0)
+        self.assertEqual(read_day_npz(buffer), {12: orderbook_track_to_dict(track, metadata, keyframe_interval=0)})
+        with self.assertRaises(ValueError):
+            orderbook_format_from_path("1/1-2024-12-17.day.npz")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,135 @@
+import queue
+import unittest
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from unittest.mock import MagicMock, patch
+
+import main
+from src.catalog import CatalogDiff
+
+CYCLE_START = datetime(2024, 12, 17, 12, 30, tzinfo=timezone.utc)
+
+
+class FixedDatetime(datetime):
+    @classmethod
+    def now(cls, tz: Optional[Any] = None) -> "FixedDatetime":
+        return cls.fromtimestamp(CYCLE_START.timestamp(), tz)
+
+
+class ScriptedScheduler:
+    """
+    Stands in for `TickScheduler`, calling `on_tick` once per scripted boundary.
+    """
+
+    def __init__(self, ticks: List[datetime]) -> None:
+        self.ticks = ticks
+
+    def run(self, on_tick: Callable[[datetime], None]) -> None:
+        for tick in self.ticks:
+            on_tick(tick)
+
+    def lateness_stats(self) -> Dict[str, float]:
+        return {}
+
+
+class InlineThread:
+    """
+    Runs the target when started, so the threads `main` starts have finished by the next tick.
+    """
+    started: List[Tuple[Any, Tuple[Any, ...]]] = []
+
+    def __init__(self, target: Callable[..., None], args: Tuple[Any, ...] = ()) -> None:
+        self.target = target
+        self.args = args
+
+    def start(self) -> None:
+        InlineThread.started.append((self.target, self.args))
+        self.target(*self.args)
+
+    def is_alive(self) -> bool:
+        return False
+
+
+def at(hour: int, minute: int, second: int) -> datetime:
+    return CYCLE_START.replace(hour=hour, minute=minute, second=second)
+
+
+class TestMain(unittest.TestCase):
+    def test_restart_reuses_the_upload_queue(self) -> None:
+        file_uploading_queue = MagicMock()
+        with patch.object(main, "DurableUploadQueue") as durable_upload_queue, \
+                patch.object(main, "btc_markets_from_gamma", side_effect=RuntimeError("Gamma is down")):
+            # Each failure ends `main`, and the `__main__` loop restarts it with the same queue
+            for _ in range(2):
+                with self.assertRaises(RuntimeError):
+                    main.main(file_uploading_queue)
+
+        durable_upload_queue.assert_not_called()
+
+
+class TestOnTick(unittest.TestCase):
+    def setUp(self) -> None:
+        InlineThread.started = []
+        self.markets = [MagicMock(name="market")]
+        self.prefetched_markets = [MagicMock(name="prefetched market")]
+        self.rollover = MagicMock(return_value=({}, {}))
+        self.fetch_updates = MagicMock()
+        self.upload = MagicMock()
+        self.fetch_markets = MagicMock(side_effect=self.prefetch)
+        self.prefetched_at: List[int] = []  # number of ticks done when the pre-fetch ran
+        self.patches: List[Any] = [
+            patch.object(main, "datetime", FixedDatetime),
+            patch.object(main, "threading", MagicMock(Thread=InlineThread)),
+            patch.object(main, "btc_markets_from_gamma", return_value=self.markets),
+            patch.object(main, "orderbook_initialize_orderbookTracks", return_value=({"closed": "track"}, {})),
+            patch.object(main, "orderbook_rollover_tracks", self.rollover),
+            patch.object(main, "orderbook_fetch_and_add_updates", self.fetch_updates),
+            patch.object(main, "thread_background_rollover_upload", self.upload),
+            patch.object(main, "thread_background_market_fetcher", self.fetch_markets),
+        ]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self) -> None:
+        for p in self.patches:
+            p.stop()
+
+    def prefetch(self, gamma_markets_queue: "queue.Queue[CatalogDiff]") -> None:
+        self.prefetched_at.append(self.fetch_updates.call_count)
+        diff = MagicMock(spec=CatalogDiff)
+        diff.apply.return_value = self.prefetched_markets
+        gamma_markets_queue.put(diff)
+
+    def run_ticks(self, ticks: List[datetime]) -> None:
+        with patch.object(main, "TickScheduler", return_value=ScriptedScheduler(ticks)):
+            main.main(MagicMock())
+
+    def test_prefetch_starts_once_from_second_30_of_the_last_minute(self) -> None:
+        self.run_ticks([at(12, 58, 45), at(12, 59, 15), at(12, 59, 30), at(12, 59, 45)])
+
+        self.assertEqual(self.prefetched_at, [2])
+        self.assertEqual([target for target, _ in InlineThread.started], [self.fetch_markets])
+        self.assertEqual(self.fetch_updates.call_count, 4)
+        self.rollover.assert_not_called()
+
+    def test_late_prefetch_tick_still_prefetches(self) -> None:
+        # The scheduler skipped the boundary at second 30
+        self.run_ticks([at(12, 59, 15), at(12, 59, 45)])
+
+        self.assertEqual(self.prefetched_at, [1])
+
+    def test_rollover_applies_the_prefetched_markets_and_uploads_the_closed_hour(self) -> None:
+        # The boundary at 13:00:00 was skipped; the first tick of the new hour rolls over
+        self.run_ticks([at(12, 59, 30), at(13, 0, 15), at(13, 0, 30)])
+
+        self.rollover.assert_called_once()
+        markets, _, cycle_hour, cycle_date, tick = self.rollover.call_args.args
+        self.assertIs(markets, self.prefetched_markets)
+        self.assertEqual((cycle_hour, cycle_date, tick), (13, "2024-12-17", at(13, 0, 15)))
+        self.upload.assert_called_once()
+        self.assertEqual(self.upload.call_args.args[0], {"closed": "track"})
+        self.assertEqual(self.fetch_updates.call_count, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,177 @@
+import os
+import tempfile
+import unittest
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from unittest.mock import patch
+
+from src import database, metadata
+from src.metadata import METADATA_FIELDS, MetadataQuery, MetadataReplica, iter_metadata, query_metadata
+from src.models import DatabaseConfig
+from tests.stubs import StubPool
+
+START = datetime(2024, 12, 17, tzinfo=timezone.utc)
+
+
+def make_row(
+    market_id: str, hour: int, generated_at: Optional[datetime] = None, slug: str = "will-bitcoin-hit"
+) -> Dict[str, Any]:
+    start = START + timedelta(hours=hour)
+    generated_at = generated_at or start + timedelta(hours=1, seconds=1)
+    return {
+        "market_id": market_id, "hour": start.hour, "date": start.date().isoformat(),
+        "fetched_at": start.isoformat(), "slug": slug, "condition_id": "0xcondition", "clob_token_id": "123",
+        "start_time": start.isoformat(), "end_time": (start + timedelta(minutes=59, seconds=45)).isoformat(),
+        "num_updates": 240, "order_price_min_tick_size": 0.01, "order_min_size": 5.0,
+        "generated_at": generated_at.isoformat(),
+        "file_path": f"orderbooks/hourly/{market_id}/{market_id}-{start.date()}-{start.hour}.json",
+    }
+
+
+class StubServer:
+    """
+    Stands in for `fetch_metadata_changes` over the rows committed so far.
+    """
+
+    def __init__(self, rows: Iterable[Dict[str, Any]]) -> None:
+        self.rows = list(rows)
+        self.calls = 0
+
+    def fetch(
+        self, database_config: DatabaseConfig, since: Optional[str], after: Optional[Tuple[str, str, str, int]],
+        page_size: int
+    ) -> List[Dict[str, Any]]:
+        self.calls += 1
+
+        def key(row: Dict[str, Any]) -> Tuple[str, str, str, int]:
+            return (row["generated_at"], row["market_id"], row["date"], row["hour"])
+
+        rows = sorted(self.rows, key=key)
+        if after is not None:
+            rows = [row for row in rows if key(row) > tuple(after)]
+        elif since is not None:
+            rows = [row for row in rows if row["generated_at"] >= since]
+        return [dict(row) for row in rows[:page_size]]
+
+
+class TestMetadataReplica(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "metadata.sqlite3")
+        self.server = StubServer(make_row(market_id, hour) for market_id in ("1", "2", "3") for hour in range(24))
+        self.patch = patch.object(metadata, "fetch_metadata_changes", side_effect=self.server.fetch)
+        self.patch.start()
+        self.database_config = DatabaseConfig("host", "5432", "db", "user", "password")
+
+    def tearDown(self) -> None:
+        self.patch.stop()
+        self.directory.cleanup()
+
+    def replica(self) -> MetadataReplica:
+        replica = MetadataReplica(self.path, sync_overlap_s=600)
+        self.addCleanup(replica.close)
+        return replica
+
+    def test_initial_sync_pages_through_everything(self) -> None:
+        replica = self.replica()
+
+        self.assertEqual(replica.sync(self.database_config, page_size=10), 72)
+        self.assertEqual(replica.count(), 72)
+        self.assertEqual(self.server.calls, 8)
+        self.assertEqual(replica.last_generated_at(), max(row["generated_at"] for row in self.server.rows))
+
+    def test_incremental_sync_copies_new_and_late_rows(self) -> None:
+        self.replica().sync(self.database_config)
+        last = datetime.fromisoformat(self.server.rows[-1]["generated_at"])
+        new_row = make_row("4", 0, generated_at=last + timedelta(minutes=30))
+        # Committed after the first sync, but generated slightly before its high-water mark
+        late_row = make_row("5", 0, generated_at=last - timedelta(minutes=5))
+        self.server.rows += [new_row, late_row]
+
+        replica = self.replica()  # reopened: the position is persisted
+        copied = replica.sync(self.database_config)
+
+        self.assertLess(copied, 10)
+        self.assertEqual(replica.count(), 74)
+        self.assertEqual([row["market_id"] for row in replica.iter(MetadataQuery(start=START, end=START + timedelta(hours=1)))],
+                         ["1", "2", "3", "4", "5"])
+
+    def test_queries_filter_and_paginate(self) -> None:
+        self.server.rows.append(make_row("9", 5, slug="bitcoin-above-100k"))
+        replica = self.replica()
+        replica.sync(self.database_config)
+
+        query = MetadataQuery(market_id="2", start=START + timedelta(hours=3, minutes=30), end="2024-12-17T06:00:00+00:00")
+        first = replica.query(query, page_size=2)
+        second = replica.query(query, after=first.next_cursor, page_size=2)
+
+        self.assertEqual([row["hour"] for row in first.rows + second.rows], [3, 4, 5])
+        self.assertIsNone(second.next_cursor)
+        self.assertEqual(set(first.rows[0]), set(METADATA_FIELDS))
+        self.assertEqual([row["market_id"] for row in replica.iter(MetadataQuery(slug="bitcoin-above-100k"))], ["9"])
+
+    def test_time_range_does_not_depend_on_the_start_book_time(self) -> None:
+        # A quiet market's start book can be stamped long before its hour
+        stale = make_row("7", 5)
+        stale["start_time"] = (START + timedelta(hours=1)).isoformat()
+        self.server.rows.append(stale)
+        replica = self.replica()
+        replica.sync(self.database_config)
+
+        query = MetadataQuery(market_id="7", start=START + timedelta(hours=5, minutes=30), end=START + timedelta(hours=6))
+        self.assertEqual([row["hour"] for row in replica.iter(query)], [5])
+        query = MetadataQuery(market_id="7", start=START + timedelta(hours=1), end=START + timedelta(hours=5))
+        self.assertEqual(list(replica.iter(query)), [])
+
+        # Hours at the edges of the range
+        query = MetadataQuery(market_id="2", start=START + timedelta(hours=3), end=START + timedelta(hours=5))
+        self.assertEqual([row["hour"] for row in replica.iter(query)], [3, 4])
+
+
+class TestQueryMetadata(unittest.TestCase):
+    def setUp(self) -> None:
+        self.patches: List[Any] = [
+            patch("psycopg2.pool.ThreadedConnectionPool", StubPool),
+            patch.object(database, "_db_pool", None),
+        ]
+        for p in self.patches:
+            p.start()
+        self.database_config = DatabaseConfig("host", "5432", "db", "user", "password")
+        self.conn = database.get_db_pool(self.database_config).conn
+
+    def tearDown(self) -> None:
+        for p in self.patches:
+            p.stop()
+
+    def server_row(self, hour: int) -> Dict[str, Any]:
+        # psycopg2 returns DATE and TIMESTAMPTZ columns as date and datetime objects
+        row = make_row("515539", hour)
+        for field in ("fetched_at", "start_time", "end_time", "generated_at"):
+            row[field] = datetime.fromisoformat(row[field])
+        row["date"] = date.fromisoformat(row["date"])
+        return row
+
+    def test_keyset_pagination_on_the_server(self) -> None:
+        self.conn.pages = [[self.server_row(0), self.server_row(1)], [self.server_row(2)]]
+        query = MetadataQuery(market_id="515539", start=START)
+
+        rows = list(iter_metadata(self.database_config, query, page_size=2))
+
+        self.assertEqual([row["hour"] for row in rows], [0, 1, 2])
+        self.assertEqual(rows[0]["date"], "2024-12-17")
+        self.assertEqual(rows[0]["start_time"], "2024-12-17T00:00:00+00:00")
+        (first_sql, first_params), (second_sql, second_params) = self.conn.executed
+        self.assertIn("WHERE market_id = %s AND (date, hour) >= (%s, %s) AND end_time >= %s ORDER BY market_id, date, hour LIMIT %s", first_sql)
+        self.assertEqual(first_params, ("515539", "2024-12-17", 0, "2024-12-17T00:00:00+00:00", 2))
+        self.assertIn("(market_id, date, hour) > (%s, %s, %s)", second_sql)
+        self.assertEqual(second_params[-4:], ("515539", "2024-12-17", 1, 2))
+        self.assertNotIn("OFFSET", second_sql)
+
+    def test_last_page_has_no_cursor(self) -> None:
+        self.conn.pages = [[self.server_row(0)]]
+
+        self.assertIsNone(query_metadata(self.database_config, MetadataQuery(), page_size=5).next_cursor)
+
+
+if __name__ == "__main__":
+    unittest.main()
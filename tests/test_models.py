@@ -0,0 +1,61 @@
+import unittest
+from datetime import datetime, timezone
+
+from src.models import Changes, OrderSummary, UpdateLog, Updates
+
+
+class TestUpdateLog(unittest.TestCase):
+    def setUp(self) -> None:
+        self.updates = [
+            Updates("2024-12-17T00:00:15.123456+00:00", Changes(
+                bids=[OrderSummary(0.45, 120.0), OrderSummary(0.44, 0)],
+                asks=[OrderSummary(0.56, 3.5)],
+            )),
+            Updates("2024-12-17T00:00:30+00:00", Changes()),
+            Updates("2024-12-17T00:00:45.000001+00:00", Changes(asks=[OrderSummary(0.55, 0)])),
+        ]
+
+    def test_round_trips_updates(self) -> None:
+        log = UpdateLog(self.updates)
+
+        self.assertEqual(len(log), 3)
+        self.assertEqual(list(log), self.updates)
+        self.assertEqual(log[-1], self.updates[-1])
+        self.assertEqual(log[0:2], self.updates[0:2])
+        self.assertEqual(log.last_timestamp(), "2024-12-17T00:00:45.000001+00:00")
+        self.assertEqual([log.timestamp(i) for i in range(len(log))], [update.timestamp for update in self.updates])
+        self.assertIs(type(log[0].changes.bids[1].size), int)
+        with self.assertRaises(IndexError):
+            log[3]
+
+    def test_records_match_upload_format(self) -> None:
+        """
+        to_records yields exactly what the uploader used to build from `Updates` objects.
+        """
+        expected = [
+            {
+                "timestamp": update.timestamp,
+                "changes": {
+                    "bids": [change.__dict__ for change in update.changes.bids],
+                    "asks": [change.__dict__ for change in update.changes.asks],
+                },
+            }
+            for update in self.updates
+        ]
+        self.assertEqual(list(UpdateLog(self.updates).to_records()), expected)
+
+    def test_no_change_ticks_are_compact(self) -> None:
+        log = UpdateLog()
+        empty_bytes = log.nbytes()
+        for second in range(240):
+            log.append_no_change(datetime(2024, 12, 17, 0, second // 4, (second % 4) * 15, tzinfo=timezone.utc))
+
+        self.assertEqual(len(log), 240)
+        self.assertEqual(log[0].changes, Changes())
+        self.assertEqual(log[1].timestamp, "2024-12-17T00:00:15+00:00")
+        self.assertLess(log.nbytes() - empty_bytes, 240 * 16 * 2)
+        self.assertIsNone(UpdateLog().last_timestamp())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,12 @@
+import random
 import unittest
-from datetime import datetime
-from src.models import Order_Book, OrderSummary, Orderbook_Track, Updates, Changes
-from src.orderbook import orderbook_get_updates
+from datetime import datetime, timezone
+from typing import Any, Dict
+from unittest.mock import patch
+from src import orderbook
+from src.catalog import CatalogDiff
+from src.models import Book, Compact_Order_Book, Gamma_Market, Order_Book, OrderSummary, Orderbook_Track, UpdateLog, Updates, Changes
+from src.orderbook import orderbook_from_clob_data, orderbook_get_updates, orderbook_get_updates_vectorized
 
 class TestOrderbookGetUpdates(unittest.TestCase):
     def test_orderbook_get_updates(self):
@@ -169,7 +174,7 @@ class TestOrderbookGetUpdates(unittest.TestCase):
             order_price_min_tick_size=0.01,
             order_min_size=1.0,
             clob_token_id="asset-1",
-            updates=[]
+            updates=UpdateLog()
         )
 
         # Apply updates and track them
@@ -291,5 +296,233 @@ class TestOrderbookGetUpdates(unittest.TestCase):
         self.assertEqual(updates.timestamp, "2024-12-17T00:15:00Z")
 
 
+def _random_orderbook(rng: random.Random, depth: int, tick_size: float, fetched_at: str) -> Order_Book:
+    prices = rng.sample(range(1, 10 * depth), depth)
+    return Order_Book(
+        market="market-1",
+        asset_id="asset-1",
+        fetched_at=fetched_at,
+        hash=fetched_at,
+        timestamp=fetched_at,
+        bids=[OrderSummary(price=float(f"{p * tick_size:.4f}"), size=float(rng.randint(1, 5))) for p in prices[: depth // 2]],
+        asks=[OrderSummary(price=float(f"{p * tick_size:.4f}"), size=float(rng.randint(1, 5))) for p in prices[depth // 2:]],
+    )
+
+class TestOrderbookGetUpdatesVectorized(unittest.TestCase):
+    def assertSameUpdates(self, expected: Updates, actual: Updates) -> None:
+        self.assertEqual(expected.timestamp, actual.timestamp)
+        for side in ("bids", "asks"):
+            expected_levels = [(o.price, o.size, type(o.size)) for o in getattr(expected.changes, side)]
+            actual_levels = [(o.price, o.size, type(o.size)) for o in getattr(actual.changes, side)]
+            self.assertEqual(expected_levels, actual_levels)
+
+    def test_matches_dict_engine_on_random_books(self) -> None:
+        """
+        The vectorized engine must produce exactly the same Changes as the dict engine.
+        """
+        rng = random.Random(7)
+        for depth in (0, 1, 10, 200):
+            for tick_size in (0.01, 0.001):
+                old = _random_orderbook(rng, depth, tick_size, "2024-12-17T00:00:00+00:00")
+                new = _random_orderbook(rng, depth, tick_size, "2024-12-17T00:00:15+00:00")
+                # keep some levels in common so that modified and unchanged levels occur
+                new.bids = old.bids[: depth // 4] + new.bids
+                new.asks = [OrderSummary(a.price, a.size + 1) for a in old.asks[: depth // 4]] + new.asks
+                new.bids = list({b.price: b for b in new.bids}.values())
+                new.asks = list({a.price: a for a in new.asks}.values())
+
+                self.assertSameUpdates(
+                    orderbook_get_updates(old, new),
+                    orderbook_get_updates_vectorized(old, new, tick_size)
+                )
+
+    def test_matches_dict_engine_on_fixed_scenario(self) -> None:
+        old = Order_Book("m", "a", "t0", "h1", "t0",
+                         bids=[OrderSummary(0.57, 10.0), OrderSummary(0.56, 5.0), OrderSummary(0.55, 1.0)],
+                         asks=[OrderSummary(0.58, 8.0), OrderSummary(0.59, 4.0)])
+        new = Order_Book("m", "a", "t1", "h2", "t1",
+                         bids=[OrderSummary(0.57, 12.0), OrderSummary(0.55, 1.0), OrderSummary(0.54, 3.0)],
+                         asks=[OrderSummary(0.59, 4.0), OrderSummary(0.6, 2.0)])
+        self.assertSameUpdates(orderbook_get_updates(old, new), orderbook_get_updates_vectorized(old, new, 0.01))
+
+    def test_off_grid_prices_fall_back(self) -> None:
+        """
+        Distinct prices that round to the same tick are still reported like the dict engine does.
+        """
+        old = Order_Book("m", "a", "t0", "h1", "t0", bids=[OrderSummary(0.5, 1.0)], asks=[])
+        new = Order_Book("m", "a", "t1", "h2", "t1", bids=[OrderSummary(0.5000001, 1.0)], asks=[])
+        self.assertSameUpdates(orderbook_get_updates(old, new), orderbook_get_updates_vectorized(old, new, 0.01))
+        self.assertSameUpdates(orderbook_get_updates(old, new), orderbook_get_updates_vectorized(old, new, 0.0))
+
+    def test_compact_books_match_dict_engine(self) -> None:
+        """
+        Both engines give the same result on compact books as on list-backed books.
+        """
+        rng = random.Random(11)
+        old = _random_orderbook(rng, 100, 0.01, "t0")
+        new = _random_orderbook(rng, 100, 0.01, "t1")
+        new.bids = old.bids[:20] + [b for b in new.bids if b.price not in {o.price for o in old.bids[:20]}]
+        expected = orderbook_get_updates(old, new)
+
+        compact_old = Compact_Order_Book.from_order_book(old)
+        compact_new = Compact_Order_Book.from_order_book(new)
+        self.assertSameUpdates(expected, orderbook_get_updates(compact_old, compact_new))
+        self.assertSameUpdates(expected, orderbook_get_updates_vectorized(compact_old, compact_new, 0.01))
+
+
+class TestCompactOrderBook(unittest.TestCase):
+    def test_parses_clob_response(self) -> None:
+        orderbook = orderbook_from_clob_data({
+            "market": "0xmarket",
+            "asset_id": "123",
+            "hash": "abc",
+            "timestamp": "1734394653982",
+            "bids": [{"price": "0.45", "size": "100"}, {"price": "0.44", "size": "20.5"}],
+            "asks": [{"price": "0.55", "size": "80"}],
+        })
+
+        self.assertIsInstance(orderbook, Compact_Order_Book)
+        self.assertEqual(orderbook.timestamp, "2024-12-17T00:17:33.982000+00:00")
+        self.assertEqual(orderbook.bids, [OrderSummary(0.45, 100.0), OrderSummary(0.44, 20.5)])
+        self.assertEqual(orderbook.asks, [OrderSummary(0.55, 80.0)])
+
+    def test_round_trips_order_book(self) -> None:
+        orderbook = Order_Book("m", "a", "t0", "h1", "t0",
+                               bids=[OrderSummary(0.5, 1.0)], asks=[OrderSummary(0.6, 2.0), OrderSummary(0.7, 3.0)])
+        compact = Compact_Order_Book.from_order_book(orderbook)
+
+        self.assertEqual(compact.to_order_book(), orderbook)
+        self.assertEqual(Compact_Order_Book.from_order_book(compact.to_order_book()), compact)
+        self.assertFalse(hasattr(compact, "__dict__"))
+
+    def test_rejects_mismatched_sides(self) -> None:
+        with self.assertRaises(ValueError):
+            Compact_Order_Book("m", "a", "t0", "h1", "t0", bid_prices=[0.5], bid_sizes=[])
+
+
+class TestOrderbookFetchAndAddUpdates(unittest.TestCase):
+    def setUp(self) -> None:
+        self.market = Gamma_Market(id="m1", slug="will-bitcoin-hit", conditionId="c", orderPriceMinTickSize=0.01,
+                                   orderMinSize=5.0, clobTokenId=42)
+        self.response = {
+            "market": "0xmarket", "asset_id": "42", "hash": "h1", "timestamp": "1734394653982",
+            "bids": [{"price": "0.45", "size": "100"}], "asks": [{"price": "0.55", "size": "80"}],
+        }
+        start = orderbook_from_clob_data(self.response)
+        self.latest: Dict[str, Book] = {"m1": start}
+        self.tracks = {"m1": Orderbook_Track(
+            id="m1", slug="will-bitcoin-hit", fetched_at=start.fetched_at, hour=0, date="2024-12-17",
+            start_orderbook=start, start_time_stamp=start.timestamp, condition_id="c",
+            order_price_min_tick_size=0.01, order_min_size=5.0, clob_token_id=42, updates=UpdateLog()
+        )}
+
+    def poll(self, response: Dict[str, Any]) -> None:
+        with patch.object(orderbook, "orderbooks_from_clob", return_value=iter([(42, response)])):
+            orderbook.orderbook_fetch_and_add_updates([self.market], self.tracks, self.latest)
+
+    def test_unchanged_hash_takes_fast_path(self) -> None:
+        """
+        A response with an unchanged hash is recorded as an empty update without decoding its levels.
+        """
+        before = dict(orderbook.orderbook_parse_stats)
+        # levels that could not be decoded prove that the fast path never touches them
+        self.poll({"hash": "h1", "bids": None, "asks": None})
+
+        self.assertEqual(orderbook.orderbook_parse_stats["fast_path"], before["fast_path"] + 1)
+        self.assertEqual(orderbook.orderbook_parse_stats["full_parse"], before["full_parse"])
+        self.assertEqual(len(self.tracks["m1"].updates), 1)
+        self.assertEqual(self.tracks["m1"].updates[0].changes, Changes())
+
+    def test_market_without_track_is_skipped(self) -> None:
+        self.latest.clear()
+        self.poll(dict(self.response, hash="h2"))
+
+        self.assertEqual(len(self.tracks["m1"].updates), 0)
+
+    def test_changed_hash_is_decoded_and_diffed(self) -> None:
+        before = dict(orderbook.orderbook_parse_stats)
+        self.poll(dict(self.response, hash="h2", bids=[{"price": "0.45", "size": "120"}]))
+
+        self.assertEqual(orderbook.orderbook_parse_stats["full_parse"], before["full_parse"] + 1)
+        self.assertEqual(self.tracks["m1"].updates[0].changes.bids, [OrderSummary(0.45, 120.0)])
+        self.assertEqual(self.latest["m1"].hash, "h2")
+
+
+class TestOrderbookRolloverTracks(unittest.TestCase):
+    def setUp(self) -> None:
+        self.markets = [
+            Gamma_Market(id=f"m{i}", slug=f"will-bitcoin-hit-{i}", conditionId="c", orderPriceMinTickSize=0.01,
+                         orderMinSize=5.0, clobTokenId=40 + i)
+            for i in range(3)
+        ]
+        self.latest: Dict[str, Book] = {
+            f"m{i}": orderbook_from_clob_data({
+                "market": "0xmarket", "asset_id": str(40 + i), "hash": f"h{i}", "timestamp": "1734394653982",
+                "bids": [{"price": "0.45", "size": "100"}], "asks": [{"price": "0.55", "size": "80"}],
+            })
+            for i in range(2)
+        }
+
+    def test_known_markets_are_seeded_without_fetching(self) -> None:
+        new_book = {
+            "market": "0xmarket", "asset_id": "42", "hash": "h2", "timestamp": "1734394653982",
+            "bids": [], "asks": [{"price": "0.6", "size": "1"}],
+        }
+        with patch.object(orderbook, "orderbooks_from_clob", return_value=iter([(42, new_book)])) as fetch:
+            tracks, latest = orderbook.orderbook_rollover_tracks(self.markets, self.latest, 13, "2024-12-17")
+
+        fetch.assert_called_once_with([42])  # only the market without a polled book
+        self.assertEqual(set(tracks), {"m0", "m1", "m2"})
+        self.assertIs(tracks["m0"].start_orderbook, latest["m0"])
+        self.assertEqual(tracks["m0"].start_orderbook.bids, self.latest["m0"].bids)
+        self.assertEqual((tracks["m0"].hour, tracks["m0"].date, len(tracks["m0"].updates)), (13, "2024-12-17", 0))
+        self.assertEqual(latest["m2"].hash, "h2")
+
+    def test_seeded_start_books_are_stamped_with_the_rollover_time(self) -> None:
+        rollover_time = datetime(2024, 12, 17, 13, tzinfo=timezone.utc)
+        with patch.object(orderbook, "orderbooks_from_clob", return_value=iter([])):
+            tracks, latest = orderbook.orderbook_rollover_tracks(self.markets[:2], self.latest, 13, "2024-12-17", rollover_time)
+
+        track = tracks["m0"]
+        self.assertEqual((track.start_time_stamp, track.fetched_at), (rollover_time.isoformat(), rollover_time.isoformat()))
+        self.assertEqual(latest["m0"].hash, "h0")
+        # The closed hour keeps the times of its polls
+        self.assertEqual(self.latest["m0"].timestamp, "2024-12-17T00:17:33.982000+00:00")
+
+    def test_closed_buffers_are_not_shared(self) -> None:
+        with patch.object(orderbook, "orderbooks_from_clob", return_value=iter([])):
+            _, latest = orderbook.orderbook_rollover_tracks(self.markets[:2], self.latest, 13, "2024-12-17")
+
+        self.assertIsNot(latest, self.latest)
+        del latest["m0"]  # polling the new hour must not affect the closed hour's state
+        self.assertIn("m0", self.latest)
+
+    def test_catalog_changes_only_touch_changed_markets(self) -> None:
+        """
+        Applying a catalog diff fetches the added market only; the unchanged one is seeded, the removed one retired.
+        """
+        changes = CatalogDiff(added=[self.markets[2]], removed=[self.markets[0]], unchanged=1)
+        markets = changes.apply(self.markets[:2])
+        new_book = {
+            "market": "0xmarket", "asset_id": "42", "hash": "h2", "timestamp": "1734394653982",
+            "bids": [], "asks": [{"price": "0.6", "size": "1"}],
+        }
+        with patch.object(orderbook, "orderbooks_from_clob", return_value=iter([(42, new_book)])) as fetch:
+            tracks, latest = orderbook.orderbook_rollover_tracks(markets, self.latest, 13, "2024-12-17")
+
+        fetch.assert_called_once_with([42])
+        self.assertEqual(set(tracks), {"m1", "m2"})
+        self.assertEqual(latest["m1"].hash, "h1")
+        self.assertEqual(latest["m2"].hash, "h2")
+
+    def test_removed_markets_are_dropped(self) -> None:
+        with patch.object(orderbook, "orderbooks_from_clob") as fetch:
+            tracks, latest = orderbook.orderbook_rollover_tracks(self.markets[1:2], self.latest, 13, "2024-12-17")
+
+        fetch.assert_not_called()
+        self.assertEqual(set(tracks), {"m1"})
+        self.assertEqual(set(latest), {"m1"})
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,117 @@
+import os
+import tempfile
+import unittest
+from typing import Any, Dict, List, Optional
+
+from benchmarks.synthetic import make_track
+from src.formats import get_orderbook_format, orderbook_levels_at, orderbook_track_to_dict
+from src.models import Changes, OrderSummary, UpdateLog
+from src.replay import ReplayBook, replay_market, replay_orderbook_data
+
+
+def levels(book: ReplayBook) -> Dict[str, Any]:
+    return {
+        "timestamp": book.timestamp,
+        "bids": [{"price": round(level.price, 3), "size": level.size} for level in book.bids],
+        "asks": [{"price": round(level.price, 3), "size": level.size} for level in book.asks],
+    }
+
+
+def present(price: Optional[float]) -> float:
+    """
+    Narrow a best bid or ask the test expects to exist.
+    """
+    assert price is not None
+    return price
+
+
+class TestReplayBook(unittest.TestCase):
+    def test_size_zero_removes_a_level(self) -> None:
+        book = ReplayBook(tick_size=0.01)
+        book.reset([(0.48, 10.0), (0.49, 5.0)], [(0.51, 7.0)], "t0")
+        book.apply(Changes(bids=[OrderSummary(0.49, 0), OrderSummary(0.47, 3.0)], asks=[OrderSummary(0.51, 2.0)]), "t1")
+
+        self.assertEqual([(round(b.price, 2), b.size) for b in book.bids], [(0.48, 10.0), (0.47, 3.0)])
+        self.assertEqual([(round(a.price, 2), a.size) for a in book.asks], [(0.51, 2.0)])
+        self.assertAlmostEqual(present(book.best_bid()), 0.48)
+        self.assertAlmostEqual(present(book.best_ask()), 0.51)
+        self.assertEqual(book.timestamp, "t1")
+
+    def test_copy_is_independent(self) -> None:
+        book = ReplayBook()
+        book.set_level(UpdateLog.BID, 0.5, 1.0)
+        snapshot = book.copy()
+        book.set_level(UpdateLog.BID, 0.5, 0)
+
+        self.assertIsNone(book.best_bid())
+        self.assertEqual(snapshot.best_bid(), 0.5)
+
+    def test_off_grid_price_is_rejected(self) -> None:
+        with self.assertRaises(ValueError):
+            ReplayBook(tick_size=0.01).set_level(UpdateLog.ASK, 0.505, 1.0)
+
+    def test_refine_keeps_the_levels(self) -> None:
+        book = ReplayBook(tick_size=0.01)
+        book.reset([(0.48, 10.0)], [(0.51, 7.0)], "t0")
+        book.refine(0.0001)
+        book.set_level(UpdateLog.BID, 0.4805, 2.0)
+
+        self.assertEqual(book.tick_size, 0.0001)
+        self.assertEqual([(round(b.price, 4), b.size) for b in book.bids], [(0.4805, 2.0), (0.48, 10.0)])
+        self.assertAlmostEqual(present(book.best_ask()), 0.51)
+
+
+class TestReplayFiles(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tracks = [make_track(num_updates=30, depth=10, seed=hour, hour=hour) for hour in (3, 4)]
+
+    def test_replay_matches_the_file_updates(self) -> None:
+        track, metadata = self.tracks[0]
+        data = orderbook_track_to_dict(track, metadata)
+
+        states = [levels(book) for book in replay_orderbook_data(data)]
+
+        self.assertEqual(len(states), 31)
+        for update_index, state in enumerate(states, start=-1):
+            expected = orderbook_levels_at(data, update_index)
+            if update_index == -1:
+                expected["timestamp"] = data["start_time_stamp"]
+            self.assertEqual(state, expected)
+
+    def test_file_with_a_finer_tick_refines_the_grid(self) -> None:
+        data = {
+            "order_price_min_tick_size": 0.0001,
+            "start_time_stamp": "2024-12-17T12:00:00+00:00",
+            "start_orderbook": {"bids": [{"price": 0.97, "size": 10.0}], "asks": [{"price": 0.9712, "size": 5.0}]},
+            "updates": [{"timestamp": "2024-12-17T12:00:15+00:00",
+                         "changes": {"bids": [{"price": 0.9705, "size": 1.0}], "asks": []}}],
+        }
+
+        states = [book.copy() for book in replay_orderbook_data(data, ReplayBook(tick_size=0.01))]
+
+        self.assertAlmostEqual(present(states[0].best_ask()), 0.9712)
+        self.assertAlmostEqual(present(states[1].best_bid()), 0.9705)
+
+    def test_market_replay_spans_files_in_time_order(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            paths: Dict[str, List[str]] = {"json": [], "npz": []}
+            for track, metadata in reversed(self.tracks):
+                for name in paths:
+                    orderbook_format = get_orderbook_format(name)
+                    path = os.path.join(directory, f"{track.id}-{track.date}-{track.hour}{orderbook_format.extension}")
+                    with open(path, "wb") as f:
+                        orderbook_format.write(track, metadata, f)
+                    paths[name].append(path)
+
+            from_json = [levels(book) for book in replay_market(paths["json"])]
+            from_npz = [levels(book) for book in replay_market(paths["npz"])]
+
+        self.assertEqual(len(from_json), 62)
+        self.assertEqual(from_json, from_npz)
+        timestamps = [state["timestamp"] for state in from_json]
+        self.assertEqual(timestamps, sorted(timestamps))
+        self.assertEqual(timestamps[31], self.tracks[1][0].start_time_stamp)
+
+
+if __name__ == "__main__":
+    unittest.main()
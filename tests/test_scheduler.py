@@ -0,0 +1,106 @@
+import unittest
+from datetime import datetime
+from typing import List
+
+from src.scheduler import TickScheduler
+
+START_WALL = 1734393603.0  # 2024-12-17T00:00:03+00:00, 12 seconds before a 15 second boundary
+
+
+class FakeClock:
+    """
+    Monotonic and wall clock that only move when `sleep` is called; the wall clock runs `wall_offset` ahead.
+    """
+
+    def __init__(self, wall_offset: float = START_WALL - 1000.0) -> None:
+        self.now = 1000.0
+        self.wall_offset = wall_offset
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def time(self) -> float:
+        return self.now + self.wall_offset
+
+    def sleep(self, seconds: float) -> None:
+        self.now += seconds
+
+
+def make_scheduler(clock: FakeClock, policy: str = "skip", max_catch_up_ticks: int = 2) -> TickScheduler:
+    return TickScheduler(
+        15, policy=policy, max_catch_up_ticks=max_catch_up_ticks,
+        monotonic=clock.monotonic, wall_time=clock.time, sleep=clock.sleep
+    )
+
+
+class TestTickScheduler(unittest.TestCase):
+    def run_ticks(self, scheduler: TickScheduler, clock: FakeClock, durations: List[float]) -> List[float]:
+        """
+        Run one tick per entry of `durations`, each advancing the clock by its duration.
+        """
+        ticks: List[float] = []
+
+        def on_tick(tick: datetime) -> None:
+            clock.sleep(durations[len(ticks)])
+            ticks.append(tick.timestamp() - START_WALL)
+            if len(ticks) == len(durations):
+                scheduler.stop()
+
+        scheduler.run(on_tick)
+        return ticks
+
+    def test_ticks_fire_once_per_boundary(self) -> None:
+        """
+        Boundaries are consecutive multiples of the interval and none fires twice.
+        """
+        clock = FakeClock()
+        scheduler = make_scheduler(clock)
+
+        ticks = self.run_ticks(scheduler, clock, [1.0] * 5)
+
+        self.assertEqual(ticks, [12.0, 27.0, 42.0, 57.0, 72.0])
+        self.assertEqual(scheduler.overruns, 0)
+        self.assertEqual(scheduler.lateness_stats()["max_lateness_s"], 0.0)
+
+    def test_skip_policy_skips_missed_boundaries(self) -> None:
+        clock = FakeClock()
+        scheduler = make_scheduler(clock, policy="skip")
+
+        # The first tick runs past the next two boundaries
+        ticks = self.run_ticks(scheduler, clock, [40.0, 1.0, 1.0])
+
+        self.assertEqual(ticks, [12.0, 57.0, 72.0])
+        self.assertEqual(scheduler.overruns, 1)
+        self.assertEqual(scheduler.skipped_ticks, 2)
+        self.assertTrue(scheduler.history[0].overrun)
+        self.assertEqual(scheduler.history[1].lateness_s, 0.0)
+
+    def test_catch_up_policy_runs_missed_boundaries(self) -> None:
+        clock = FakeClock()
+        scheduler = make_scheduler(clock, policy="catch_up", max_catch_up_ticks=5)
+
+        ticks = self.run_ticks(scheduler, clock, [40.0, 0.0, 0.0, 0.0])
+
+        self.assertEqual(ticks, [12.0, 27.0, 42.0, 57.0])
+        self.assertEqual(scheduler.overruns, 1)
+        self.assertEqual(scheduler.skipped_ticks, 0)
+        self.assertEqual([record.lateness_s for record in scheduler.history], [0.0, 25.0, 10.0, 0.0])
+
+    def test_catch_up_is_limited_to_max_catch_up_ticks(self) -> None:
+        clock = FakeClock()
+        scheduler = make_scheduler(clock, policy="catch_up", max_catch_up_ticks=1)
+
+        # One missed boundary is caught up, the rest up to the tick after 100s are skipped
+        ticks = self.run_ticks(scheduler, clock, [100.0, 0.0, 0.0])
+
+        self.assertEqual(ticks, [12.0, 27.0, 117.0])
+        self.assertEqual(scheduler.overruns, 1)
+        self.assertEqual(scheduler.skipped_ticks, 5)
+
+    def test_rejects_unknown_policy(self) -> None:
+        with self.assertRaises(ValueError):
+            TickScheduler(15, policy="sometimes")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+import json
+import unittest
+from typing import Any, Dict, Iterable
+
+from benchmarks.synthetic import make_gamma_markets
+from src.catalog import gamma_markets_from_api
+from src.selection import MarketSelector, SelectionRule, market_selector_from_config
+
+
+def market(slug: str, tags: Iterable[str] = (), volume: float = 0.0, market_id: str = "1") -> Dict[str, Any]:
+    return {
+        "id": market_id,
+        "slug": slug,
+        "tags": [{"label": tag, "slug": tag.lower()} for tag in tags],
+        "volumeNum": volume,
+        "clobTokenIds": json.dumps(["111", "222"]),
+    }
+
+
+class TestMarketSelector(unittest.TestCase):
+    def test_default_rule_matches_the_former_filter(self) -> None:
+        selector = market_selector_from_config({
+            "include": [{"slug_all": ["bitcoin"], "slug_any": ["hit", "reach", "above"]}],
+        })
+        markets = make_gamma_markets(2000)
+
+        expected = [m["id"] for m in markets if "bitcoin" in m["slug"].lower() and any(k in m["slug"].lower() for k in ("hit", "reach", "above"))]
+        self.assertEqual([m["id"] for m in markets if selector(m)], expected)
+        self.assertTrue(selector(market("Will-BITCOIN-Reach-100k")))
+        self.assertFalse(selector({"id": "2", "slug": None}))
+
+    def test_include_and_exclude_rules(self) -> None:
+        selector = MarketSelector(
+            include=[
+                SelectionRule(slug_all=["bitcoin"]),
+                SelectionRule(tags_any=["Crypto"], min_volume=1000),
+            ],
+            exclude=[SelectionRule(slug_any=["up-or-down"])],
+        )
+
+        self.assertTrue(selector(market("bitcoin-above-100k")))
+        self.assertFalse(selector(market("bitcoin-up-or-down")))
+        self.assertTrue(selector(market("eth-above-5k", tags=["crypto"], volume=5000)))
+        self.assertFalse(selector(market("eth-above-5k", tags=["crypto"], volume=10)))
+        self.assertFalse(selector(market("eth-above-5k", tags=["Sports"], volume=5000)))
+
+    def test_volume_bounds(self) -> None:
+        selector = MarketSelector([SelectionRule(min_volume=10, max_volume=100)])
+
+        self.assertTrue(selector(market("a", volume=50)))
+        self.assertFalse(selector(market("a", volume=5)))
+        self.assertFalse(selector(market("a", volume=500)))
+
+    def test_invalid_rules(self) -> None:
+        with self.assertRaises(ValueError):
+            market_selector_from_config({"include": [{"slug": "bitcoin"}]})
+        with self.assertRaises(ValueError):
+            MarketSelector(include=[])
+        with self.assertRaises(ValueError):
+            SelectionRule()
+        with self.assertRaises(ValueError):
+            market_selector_from_config({"include": [{}]})
+
+
+class TestGammaMarketsFromApi(unittest.TestCase):
+    def test_first_outcome_by_default(self) -> None:
+        markets = gamma_markets_from_api(market("bitcoin-above-100k", market_id="515539"))
+
+        self.assertEqual([(m.id, m.clobTokenId, m.outcomeIndex) for m in markets], [("515539", 111, 0)])
+
+    def test_every_outcome(self) -> None:
+        markets = gamma_markets_from_api(market("bitcoin-above-100k", market_id="515539"), track_all_outcomes=True)
+
+        self.assertEqual(
+            [(m.id, m.clobTokenId, m.outcomeIndex) for m in markets],
+            [("515539", 111, 0), ("515539_1", 222, 1)]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
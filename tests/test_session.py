@@ -0,0 +1,59 @@
+import json
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+from src.session import create_session, session_stats
+
+
+class _JSONHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def do_GET(self) -> None:
+        body = json.dumps({"path": self.path}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+class TestPooledSession(unittest.TestCase):
+    def setUp(self) -> None:
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _JSONHandler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.base_url = f"http://127.0.0.1:{self.server.server_port}"
+
+    def tearDown(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_connections_are_reused(self) -> None:
+        """
+        Sequential requests to the same host should share one keep-alive connection.
+        """
+        session = create_session(pool_connections=1, pool_maxsize=2)
+        before = session_stats.snapshot()
+
+        for i in range(5):
+            response = session.get(f"{self.base_url}/book?token_id={i}", timeout=5)
+            self.assertEqual(response.json()["path"], f"/book?token_id={i}")
+
+        after = session_stats.snapshot()
+        self.assertEqual(after["requests"] - before["requests"], 5)
+        self.assertEqual(after["connections_opened"] - before["connections_opened"], 1)
+        session.close()
+
+    def test_gzip_is_negotiated(self) -> None:
+        session = create_session()
+        self.assertIn("gzip", session.headers["Accept-Encoding"])
+        session.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,225 @@
+import io
+import os
+import tempfile
+import threading
+import time
+import unittest
+from typing import Any, Dict, List, Tuple
+from unittest.mock import patch
+
+from benchmarks.synthetic import make_track
+from src import spaces
+from src.formats import read_json
+from src.models import DatabaseConfig, MetadataEntry, SpacesConfig
+from src.upload_queue import DurableUploadQueue, UploadQueueItem
+from src.utils import get_config
+from tests.stubs import StubS3Client
+
+
+class TestSpacesUploadOrderbook(unittest.TestCase):
+    def setUp(self) -> None:
+        self.storage_dir = tempfile.TemporaryDirectory()
+        self.patches: List[Any] = [
+            patch.dict(get_config()["files"], storage_dir=self.storage_dir.name, format="json"),
+            patch.object(time, "sleep"),
+        ]
+        for p in self.patches:
+            p.start()
+        self.track, self.metadata = make_track(num_updates=20, depth=10)
+        self.local_path = os.path.join(self.storage_dir.name, "hourly", "515539", "515539-2024-12-17-12.json")
+
+    def tearDown(self) -> None:
+        for p in self.patches:
+            p.stop()
+        self.storage_dir.cleanup()
+
+    def upload(self, client: StubS3Client, mode: str = "memory", spool_max_bytes: int = 1 << 20) -> str:
+        with patch.dict(get_config()["spaces"], upload_mode=mode, spool_max_bytes=spool_max_bytes):
+            remote_path, num_bytes = spaces.spaces_upload_orderbook("515539", self.track, self.metadata, client, "orderbooks")
+        self.assertEqual(num_bytes, len(client.objects.get(remote_path, b"")))
+        return remote_path
+
+    def uploaded(self, client: StubS3Client, remote_path: str) -> Dict[str, Any]:
+        return read_json(io.BytesIO(client.objects[remote_path]))
+
+    def test_memory_mode_does_not_touch_disk(self) -> None:
+        client = StubS3Client()
+        with patch("builtins.open", side_effect=AssertionError("unexpected file write")):
+            remote_path = self.upload(client)
+
+        self.assertEqual(remote_path, "orderbooks/hourly/515539/515539-2024-12-17-12.json")
+        self.assertEqual(self.uploaded(client, remote_path)["num_updates"], 20)
+        self.assertFalse(os.path.exists(self.local_path))
+
+    def test_retry_uploads_the_whole_payload(self) -> None:
+        client = StubS3Client(failures=2)
+        remote_path = self.upload(client, spool_max_bytes=100)  # small spool: rolls over to a temp file
+
+        self.assertEqual(client.attempts, 3)
+        self.assertEqual(len(self.uploaded(client, remote_path)["updates"]), 20)
+        self.assertEqual(os.listdir(os.path.join(self.storage_dir.name, "spool")), [])
+
+    def test_failed_upload_spills_to_disk(self) -> None:
+        client = StubS3Client(failures=5)
+        with self.assertRaises(ConnectionError):
+            self.upload(client)
+
+        with open(self.local_path, "rb") as f:
+            self.assertEqual(read_json(f)["id"], "515539")
+
+        # the next successful cycle removes the spill
+        self.upload(StubS3Client())
+        self.assertFalse(os.path.exists(self.local_path))
+
+    def test_file_mode_removes_local_file(self) -> None:
+        client = StubS3Client()
+        remote_path = self.upload(client, mode="file")
+
+        self.assertIn(remote_path, client.objects)
+        self.assertFalse(os.path.exists(self.local_path))
+
+
+class TestProcessAndUploadOrderbooks(unittest.TestCase):
+    def setUp(self) -> None:
+        self.storage_dir = tempfile.TemporaryDirectory()
+        self.inserted: List[str] = []
+        self.patches: List[Any] = [
+            patch.dict(get_config()["files"], storage_dir=self.storage_dir.name, format="json"),
+            patch.dict(get_config()["spaces"], upload_mode="memory", max_inflight_uploads=4),
+            patch.object(spaces, "_client_manager", None),
+            patch.object(spaces, "insert_metadata_batch", side_effect=lambda entries, db: self.inserted.extend(p for _, p in entries)),
+        ]
+        for p in self.patches:
+            p.start()
+        self.spaces_config = SpacesConfig("endpoint", "key", "secret", "orderbooks", UPLOAD_WINDOW_S=60)
+        self.database_config = DatabaseConfig("host", "5432", "db", "user", "password")
+
+    def tearDown(self) -> None:
+        for p in self.patches:
+            p.stop()
+        self.storage_dir.cleanup()
+
+    def make_queue(self, num_markets: int) -> DurableUploadQueue:
+        file_uploading_queue = DurableUploadQueue(os.path.join(self.storage_dir.name, f"queue-{time.monotonic_ns()}.sqlite3"))
+        self.addCleanup(file_uploading_queue.close)
+        for i in range(num_markets):
+            track, _ = make_track(num_updates=5, depth=5, market_id=str(1000 + i))
+            file_uploading_queue.put({str(1000 + i): track})
+        return file_uploading_queue
+
+    def run_uploader(
+            self, client: StubS3Client, file_uploading_queue: DurableUploadQueue
+    ) -> List[Tuple[MetadataEntry, str]]:
+        with patch.object(spaces, "spaces_establish_connection", return_value=client):
+            return spaces.process_and_upload_orderbooks(file_uploading_queue, self.spaces_config, self.database_config)
+
+    def test_uploads_run_concurrently_within_the_limit(self) -> None:
+        client = StubS3Client(delay=0.1)
+        file_uploading_queue = self.make_queue(12)
+
+        start = time.monotonic()
+        uploaded = self.run_uploader(client, file_uploading_queue)
+        elapsed = time.monotonic() - start
+
+        self.assertEqual(len(uploaded), 12)
+        self.assertEqual(len(client.objects), 12)
+        self.assertEqual(sorted(self.inserted), sorted(path for _, path in uploaded))
+        self.assertEqual(client.max_in_flight, 4)
+        self.assertLess(elapsed, 0.1 * 12 / 2)
+        self.assertTrue(file_uploading_queue.empty())
+        self.assertEqual(file_uploading_queue.metrics()["leased"], 0)
+
+    def test_failed_upload_is_requeued_without_blocking_others(self) -> None:
+        failing_key = "orderbooks/hourly/1003/1003-2024-12-17-12.json"
+        client = StubS3Client(failing_keys=[failing_key])
+        file_uploading_queue = self.make_queue(6)
+
+        with patch.object(time, "sleep"):
+            uploaded = self.run_uploader(client, file_uploading_queue)
+
+        self.assertEqual(len(uploaded), 5)
+        self.assertNotIn(failing_key, self.inserted)
+        self.assertEqual(file_uploading_queue.qsize(), 1)
+        self.assertEqual(file_uploading_queue.get().market_id, "1003")
+        self.assertEqual(file_uploading_queue.metrics()["leased"], 1)
+
+    def test_tracks_are_released_when_the_metadata_insert_fails(self) -> None:
+        client = StubS3Client()
+        file_uploading_queue = self.make_queue(3)
+
+        with patch.object(spaces, "insert_metadata_batch", side_effect=RuntimeError("database down")):
+            uploaded = self.run_uploader(client, file_uploading_queue)
+
+        self.assertEqual(uploaded, [])
+        self.assertEqual(file_uploading_queue.qsize(), 3)
+        self.assertEqual(file_uploading_queue.metrics()["leased"], 0)
+
+    def test_queue_emptied_by_another_uploader_ends_the_lease_loop(self) -> None:
+        client = StubS3Client()
+        file_uploading_queue = self.make_queue(2)
+        get = file_uploading_queue.get
+        other_uploader: List[UploadQueueItem] = []
+
+        def racing_get() -> UploadQueueItem:
+            if len(other_uploader) == 0 and file_uploading_queue.qsize() == 1:
+                # The other uploader leases the last track first
+                other_uploader.append(get())
+            return get()
+
+        with patch.object(file_uploading_queue, "get", side_effect=racing_get):
+            uploaded = self.run_uploader(client, file_uploading_queue)
+
+        self.assertEqual(len(uploaded), 1)
+        self.assertTrue(file_uploading_queue.empty())
+        # Only the other uploader's lease is outstanding
+        self.assertEqual(file_uploading_queue.metrics()["leased"], 1)
+
+    def test_client_is_reused_across_cycles(self) -> None:
+        client = StubS3Client()
+        with patch.object(spaces, "spaces_establish_connection", return_value=client) as establish:
+            for _ in range(3):
+                spaces.process_and_upload_orderbooks(self.make_queue(2), self.spaces_config, self.database_config)
+
+        establish.assert_called_once()
+        self.assertEqual(len(client.objects), 2)
+
+
+class TestSpacesClientManager(unittest.TestCase):
+    def setUp(self) -> None:
+        self.spaces_config = SpacesConfig("endpoint", "key", "secret", "orderbooks", UPLOAD_WINDOW_S=60)
+
+    def test_concurrent_first_use_creates_one_client(self) -> None:
+        manager = spaces.SpacesClientManager(self.spaces_config, max_pool_connections=32)
+
+        def slow_connect(**kwargs: Any) -> StubS3Client:
+            time.sleep(0.05)
+            return StubS3Client()
+
+        with patch.object(spaces, "spaces_establish_connection", side_effect=slow_connect) as establish:
+            threads = [threading.Thread(target=manager.get_client) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        establish.assert_called_once()
+        self.assertEqual(establish.call_args.kwargs["max_pool_connections"], 32)
+        self.assertEqual(manager.stats()["clients_created"], 1)
+        self.assertGreater(manager.stats()["last_setup_s"], 0)
+
+    def test_invalidate_reconnects_lazily(self) -> None:
+        manager = spaces.SpacesClientManager(self.spaces_config)
+        with patch.object(spaces, "spaces_establish_connection", side_effect=lambda **kwargs: StubS3Client()):
+            first = manager.get_client()
+            manager.invalidate(first)
+            manager.invalidate(first)  # a second report of the same failure is ignored
+            second = manager.get_client()
+
+        self.assertIsNot(first, second)
+        self.assertIs(manager.get_client(), second)
+        self.assertEqual(manager.stats()["clients_created"], 2)
+        self.assertEqual(manager.stats()["invalidations"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,40 @@
+import os
+import subprocess
+import sys
+import unittest
+
+from benchmarks.bench_import_time import CRAWLER_MODULES, HEAVY_MODULES
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TestColdStart(unittest.TestCase):
+    def test_crawler_imports_no_heavy_dependencies(self) -> None:
+        """
+        boto3, psycopg2, numpy and pandas are loaded on first use, not when the crawler starts.
+        """
+        code = (
+            f"import sys\nimport {', '.join(CRAWLER_MODULES)}\n"
+            f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+        )
+        result = subprocess.run([sys.executable, "-c", code], cwd=REPO_ROOT, capture_output=True, text=True, check=True)
+
+        self.assertEqual(result.stdout.strip(), "")
+
+    def test_imports_do_not_load_config(self) -> None:
+        """
+        The configuration is loaded by `init_config` in the entry point, not as a side effect of an import.
+        """
+        code = (
+            "import importlib, pkgutil, main, src\n"
+            "for module in pkgutil.iter_modules(src.__path__):\n"
+            "    importlib.import_module(f'src.{module.name}')"
+        )
+        env = dict(os.environ, POLYMARKET_CONFIG=os.path.join(REPO_ROOT, "missing-config.json"))
+        result = subprocess.run([sys.executable, "-c", code], cwd=REPO_ROOT, env=env, capture_output=True, text=True)
+
+        self.assertEqual(result.returncode, 0, result.stderr)
+
+
+if __name__ == "__main__":
+    unittest.main()
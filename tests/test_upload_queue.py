@@ -0,0 +1,120 @@
+import os
+import queue
+import tempfile
+import unittest
+from typing import Dict
+
+from benchmarks.synthetic import make_track
+from src.models import Orderbook_Track
+from src.upload_queue import DurableUploadQueue
+
+
+def make_item(market_id: str, num_updates: int = 5) -> Dict[str, Orderbook_Track]:
+    track, _ = make_track(num_updates=num_updates, depth=5, market_id=market_id)
+    return {market_id: track}
+
+
+class TestDurableUploadQueue(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "queue", "upload_queue.sqlite3")
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def open_queue(self, memory_budget_bytes: int = 1 << 30) -> DurableUploadQueue:
+        upload_queue = DurableUploadQueue(self.path, memory_budget_bytes)
+        self.addCleanup(upload_queue.close)
+        return upload_queue
+
+    def test_fifo_order(self) -> None:
+        upload_queue = self.open_queue()
+        for market_id in ["1", "2", "3"]:
+            upload_queue.put(make_item(market_id))
+
+        self.assertEqual([upload_queue.get().market_id for _ in range(3)], ["1", "2", "3"])
+        self.assertTrue(upload_queue.empty())
+        with self.assertRaises(queue.Empty):
+            upload_queue.get()
+
+    def test_release_keeps_the_original_position(self) -> None:
+        upload_queue = self.open_queue()
+        for market_id in ["1", "2", "3"]:
+            upload_queue.put(make_item(market_id))
+
+        first = upload_queue.get()
+        upload_queue.put(make_item("4"))
+        upload_queue.release(first)
+
+        self.assertEqual([upload_queue.get().market_id for _ in range(4)], ["1", "2", "3", "4"])
+
+    def test_releases_in_any_order_restore_fifo_order(self) -> None:
+        upload_queue = self.open_queue()
+        for market_id in ["1", "2", "3", "4"]:
+            upload_queue.put(make_item(market_id))
+
+        leased = [upload_queue.get() for _ in range(3)]
+        for queue_item in (leased[1], leased[2], leased[0]):
+            upload_queue.release(queue_item)
+
+        self.assertEqual([upload_queue.get().market_id for _ in range(4)], ["1", "2", "3", "4"])
+
+    def test_tracks_beyond_the_memory_budget_stay_on_disk(self) -> None:
+        upload_queue = self.open_queue(memory_budget_bytes=1)
+        item = make_item("1", num_updates=50)
+        upload_queue.put(item)
+
+        self.assertEqual(upload_queue.metrics()["resident_bytes"], 0)
+        self.assertEqual(upload_queue.metrics()["spilled"], 1)
+
+        queue_item = upload_queue.get()
+        assert queue_item.orderbook_track is not None  # loaded back from disk
+        self.assertEqual(list(queue_item.orderbook_track.updates.to_records()), list(item["1"].updates.to_records()))
+        self.assertEqual(queue_item.orderbook_track.start_orderbook, item["1"].start_orderbook)
+
+        upload_queue.ack(queue_item)
+        self.assertEqual(upload_queue.metrics()["resident_bytes"], 0)
+
+    def test_unacknowledged_tracks_are_replayed_after_restart(self) -> None:
+        upload_queue = self.open_queue()
+        for market_id in ["1", "2", "3"]:
+            upload_queue.put(make_item(market_id))
+        upload_queue.ack(upload_queue.get())
+        upload_queue.get()  # leased when the process "crashes"
+        upload_queue.close()
+
+        replayed = self.open_queue()
+        self.assertEqual(replayed.qsize(), 2)
+        queue_item = replayed.get()
+        self.assertEqual(queue_item.market_id, "2")
+        assert queue_item.orderbook_track is not None
+        self.assertEqual(queue_item.orderbook_track.id, "2")
+
+    def test_reopening_replays_the_tracks_still_leased(self) -> None:
+        upload_queue = self.open_queue()
+        for market_id in ["1", "2"]:
+            upload_queue.put(make_item(market_id))
+        leased = upload_queue.get()  # a rollover upload is still running
+
+        # A second queue on the same file does not know about the lease and hands the track out
+        # again, so `main` is given the queue of the process rather than opening its own
+        reopened = self.open_queue()
+        self.assertEqual([reopened.get().market_id for _ in range(2)], [leased.market_id, "2"])
+        self.assertEqual(upload_queue.metrics()["leased"], 1)
+
+    def test_metrics_report_depth_and_age(self) -> None:
+        upload_queue = self.open_queue()
+        self.assertEqual(upload_queue.metrics()["oldest_age_s"], 0.0)
+
+        upload_queue.put(make_item("1"))
+        upload_queue.put(make_item("2"))
+        upload_queue.get()
+
+        metrics = upload_queue.metrics()
+        self.assertEqual(metrics["depth"], 1)
+        self.assertEqual(metrics["leased"], 1)
+        self.assertGreaterEqual(metrics["oldest_age_s"], 0.0)
+
+
+if __name__ == "__main__":
+    unittest.main()